@@ -4,12 +4,14 @@ CLI interface for Local AI Assistant.
 This module provides the command-line interface for interacting with the assistant.
 """
 
+import hashlib
+import itertools
 import logging
 import os
 import sys
 import time
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterator, List, Optional, Any, Union
 import traceback
 import yaml
 
@@ -29,7 +31,11 @@ except ImportError:
 
 # Local imports
 from local_ai_assistant.cli.command_parser import parse_command
-from local_ai_assistant.models.model_manager import ModelManager
+from local_ai_assistant.models.model_manager import (
+    ModelManager, EmbeddingError, GenerationError, TASK_CHAT, TASK_RAG
+)
+from local_ai_assistant.models.resilience import OllamaUnavailable
+from local_ai_assistant.models.session import ChatSession
 from local_ai_assistant.memory.vector_store import VectorStore
 from local_ai_assistant.document.loader import DocumentLoader
 from local_ai_assistant.debug.response_analyzer import ResponseAnalyzer
@@ -53,7 +59,8 @@ class CLI:
         model_manager: ModelManager,
         vector_store: VectorStore,
         document_loader: DocumentLoader,
-        debug_enabled: bool = True
+        debug_enabled: bool = True,
+        document_indexer=None
     ):
         """
         Initialize the CLI interface.
@@ -64,11 +71,13 @@ class CLI:
             vector_store: Vector store instance
             document_loader: Document loader instance
             debug_enabled: Whether debug mode is enabled
+            document_indexer: Optional shared document indexer instance
         """
         self.config_path = Path(config_path)
         self.model_manager = model_manager
         self.vector_store = vector_store
         self.document_loader = document_loader
+        self.document_indexer = document_indexer
         self.debug_enabled = debug_enabled
         
         # Load configuration
@@ -100,6 +109,12 @@ class CLI:
         # Thinking mode is disabled by default
         self.show_thinking = False
         
+        # Chat session reusing the conversation prefix across turns
+        session_config = self.config.get('model', {}).get('chat_session', {}) or {}
+        self.chat_session = None
+        if session_config.get('enabled', True):
+            self.chat_session = ChatSession(max_turns=session_config.get('max_turns', 20))
+        
         # Initialize response analyzer
         if self.debug_enabled:
             from local_ai_assistant.debug.response_analyzer import ResponseAnalyzer
@@ -263,6 +278,8 @@ Type `/help` for available commands or `/quit` to exit.
             self._show_memory(args)
         elif cmd == '/status':
             self._show_status()
+        elif cmd == '/perf':
+            self._show_perf(args)
         elif cmd == '/clear':
             self._clear_screen()
         else:
@@ -285,7 +302,8 @@ Type `/help` for available commands or `/quit` to exit.
             table.add_row("/docs", "List loaded documents")
             table.add_row("/memory [n]", "Show recent memory (last n items)")
             table.add_row("/status", "Show system status")
-            table.add_row("/clear", "Clear the screen")
+            table.add_row("/perf [dump [file]]", "Show generation metrics or save them as JSON")
+            table.add_row("/clear", "Clear the screen and start a new chat session")
             table.add_row("/quit", "Exit the assistant")
             
             self.console.print(table)
@@ -300,7 +318,8 @@ Type `/help` for available commands or `/quit` to exit.
             print("  /docs           - List loaded documents")
             print("  /memory [n]     - Show recent memory (last n items)")
             print("  /status         - Show system status")
-            print("  /clear          - Clear the screen")
+            print("  /perf [dump [file]] - Show generation metrics or save them as JSON")
+            print("  /clear          - Clear the screen and start a new chat session")
             print("  /quit           - Exit the assistant")
     
     def _switch_model(self, args):
@@ -327,6 +346,8 @@ Type `/help` for available commands or `/quit` to exit.
         
         if success:
             self.active_model = model_name
+            if self.chat_session is not None:
+                self.chat_session.clear()
             self._print(f"Switched to model: {model_name}", style="info")
         else:
             self._print(f"Failed to switch to model: {model_name}", style="error")
@@ -352,6 +373,24 @@ Type `/help` for available commands or `/quit` to exit.
         logger.info(f"Thinking display: {self.show_thinking}")
         self._print(f"Thinking display: {'Enabled' if self.show_thinking else 'Disabled'}", style="info")
     
+    def _get_document_indexer(self):
+        """
+        Get the shared document indexer, creating it on first use.
+        
+        Returns:
+            DocumentIndexer instance reused across /load commands
+        """
+        if self.document_indexer is None:
+            # Import here to avoid circular imports
+            from local_ai_assistant.document.indexer import DocumentIndexer
+            self.document_indexer = DocumentIndexer(
+                self.config_path,
+                self.document_loader,
+                self.vector_store,
+                self.model_manager
+            )
+        return self.document_indexer
+    
     def _load_document(self, args):
         """
         Load a document.
@@ -392,14 +431,7 @@ Type `/help` for available commands or `/quit` to exit.
                 
                 # Index the document if loaded successfully
                 if doc_id:
-                    # Import here to avoid circular imports
-                    from local_ai_assistant.document.indexer import DocumentIndexer
-                    indexer = DocumentIndexer(
-                        self.config_path,
-                        self.document_loader,
-                        self.vector_store,
-                        self.model_manager
-                    )
+                    indexer = self._get_document_indexer()
                     self.console.print(f"Indexing document: {path.name}...", style=self.system_style)
                     indexer.index_document(doc_id)
         else:
@@ -408,14 +440,7 @@ Type `/help` for available commands or `/quit` to exit.
             
             # Index the document if loaded successfully
             if doc_id:
-                # Import here to avoid circular imports
-                from local_ai_assistant.document.indexer import DocumentIndexer
-                indexer = DocumentIndexer(
-                    self.config_path,
-                    self.document_loader,
-                    self.vector_store,
-                    self.model_manager
-                )
+                indexer = self._get_document_indexer()
                 self._print(f"Indexing document: {path.name}...", style="info")
                 indexer.index_document(doc_id)
         
@@ -547,12 +572,160 @@ Type `/help` for available commands or `/quit` to exit.
         # Document stats
         doc_count = len(self.document_loader.documents) if hasattr(self.document_loader, 'documents') else 'Unknown'
         print(f"  Loaded documents: {doc_count}")
+        
+        # Embedding cache stats
+        cache = getattr(self.model_manager, 'embedding_cache', None)
+        if cache is not None:
+            cache_stats = cache.stats()
+            print(f"  Embedding cache: {cache_stats['entries']} entries, "
+                  f"{cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                  f"({cache_stats['hit_rate']:.0%} hit rate)")
+        
+        # Request scheduler queues
+        scheduler = getattr(self.model_manager, 'scheduler', None)
+        if scheduler is not None:
+            print("  Request queues:")
+            for name, metrics in scheduler.metrics().items():
+                print(f"    {name}: {metrics['queued']} queued, {metrics['running']} running, "
+                      f"{metrics['completed']} done, {metrics['rejected']} rejected "
+                      f"(avg wait {metrics['avg_wait']:.2f}s)")
+    
+    def _show_perf(self, args):
+        """
+        Show per-model generation metrics, or dump them as JSON.
+        
+        Args:
+            args: Command arguments ('dump' and an optional file path)
+        """
+        metrics = self.model_manager.metrics
+        
+        if args and args[0].lower() == 'dump':
+            path = args[1] if len(args) > 1 else self.model_manager.metrics_dump_path
+            try:
+                written = metrics.dump(path)
+                self._print(f"Wrote generation metrics to {written}", style="info")
+            except Exception as e:
+                logger.error(f"Error writing generation metrics: {str(e)}")
+                self._print(f"Error writing generation metrics: {str(e)}", style="error")
+            return
+        
+        summary = metrics.summary()
+        if not summary:
+            self._print("No generation metrics recorded yet", style="info")
+            return
+        
+        rows = [
+            (model, task, str(stats['requests']), f"{stats['tokens_per_second']:.1f}",
+             f"{stats['prompt_tokens_per_second']:.1f}", f"{stats['prompt_eval_share']:.0%}",
+             f"{stats['avg_total_seconds']:.2f}s", str(stats['loads']))
+            for model, tasks in summary.items()
+            for task, stats in tasks.items()
+        ]
+        headers = ("Model", "Task", "Requests", "Tokens/s", "Prompt tokens/s", "Prompt share", "Avg time", "Loads")
+        
+        if self.rich_enabled:
+            table = Table(title=f"Generation Metrics (last {metrics.window} requests per model and task)")
+            for header in headers:
+                table.add_column(header, style="cyan" if header == "Model" else None)
+            for row in rows:
+                table.add_row(*row)
+            self.console.print(table)
+        else:
+            print(f"\nGeneration Metrics (last {metrics.window} requests per model and task):")
+            print("  " + " | ".join(headers))
+            for row in rows:
+                print("  " + " | ".join(row))
+        
+        events = metrics.load_events()
+        if events:
+            print("\nRecent model loads:")
+            for event in events[-5:]:
+                loaded_at = time.strftime('%H:%M:%S', time.localtime(event['time']))
+                print(f"  {loaded_at} {event['model']} ({event['task']}): {event['load_seconds']:.1f}s")
     
     def _clear_screen(self):
-        """Clear the terminal screen."""
+        """Clear the terminal screen and start a new chat session."""
         os.system('cls' if os.name == 'nt' else 'clear')
+        if self.chat_session is not None:
+            self.chat_session.clear()
         self._print_welcome()
     
+    def _stream_response(self, stream: Iterator[str]) -> str:
+        """
+        Render a streamed response as its chunks arrive.
+        
+        Args:
+            stream: Response text chunks from the model manager
+            
+        Returns:
+            The complete response text
+        """
+        parts = []
+        
+        if not self.rich_enabled:
+            print("AI: ", end="", flush=True)
+            for chunk in stream:
+                parts.append(chunk)
+                print(chunk, end="", flush=True)
+            print()
+            return ''.join(parts)
+        
+        text = Text("AI: ", style=self.assistant_style)
+        
+        # Spinner until the first chunk arrives, then live incremental text
+        with self.console.status("Generating response...", spinner="dots"):
+            first_chunk = next(stream, None)
+        
+        if first_chunk is None:
+            self.console.print(text)
+            return ''
+        
+        with Live(text, console=self.console, refresh_per_second=15, vertical_overflow="visible") as live:
+            for chunk in itertools.chain([first_chunk], stream):
+                parts.append(chunk)
+                text.append(chunk)
+                live.update(text)
+        
+        return ''.join(parts)
+    
+    def _session_stream(self, query: str, combined_context: List[Dict[str, Any]]) -> Iterator[str]:
+        """
+        Answer a query within the ongoing chat session.
+        
+        The session is keyed by the retrieved document chunks (their ids
+        and text): while they stay the same, the conversation continues
+        on the cached prefix and earlier turns come from the session
+        itself. When they change (or the model changes), a new session is
+        seeded with the full context, including recent conversation memory.
+        
+        Args:
+            query: User query string
+            combined_context: Context items from the vector store
+            
+        Returns:
+            Iterator over response text chunks
+        """
+        documents = [item for item in combined_context if item.get('source') == 'document']
+        digest = hashlib.sha256()
+        for item in documents:
+            digest.update(f"{item.get('id', '')}\x00{item.get('text', '')}\x00".encode('utf-8'))
+        context_key = digest.hexdigest()
+        task = TASK_RAG if documents else TASK_CHAT
+        
+        # Only used if the session restarts; the model manager decides
+        context_str = self.vector_store.format_context_for_prompt(combined_context)
+        system_prompt = "You are a helpful local AI assistant. Provide helpful and accurate responses."
+        if context_str:
+            system_prompt += (
+                "\n\nThe following context may be helpful for answering the user's questions:\n\n"
+                f"{context_str}\n\n"
+                "If the context doesn't contain the information needed, use your own knowledge."
+            )
+        
+        return self.model_manager.session_chat_stream(
+            self.chat_session, query, system_prompt, context_key, task=task
+        )
+    
     def _process_query(self, query: str):
         """
         Process a user query and generate a response.
@@ -591,37 +764,41 @@ Type `/help` for available commands or `/quit` to exit.
                 Please provide a helpful and accurate response based on your knowledge.
                 """
             
-            # Initialize thinking display if enabled
-            thinking_displayed = False
+            # Show thinking steps if enabled
             if self.show_thinking:
                 self.console.print("[bold blue]Thinking...[/bold blue]")
-                
-                def update_thinking():
-                    nonlocal thinking_displayed
-                    if not thinking_displayed:
-                        self.console.print("- Searching for relevant context...", style="dim")
-                        self.console.print(f"- Found {len(combined_context)} relevant context items", style="dim")
-                        self.console.print("- Generating response with Ollama model...", style="dim")
-                        thinking_displayed = True
-                
-                # Use the console status with a string spinner name instead of a Spinner object
-                with self.console.status("Generating response...", spinner="dots"):
-                    # Add a slight delay to show thinking process
-                    time.sleep(0.5)
-                    update_thinking()
-                    
-                    # Generate response
-                    response = self.model_manager.generate_text(prompt)
+                self.console.print("- Searching for relevant context...", style="dim")
+                self.console.print(f"- Found {len(combined_context)} relevant context items", style="dim")
+                self.console.print("- Generating response with Ollama model...", style="dim")
+            
+            # Stream the response as it is generated
+            if self.chat_session is not None:
+                stream = self._session_stream(query, combined_context)
             else:
-                # Generate response without thinking display
-                with self.console.status("Generating response...", spinner="dots"):
-                    response = self.model_manager.generate_text(prompt)
+                has_documents = any(item.get('source') == 'document' for item in combined_context)
+                stream = self.model_manager.generate_text_stream(
+                    prompt, task=TASK_RAG if has_documents else TASK_CHAT
+                )
+            response = self._stream_response(stream)
             
-            # Print assistant response
-            self._print(f"AI: {response}", style="assistant")
+            # Show per-turn latency statistics in debug mode
+            stats = self.model_manager.last_generation_stats
+            if stats and self.debug_enabled:
+                ttft = stats.get('time_to_first_token') or 0.0
+                prompt_tokens = stats.get('prompt_tokens')
+                self._print(
+                    f"(time to first token {ttft:.2f}s, "
+                    f"{stats.get('tokens_per_second', 0.0):.1f} tokens/s"
+                    + (f", {prompt_tokens} prompt tokens evaluated)" if prompt_tokens else ")"),
+                    style="debug"
+                )
             
             # Add to memory
-            self.vector_store.add_conversation_pair(query, response)
+            try:
+                self.vector_store.add_conversation_pair(query, response)
+            except EmbeddingError as e:
+                logger.error(f"Could not store conversation in memory: {str(e)}")
+                self._print("Warning: this exchange could not be saved to memory", style="warning")
             
             # Analyze response in debug mode
             if self.debug_enabled:
@@ -650,6 +827,9 @@ Type `/help` for available commands or `/quit` to exit.
                         # Any other format
                         self.console.print(f"- Debug info: {str(issues)}", style=self.debug_style)
             
+        except (GenerationError, OllamaUnavailable) as e:
+            self._print(f"Could not get a response from the model: {str(e)}", style="error")
+            
         except Exception as e:
             self.console.print(f"\nDebug Info:", style=self.debug_style)
             self.console.print(f"{traceback.format_exc()}", style=self.debug_style)
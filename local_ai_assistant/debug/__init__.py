@@ -1,5 +1,6 @@
 """
 Debug module for Local AI Assistant.
 
-This package contains response analysis, code sandbox, and issue logging components.
+This package contains response analysis, code sandbox, issue logging and
+fake Ollama server components.
 """ 
\ No newline at end of file
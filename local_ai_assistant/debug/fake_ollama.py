@@ -0,0 +1,489 @@
+"""
+Local stand-in for the Ollama server.
+
+This module serves the Ollama endpoints used by the assistant (tags, ps,
+pull, generate, chat, embed, embeddings) with streaming, deterministic
+hash-based unit embeddings and configurable time-to-first-token and
+tokens/sec, so the full pipeline can be exercised and load-tested offline.
+
+Run it with:
+
+    python -m local_ai_assistant.debug.fake_ollama --port 11435
+
+and point model.ollama.port in config.yaml at the same port.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import re
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+# Words used to build generated responses
+_VOCABULARY = (
+    "the model local assistant answer context memory document question "
+    "response token vector search result helpful accurate detail example "
+    "information data system user query relevant summary note fact"
+).split()
+
+DEFAULT_MODELS = [
+    {'name': 'gemma3:27b', 'size': 17_000_000_000},
+    {'name': 'llama3:8b', 'size': 4_700_000_000},
+    {'name': 'deepseek-rag', 'size': 4_700_000_000},
+    {'name': 'nomic-embed-text', 'size': 274_000_000},
+]
+
+
+def hash_embedding(text: str, dim: int = 768, model: str = '') -> List[float]:
+    """
+    Compute a deterministic unit embedding for a text.
+
+    Words are hashed into signed buckets (feature hashing), so texts that
+    share words get similar vectors and retrieval behaves sensibly.
+
+    Args:
+        text: Text to embed
+        dim: Embedding dimension
+        model: Model name mixed into the hash
+
+    Returns:
+        L2-normalized vector of length dim
+    """
+    vector = [0.0] * dim
+    words = re.findall(r"\w+", text.lower()) or [text]
+
+    for word in words:
+        digest = hashlib.sha256(f"{model}\x00{word}".encode('utf-8')).digest()
+        index = int.from_bytes(digest[:4], 'little') % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+
+    norm = math.sqrt(sum(value * value for value in vector))
+    if not norm:
+        vector[0] = 1.0
+        return vector
+    return [value / norm for value in vector]
+
+
+class FakeOllamaServer:
+    """
+    Threaded HTTP server emulating the Ollama API.
+
+    Generation produces deterministic text from the request, taking
+    ttft seconds before the first token and then streaming at
+    tokens_per_second. Loaded models are tracked for /api/ps and follow
+    keep_alive=0 unload requests.
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 11435,
+        ttft: float = 0.2,
+        tokens_per_second: float = 30.0,
+        embedding_dim: int = 768,
+        response_tokens: int = 64,
+        embed_latency: float = 0.0,
+        models: Optional[Sequence[Dict[str, Any]]] = None
+    ):
+        """
+        Initialize the server (call start() to serve).
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            ttft: Seconds before the first generated token
+            tokens_per_second: Generation speed after the first token
+            embedding_dim: Dimension of returned embeddings
+            response_tokens: Default number of generated tokens
+            embed_latency: Seconds of latency per embedding request
+            models: Catalog entries with 'name' and 'size'
+        """
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.embedding_dim = embedding_dim
+        self.response_tokens = response_tokens
+        self.embed_latency = embed_latency
+        self.models = {model['name']: dict(model) for model in (models or DEFAULT_MODELS)}
+        self.loaded: Dict[str, float] = {}
+        self.request_count = 0
+
+        self._lock = threading.Lock()
+        self._connections = set()
+        self._thread: Optional[threading.Thread] = None
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def port(self) -> int:
+        """Port the server is bound to."""
+        return self._httpd.server_address[1]
+
+    def start(self) -> "FakeOllamaServer":
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        logger.info(f"Fake Ollama server listening on {self.url}")
+        return self
+
+    def stop(self):
+        """Stop serving and drop open connections, like a killed server."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _touch(self, model: str, keep_alive: Any) -> str:
+        """Record a model as loaded (or unloaded for keep_alive=0)."""
+        with self._lock:
+            self.request_count += 1
+            if keep_alive in (0, '0', '0s'):
+                self.loaded.pop(model, None)
+                return 'unload'
+            self.loaded[model] = time.time()
+            return 'load'
+
+    def generate_tokens(self, request: str, count: int) -> List[str]:
+        """
+        Build a deterministic response for a request.
+
+        Args:
+            request: Prompt or serialized messages
+            count: Number of tokens
+
+        Returns:
+            Response tokens (words with leading spaces after the first)
+        """
+        seed = hashlib.sha256(request.encode('utf-8')).digest()
+        words = []
+        for i in range(count):
+            word = _VOCABULARY[(seed[i % len(seed)] + i * 7) % len(_VOCABULARY)]
+            words.append(word if i == 0 else f" {word}")
+        return words
+
+    def stream_generation(
+        self,
+        model: str,
+        request: str,
+        options: Dict[str, Any],
+        chat: bool
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield generate or chat response chunks with realistic timing.
+
+        Args:
+            model: Model name
+            request: Prompt or serialized messages
+            options: Request options (num_predict limits the length)
+            chat: Whether to emit chat-style message chunks
+
+        Yields:
+            Response chunk dictionaries, the last one with statistics
+        """
+        start = time.perf_counter()
+        num_predict = options.get('num_predict') or self.response_tokens
+        if num_predict < 0:
+            num_predict = self.response_tokens
+        tokens = self.generate_tokens(request, min(num_predict, self.response_tokens))
+        prompt_tokens = len(re.findall(r"\w+", request))
+
+        time.sleep(self.ttft)
+        prompt_done = time.perf_counter()
+
+        interval = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(interval)
+            yield self._chunk(model, token, chat, done=False)
+
+        end = time.perf_counter()
+        final = self._chunk(model, '', chat, done=True)
+        final.update({
+            'done_reason': 'stop',
+            'total_duration': int((end - start) * 1e9),
+            'load_duration': 0,
+            'prompt_eval_count': prompt_tokens,
+            'prompt_eval_duration': int((prompt_done - start) * 1e9),
+            'eval_count': len(tokens),
+            'eval_duration': int((end - prompt_done) * 1e9)
+        })
+        yield final
+
+    def _chunk(self, model: str, text: str, chat: bool, done: bool) -> Dict[str, Any]:
+        """Build one response chunk."""
+        chunk = {
+            'model': model,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'done': done
+        }
+        if chat:
+            chunk['message'] = {'role': 'assistant', 'content': text}
+        else:
+            chunk['response'] = text
+        return chunk
+
+    def _handler_class(self):
+        """Create the request handler class bound to this server."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug(f"{self.address_string()} {format % args}")
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server._connections.add(self.connection)
+
+            def finish(self):
+                with server._lock:
+                    server._connections.discard(self.connection)
+                super().finish()
+
+            def _read_json(self) -> Dict[str, Any]:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                return json.loads(body) if body else {}
+
+            def _send_json(self, payload: Any, status: int = 200):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, chunks: Iterator[Dict[str, Any]]):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for chunk in chunks:
+                    line = json.dumps(chunk).encode('utf-8') + b'\n'
+                    self.wfile.write(f"{len(line):x}\r\n".encode('ascii') + line + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _check_model(self, model: str) -> bool:
+                if model in server.models or f"{model}:latest" in server.models:
+                    return True
+                self._send_json({'error': f"model '{model}' not found"}, status=404)
+                return False
+
+            def do_GET(self):
+                if self.path == '/api/tags':
+                    self._send_json({'models': [
+                        {
+                            'name': name,
+                            'model': name,
+                            'size': model.get('size', 0),
+                            'digest': hashlib.sha256(name.encode('utf-8')).hexdigest(),
+                            'modified_at': datetime.now(timezone.utc).isoformat(),
+                            'details': {'format': 'gguf', 'family': name.split(':')[0]}
+                        }
+                        for name, model in server.models.items()
+                    ]})
+                elif self.path == '/api/ps':
+                    with server._lock:
+                        loaded = list(server.loaded)
+                    self._send_json({'models': [
+                        {
+                            'name': name,
+                            'model': name,
+                            'size': server.models.get(name, {}).get('size', 0),
+                            'size_vram': 0
+                        }
+                        for name in loaded
+                    ]})
+                elif self.path == '/api/version':
+                    self._send_json({'version': '0.0.0-fake'})
+                elif self.path == '/':
+                    data = b"Ollama is running"
+                    self.send_response(200)
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                else:
+                    self._send_json({'error': 'not found'}, status=404)
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_POST(self):
+                try:
+                    request = self._read_json()
+                except ValueError:
+                    self._send_json({'error': 'invalid JSON'}, status=400)
+                    return
+
+                handlers = {
+                    '/api/generate': self._generate,
+                    '/api/chat': self._chat,
+                    '/api/embed': self._embed,
+                    '/api/embeddings': self._embeddings,
+                    '/api/pull': self._pull,
+                }
+                handler = handlers.get(self.path)
+                if handler is None:
+                    self._send_json({'error': 'not found'}, status=404)
+                    return
+                handler(request)
+
+            def _respond(self, request: Dict[str, Any], chunks: Iterator[Dict[str, Any]], chat: bool):
+                if request.get('stream', True):
+                    self._send_stream(chunks)
+                    return
+
+                # Non-streaming: concatenate the chunks into one response
+                parts = []
+                final = {}
+                for chunk in chunks:
+                    parts.append(chunk['message']['content'] if chat else chunk['response'])
+                    final = chunk
+                if chat:
+                    final['message'] = {'role': 'assistant', 'content': ''.join(parts)}
+                else:
+                    final['response'] = ''.join(parts)
+                self._send_json(final)
+
+            def _generate(self, request: Dict[str, Any]):
+                model = request.get('model', '')
+                if not self._check_model(model):
+                    return
+                action = server._touch(model, request.get('keep_alive'))
+
+                prompt = request.get('prompt') or ''
+                if not prompt:
+                    # Empty prompt: load or unload the model only
+                    chunk = server._chunk(model, '', chat=False, done=True)
+                    chunk['done_reason'] = action
+                    self._send_json(chunk)
+                    return
+
+                chunks = server.stream_generation(model, prompt, request.get('options') or {}, chat=False)
+                self._respond(request, chunks, chat=False)
+
+            def _chat(self, request: Dict[str, Any]):
+                model = request.get('model', '')
+                if not self._check_model(model):
+                    return
+                action = server._touch(model, request.get('keep_alive'))
+
+                messages = request.get('messages') or []
+                if not messages:
+                    chunk = server._chunk(model, '', chat=True, done=True)
+                    chunk['done_reason'] = action
+                    self._send_json(chunk)
+                    return
+
+                serialized = '\n'.join(f"{m.get('role')}: {m.get('content')}" for m in messages)
+                chunks = server.stream_generation(model, serialized, request.get('options') or {}, chat=True)
+                self._respond(request, chunks, chat=True)
+
+            def _embed(self, request: Dict[str, Any]):
+                model = request.get('model', '')
+                if not self._check_model(model):
+                    return
+                server._touch(model, request.get('keep_alive'))
+
+                texts = request.get('input', [])
+                if isinstance(texts, str):
+                    texts = [texts] if texts else []
+                dim = request.get('dimensions') or server.embedding_dim
+
+                time.sleep(server.embed_latency)
+                self._send_json({
+                    'model': model,
+                    'embeddings': [hash_embedding(text, dim, model) for text in texts],
+                    'prompt_eval_count': sum(len(re.findall(r"\w+", text)) for text in texts)
+                })
+
+            def _embeddings(self, request: Dict[str, Any]):
+                model = request.get('model', '')
+                if not self._check_model(model):
+                    return
+                server._touch(model, request.get('keep_alive'))
+
+                time.sleep(server.embed_latency)
+                self._send_json({
+                    'embedding': hash_embedding(request.get('prompt', ''), server.embedding_dim, model)
+                })
+
+            def _pull(self, request: Dict[str, Any]):
+                model = request.get('model') or request.get('name', '')
+                server.models.setdefault(model, {'name': model, 'size': 1_000_000_000})
+                if request.get('stream', True):
+                    self._send_stream(iter([{'status': 'pulling manifest'}, {'status': 'success'}]))
+                else:
+                    self._send_json({'status': 'success'})
+
+        return Handler
+
+
+def main():
+    """Run the fake Ollama server from the command line."""
+    parser = argparse.ArgumentParser(description="Fake Ollama server for offline testing")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=11435, help="Port to listen on")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=30.0, help="Generation speed")
+    parser.add_argument("--embedding-dim", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--response-tokens", type=int, default=64, help="Tokens per response")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds per embed request")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    server = FakeOllamaServer(
+        host=args.host,
+        port=args.port,
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        embedding_dim=args.embedding_dim,
+        response_tokens=args.response_tokens,
+        embed_latency=args.embed_latency
+    )
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
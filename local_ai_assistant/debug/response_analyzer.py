@@ -14,7 +14,8 @@ from typing import Dict, List, Optional, Any, Union, Tuple
 import yaml
 
 # Local imports
-from local_ai_assistant.models.model_manager import ModelManager
+from local_ai_assistant.models.model_manager import ModelManager, TASK_ANALYSIS
+from local_ai_assistant.models.scheduler import PRIORITY_ANALYSIS
 
 
 # Logger for this module
@@ -476,7 +477,11 @@ JSON RESULT:
         
         try:
             # Use the model manager to check the response
-            result = self.model_manager.generate_text(factuality_prompt)
+            # (temperature 0, so repeated analyses are served from the response cache)
+            result = self.model_manager.generate_text(
+                factuality_prompt, temperature=0, priority=PRIORITY_ANALYSIS,
+                task=TASK_ANALYSIS
+            )
             logger.debug("Generated factual analysis")
             
             # Parse JSON result
@@ -675,7 +680,10 @@ ASSISTANT RESPONSE: {assistant_response}
 IMPROVEMENT SUGGESTIONS:
 """
                 
-                result = self.model_manager.generate_text(improvement_prompt)
+                result = self.model_manager.generate_text(
+                    improvement_prompt, temperature=0, priority=PRIORITY_ANALYSIS,
+                    task=TASK_ANALYSIS
+                )
                 
                 # Extract suggestions (assuming line-by-line format)
                 additional_suggestions = [
@@ -16,7 +16,8 @@ import uuid
 # Local imports
 from local_ai_assistant.document.loader import DocumentLoader
 from local_ai_assistant.memory.vector_store import VectorStore
-from local_ai_assistant.models.model_manager import ModelManager
+from local_ai_assistant.models.model_manager import ModelManager, EmbeddingError
+from local_ai_assistant.models.scheduler import PRIORITY_INDEXING, PRIORITY_INTERACTIVE
 
 
 # Logger for this module
@@ -148,39 +149,60 @@ class DocumentIndexer:
             
             # Generate embeddings for chunks
             chunk_texts = [chunk['text'] for chunk in chunks]
-            embeddings = self.model_manager.generate_embeddings(chunk_texts)
+            failed_chunks = []
+            try:
+                embeddings = self.model_manager.generate_embeddings(
+                    chunk_texts, priority=PRIORITY_INDEXING
+                )
+            except EmbeddingError as e:
+                # Index what was embedded and report the failed chunks
+                embeddings = e.embeddings
+                failed_chunks = sorted(e.failures)
+                for i in failed_chunks:
+                    logger.warning(f"Could not embed chunk {i} of document {doc_id}: {e.failures[i]}")
             
-            # Store chunks in vector store
+            # Store chunks in vector store, saving the store once at the end
             chunk_ids = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                # Create chunk ID
-                chunk_id = f"{doc_id}_chunk_{i}"
-                
-                # Add chunk to vector store
-                self.vector_store.add_to_memory(
-                    text=chunk['text'],
-                    metadata={
-                        **chunk['metadata'],
-                        'doc_id': doc_id,
-                        'chunk_id': chunk_id,
-                        'type': 'document_chunk'
-                    },
-                    embedding=embedding,
-                    id=chunk_id
-                )
-                
-                chunk_ids.append(chunk_id)
+            with self.vector_store.batch_writes():
+                for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+                    if embedding is None:
+                        continue
+                    
+                    # Create chunk ID
+                    chunk_id = f"{doc_id}_chunk_{i}"
+                    
+                    # Add chunk to vector store
+                    self.vector_store.add_to_memory(
+                        text=chunk['text'],
+                        metadata={
+                            **chunk['metadata'],
+                            'doc_id': doc_id,
+                            'chunk_id': chunk_id,
+                            'type': 'document_chunk'
+                        },
+                        embedding=embedding,
+                        id=chunk_id
+                    )
+                    
+                    chunk_ids.append(chunk_id)
             
             # Store document index info
             self.indexed_docs[doc_id] = {
                 'doc_id': doc_id,
                 'chunk_ids': chunk_ids,
-                'chunk_count': len(chunks),
+                'chunk_count': len(chunk_ids),
+                'failed_chunks': failed_chunks,
                 'indexed_at': time.time()
             }
             
-            logger.info(f"Indexed document {doc_id} with {len(chunks)} chunks")
-            return True
+            if failed_chunks:
+                logger.warning(
+                    f"Indexed document {doc_id} with {len(chunk_ids)} chunks, "
+                    f"{len(failed_chunks)} chunks failed to embed"
+                )
+            else:
+                logger.info(f"Indexed document {doc_id} with {len(chunks)} chunks")
+            return bool(chunk_ids)
             
         except Exception as e:
             logger.error(f"Error indexing document {doc_id}: {str(e)}")
@@ -200,12 +222,13 @@ class DocumentIndexer:
             logger.info("No documents to index")
             return 0
         
-        # Index each document
+        # Index each document, saving the vector store once at the end
         success_count = 0
-        for doc in docs:
-            doc_id = doc.get('id')
-            if doc_id and self.index_document(doc_id):
-                success_count += 1
+        with self.vector_store.batch_writes():
+            for doc in docs:
+                doc_id = doc.get('id')
+                if doc_id and self.index_document(doc_id):
+                    success_count += 1
         
         logger.info(f"Indexed {success_count} out of {len(docs)} documents")
         return success_count
@@ -228,7 +251,9 @@ class DocumentIndexer:
             List of matching chunks with text and metadata
         """
         # Generate query embedding
-        query_embedding = self.model_manager.generate_embeddings(query)[0]
+        query_embedding = self.model_manager.generate_embeddings(
+            query, priority=PRIORITY_INTERACTIVE
+        )[0]
         
         # Set up metadata filter if doc_id is provided
         metadata_filter = None
@@ -13,9 +13,7 @@ import yaml
 from pathlib import Path
 
 # Local imports
-from local_ai_assistant.models.model_manager import ModelManager
-from local_ai_assistant.memory.vector_store import VectorStore
-from local_ai_assistant.document.loader import DocumentLoader
+from local_ai_assistant.registry import get_registry
 from local_ai_assistant.cli.interface import CLI
 
 
@@ -73,24 +71,18 @@ def main():
         # Log startup information
         logging.info("Starting Local AI Assistant")
         
-        # Initialize components
-        logging.info("Initializing model manager")
-        model_manager = ModelManager(config_path)
-        
-        logging.info("Initializing vector store")
-        vector_store = VectorStore(config_path)
-        
-        logging.info("Initializing document loader")
-        document_loader = DocumentLoader(config_path)
+        # Initialize shared components (each is built once per process)
+        registry = get_registry(config_path)
         
         # Initialize CLI with components
         debug_enabled = args.debug or config.get('debug', {}).get('enabled', False)
         cli = CLI(
             config_path=config_path,
-            model_manager=model_manager,
-            vector_store=vector_store,
-            document_loader=document_loader,
-            debug_enabled=debug_enabled
+            model_manager=registry.model_manager,
+            vector_store=registry.vector_store,
+            document_loader=registry.document_loader,
+            debug_enabled=debug_enabled,
+            document_indexer=registry.document_indexer
         )
         
         # Run the CLI
@@ -0,0 +1,392 @@
+"""
+In-memory vector index for the mock-mode vector store.
+
+This module provides exact cosine search over stored embeddings with a
+small filter-aware query planner, so selective metadata filters only
+score the rows that can match.
+"""
+
+import logging
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+# Search plans chosen by the planner
+PLAN_FULL = 'full'
+PLAN_MASK = 'mask'
+PLAN_PREFILTER = 'prefilter'
+
+
+class InMemoryIndex:
+    """
+    Exact vector index with per-value postings for metadata filters.
+
+    Rows mirror the order of the vector store's memory items. Embeddings
+    are stored L2-normalized so cosine similarity is a dot product, and
+    for every hashable metadata value the index maintains the rows that
+    carry it. Value counts drive the planner's selectivity estimate.
+
+    With a fixed dimension, wider embeddings and queries are truncated to
+    their leading components (Matryoshka truncation), so an index built
+    from full-size vectors can be reloaded at a reduced dimension.
+    Otherwise the dimension is taken from the first non-zero row; all-zero
+    rows (mock-mode placeholders) score 0 whatever their size.
+    """
+
+    def __init__(self, prefilter_threshold: float = 0.25, dim: Optional[int] = None):
+        """
+        Initialize the index.
+
+        Args:
+            prefilter_threshold: Maximum estimated fraction of matching rows
+                for which the planner gathers and scores only those rows
+            dim: Fixed embedding dimension (None = taken from the first
+                non-zero row)
+        """
+        self.prefilter_threshold = prefilter_threshold
+        self.fixed_dim = dim or None
+        self.dim: Optional[int] = self.fixed_dim
+        self._size = 0
+        self._vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+        self._timestamps = np.zeros(0, dtype=np.float64)
+        self._postings: Dict[Tuple[str, Hashable], List[int]] = {}
+        self._mask_cache: Dict[Tuple[str, Hashable], np.ndarray] = {}
+        self._dim_warning_logged = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def rebuild(self, items: Sequence[Dict[str, Any]]):
+        """
+        Rebuild the index from scratch.
+
+        Args:
+            items: Memory items with 'embedding' and 'metadata' keys
+        """
+        self.dim = self.fixed_dim
+        self._size = 0
+        self._vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+        self._timestamps = np.zeros(0, dtype=np.float64)
+        self._postings = {}
+        self._mask_cache = {}
+
+        for item in items:
+            self.add(item.get('embedding'), item.get('metadata', {}))
+
+        logger.debug(f"Rebuilt in-memory index with {self._size} rows")
+
+    def add(self, embedding: Optional[Sequence[float]], metadata: Dict[str, Any]) -> int:
+        """
+        Append a row to the index.
+
+        Args:
+            embedding: Embedding vector (may be None or empty)
+            metadata: Item metadata
+
+        Returns:
+            Row number of the new item
+        """
+        row = self._size
+        vector = self._truncate(np.asarray(embedding if embedding is not None else [], dtype=np.float32))
+
+        if self.dim is None and vector.any():
+            self.dim = int(vector.size)
+            self._vectors = np.zeros((self._timestamps.shape[0], self.dim), dtype=np.float32)
+
+        self._ensure_capacity(row + 1)
+
+        if vector.size and vector.size == self.dim:
+            norm = np.linalg.norm(vector)
+            self._vectors[row] = vector / norm if norm else vector
+        elif vector.any() and not self._dim_warning_logged:
+            logger.warning(
+                f"Embedding dimension {vector.size} does not match index dimension "
+                f"{self.dim}; such rows will score 0"
+            )
+            self._dim_warning_logged = True
+
+        self._timestamps[row] = float(metadata.get('timestamp', 0) or 0)
+        self._index_metadata(row, metadata)
+
+        self._mask_cache.clear()
+        self._size += 1
+        return row
+
+    def attach(self, vectors: np.ndarray, metadatas: Sequence[Dict[str, Any]]):
+        """
+        Attach a pre-built embedding matrix without copying it.
+
+        Used for read-only (e.g. memory-mapped) matrices published by
+        another process. Rows must already be L2-normalized.
+
+        Args:
+            vectors: Matrix with one row per item
+            metadatas: Metadata for each row
+        """
+        self.rebuild([])
+        self._size = len(metadatas)
+        self._timestamps = np.array(
+            [float(m.get('timestamp', 0) or 0) for m in metadatas], dtype=np.float64
+        )
+
+        if vectors.ndim == 2 and vectors.shape[1]:
+            if self.fixed_dim and vectors.shape[1] != self.fixed_dim:
+                logger.warning(
+                    f"Attached embeddings have dimension {vectors.shape[1]}, "
+                    f"not the configured {self.fixed_dim}"
+                )
+            self.dim = int(vectors.shape[1])
+            self._vectors = vectors
+
+        for row, metadata in enumerate(metadatas):
+            self._index_metadata(row, metadata)
+
+        logger.debug(f"Attached {self._size} rows to in-memory index")
+
+    def _truncate(self, vector: np.ndarray) -> np.ndarray:
+        """Cut a vector wider than the fixed dimension to its leading components."""
+        if self.fixed_dim and vector.ndim == 1 and vector.size > self.fixed_dim:
+            return vector[:self.fixed_dim]
+        return vector
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Normalized embedding matrix of the stored rows (a view)."""
+        if self.dim is None:
+            return np.zeros((self._size, 0), dtype=np.float32)
+        return self._vectors[:self._size]
+
+    def _index_metadata(self, row: int, metadata: Dict[str, Any]):
+        """Add a row to the postings of its hashable metadata values."""
+        for key, value in metadata.items():
+            try:
+                posting_key = (key, value)
+                hash(posting_key)
+            except TypeError:
+                continue
+            self._postings.setdefault(posting_key, []).append(row)
+
+    def _ensure_capacity(self, n: int):
+        """Grow the row buffers geometrically to hold at least n rows."""
+        capacity = self._timestamps.shape[0]
+        if self.dim is not None:
+            capacity = min(capacity, self._vectors.shape[0])
+        if n <= capacity:
+            return
+
+        new_capacity = max(n, capacity * 2, 64)
+
+        timestamps = np.zeros(new_capacity, dtype=np.float64)
+        timestamps[:self._size] = self._timestamps[:self._size]
+        self._timestamps = timestamps
+
+        if self.dim is not None:
+            vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+            vectors[:self._size] = self._vectors[:self._size]
+            self._vectors = vectors
+
+    def value_count(self, key: str, value: Any) -> int:
+        """
+        Number of rows whose metadata has key == value.
+
+        Args:
+            key: Metadata key
+            value: Metadata value
+
+        Returns:
+            Row count (0 for unknown or unhashable values)
+        """
+        return len(self._posting(key, value))
+
+    def _posting(self, key: str, value: Any) -> List[int]:
+        """Get the rows carrying key == value (empty if unhashable)."""
+        try:
+            return self._postings.get((key, value), [])
+        except TypeError:
+            return []
+
+    def _mask_for(self, key: str, value: Any) -> np.ndarray:
+        """Get the cached boolean row mask for key == value."""
+        try:
+            posting_key = (key, value)
+            mask = self._mask_cache.get(posting_key)
+        except TypeError:
+            return np.zeros(self._size, dtype=bool)
+        if mask is None:
+            mask = np.zeros(self._size, dtype=bool)
+            mask[self._posting(key, value)] = True
+            self._mask_cache[posting_key] = mask
+        return mask
+
+    def _values(self, condition: Any) -> List[Any]:
+        """Get the accepted values of a predicate (value or {'$in': [...]})."""
+        if isinstance(condition, dict) and '$in' in condition:
+            return list(condition['$in'])
+        return [condition]
+
+    def _predicate_count(self, key: str, condition: Any) -> int:
+        """Number of rows matching a single predicate."""
+        return sum(self.value_count(key, value) for value in self._values(condition))
+
+    def _predicate_rows(self, key: str, condition: Any) -> np.ndarray:
+        """Get the sorted rows matching a single predicate."""
+        postings = [self._posting(key, value) for value in self._values(condition)]
+        if not postings:
+            return np.zeros(0, dtype=np.intp)
+        if len(postings) == 1:
+            return np.asarray(postings[0], dtype=np.intp)
+        return np.unique(np.concatenate([np.asarray(p, dtype=np.intp) for p in postings]))
+
+    def _predicate_mask(self, key: str, condition: Any) -> np.ndarray:
+        """Get the boolean row mask for a single predicate."""
+        values = self._values(condition)
+        mask = self._mask_for(key, values[0]) if values else np.zeros(self._size, dtype=bool)
+        for value in values[1:]:
+            mask = mask | self._mask_for(key, value)
+        return mask
+
+    def plan(self, metadata_filter: Optional[Dict[str, Any]]) -> str:
+        """
+        Choose a search plan for a metadata filter.
+
+        The estimated match count is the smallest row count among the
+        filter's predicates (an upper bound on their intersection).
+
+        Args:
+            metadata_filter: Filter on metadata fields; each value is either
+                matched for equality or an {'$in': [...]} list
+
+        Returns:
+            One of PLAN_FULL, PLAN_MASK or PLAN_PREFILTER
+        """
+        if not metadata_filter or not self._size:
+            return PLAN_FULL
+
+        estimate = min(self._predicate_count(k, c) for k, c in metadata_filter.items())
+        if estimate <= self.prefilter_threshold * self._size:
+            return PLAN_PREFILTER
+        return PLAN_MASK
+
+    def _candidate_rows(self, metadata_filter: Dict[str, Any]) -> np.ndarray:
+        """Intersect the rows of all predicates, most selective first."""
+        predicates = sorted(
+            metadata_filter.items(),
+            key=lambda kc: self._predicate_count(*kc)
+        )
+        rows = self._predicate_rows(*predicates[0])
+        for key, condition in predicates[1:]:
+            if not rows.size:
+                break
+            rows = np.intersect1d(rows, self._predicate_rows(key, condition), assume_unique=True)
+        return rows
+
+    def search(
+        self,
+        query_embedding: Optional[Sequence[float]],
+        n_results: int,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the rows most similar to a query.
+
+        Ties (including the all-zero case when no usable query embedding
+        is available) are broken by recency.
+
+        Args:
+            query_embedding: Query vector, or None to rank by recency
+            n_results: Maximum number of results
+            metadata_filter: Optional filter on metadata fields
+
+        Returns:
+            List of (row, cosine similarity) pairs, best first
+        """
+        return self.search_batch([query_embedding], n_results, metadata_filter)[0]
+
+    def search_batch(
+        self,
+        query_embeddings: Sequence[Optional[Sequence[float]]],
+        n_results: int,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Find the rows most similar to each of several queries.
+
+        The filter is planned once and all queries are scored together
+        with a single matrix product over the candidate rows.
+
+        Args:
+            query_embeddings: Query vectors (None entries rank by recency)
+            n_results: Maximum number of results per query
+            metadata_filter: Optional filter on metadata fields
+
+        Returns:
+            One list of (row, cosine similarity) pairs per query, best first
+        """
+        n_queries = len(query_embeddings)
+        if not self._size or n_results <= 0 or not n_queries:
+            return [[] for _ in range(n_queries)]
+
+        plan = self.plan(metadata_filter)
+
+        if plan == PLAN_PREFILTER:
+            rows = self._candidate_rows(metadata_filter)
+        else:
+            rows = np.arange(self._size, dtype=np.intp)
+            if plan == PLAN_MASK:
+                mask = np.ones(self._size, dtype=bool)
+                for key, condition in metadata_filter.items():
+                    mask &= self._predicate_mask(key, condition)
+                rows = rows[mask]
+
+        if not rows.size:
+            return [[] for _ in range(n_queries)]
+
+        # Queries as columns; unusable queries stay all-zero (recency order)
+        queries = np.zeros((self.dim or 0, n_queries), dtype=np.float32)
+        for j, query_embedding in enumerate(query_embeddings):
+            query = self._prepare_query(query_embedding)
+            if query is not None:
+                queries[:, j] = query
+
+        if self.dim is None:
+            scores = np.zeros((rows.size, n_queries), dtype=np.float32)
+        elif plan == PLAN_PREFILTER:
+            scores = self._vectors[rows] @ queries
+        else:
+            # Score every row once and keep the filtered ones
+            scores = (self._vectors[:self._size] @ queries)[rows]
+
+        # Sort by score, then recency (lexsort uses the last key as primary)
+        k = min(n_results, rows.size)
+        recency = -self._timestamps[rows]
+        results = []
+        for j in range(n_queries):
+            column = scores[:, j]
+            order = np.lexsort((recency, -column))[:k]
+            results.append([(int(rows[i]), float(column[i])) for i in order])
+
+        logger.debug(
+            f"In-memory search: plan={plan}, queries={n_queries}, "
+            f"scored={rows.size}, returned={k}"
+        )
+        return results
+
+    def _prepare_query(self, query_embedding: Optional[Sequence[float]]) -> Optional[np.ndarray]:
+        """Normalize a query vector, or return None if it cannot be scored."""
+        if query_embedding is None or self.dim is None:
+            return None
+
+        query = self._truncate(np.asarray(query_embedding, dtype=np.float32))
+        if query.size != self.dim:
+            logger.warning(
+                f"Query embedding dimension {query.size} does not match index "
+                f"dimension {self.dim}; ranking by recency"
+            )
+            return None
+
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
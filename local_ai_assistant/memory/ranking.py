@@ -0,0 +1,137 @@
+"""
+Ranking module for recency-weighted memory retrieval.
+
+This module combines vector similarity with an exponential time decay
+computed from stored timestamps, so relevant and recent messages can be
+ranked in a single list.
+"""
+
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+
+def time_decay_scores(
+    similarities: np.ndarray,
+    timestamps: np.ndarray,
+    now: float,
+    half_life_seconds: float,
+    recency_weight: float
+) -> np.ndarray:
+    """
+    Blend similarity with exponential time decay.
+
+    score = (1 - w) * similarity + w * 0.5 ** (age / half_life)
+
+    Args:
+        similarities: Cosine similarities of the candidates
+        timestamps: Candidate timestamps (seconds since the epoch)
+        now: Reference time for computing ages
+        half_life_seconds: Age at which the recency term halves
+        recency_weight: Weight w of the recency term (0 to 1)
+
+    Returns:
+        Array of combined scores
+    """
+    ages = np.maximum(now - timestamps, 0.0)
+    if half_life_seconds > 0:
+        decay = np.exp(-math.log(2) * ages / half_life_seconds)
+    else:
+        decay = np.zeros_like(ages)
+    return (1.0 - recency_weight) * similarities + recency_weight * decay
+
+
+class RecencyRanker:
+    """
+    Re-ranks retrieved memory items by similarity and recency.
+
+    The ranker works on any candidate list carrying a cosine 'distance'
+    and a 'timestamp' in its metadata, so it applies equally to ChromaDB
+    and in-memory search results.
+    """
+
+    def __init__(
+        self,
+        recency_weight: float = 0.3,
+        half_life_hours: float = 24.0
+    ):
+        """
+        Initialize the ranker.
+
+        Args:
+            recency_weight: Weight of the time-decay term (0 = similarity only)
+            half_life_hours: Half-life of the time decay in hours
+        """
+        self.recency_weight = min(max(float(recency_weight), 0.0), 1.0)
+        self.half_life_seconds = float(half_life_hours) * 3600.0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RecencyRanker":
+        """
+        Create a ranker from the 'memory.ranking' config section.
+
+        Args:
+            config: Full configuration dictionary
+
+        Returns:
+            Configured RecencyRanker
+        """
+        ranking_config = config.get('memory', {}).get('ranking', {}) or {}
+        return cls(
+            recency_weight=ranking_config.get('recency_weight', 0.3),
+            half_life_hours=ranking_config.get('half_life_hours', 24.0)
+        )
+
+    def rank(
+        self,
+        items: List[Dict[str, Any]],
+        n_results: int,
+        now: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank candidate items and keep the best n.
+
+        Args:
+            items: Candidate items with 'distance' and metadata timestamps
+            n_results: Number of items to keep
+            now: Reference time (defaults to the current time)
+
+        Returns:
+            The top items, best first, each with an added 'score'
+        """
+        if not items or n_results <= 0:
+            return []
+
+        now = time.time() if now is None else now
+
+        similarities = np.array(
+            [1.0 - (item.get('distance', 1.0) or 0.0) for item in items],
+            dtype=np.float64
+        )
+        timestamps = np.array(
+            [item.get('metadata', {}).get('timestamp', 0) or 0 for item in items],
+            dtype=np.float64
+        )
+
+        scores = time_decay_scores(
+            similarities, timestamps, now, self.half_life_seconds, self.recency_weight
+        )
+
+        # Best score first; newer items win ties
+        order = np.lexsort((-timestamps, -scores))[:n_results]
+
+        ranked = []
+        for i in order:
+            item = dict(items[i])
+            item['score'] = float(scores[i])
+            ranked.append(item)
+
+        logger.debug(f"Ranked {len(items)} candidates, kept {len(ranked)}")
+        return ranked
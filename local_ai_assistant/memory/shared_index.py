@@ -0,0 +1,193 @@
+"""
+Shared index module for multi-process access to in-memory memory.
+
+A single writer process publishes the embedding matrix and metadata
+columns as memory-mapped files under a generation counter; reader
+processes attach to the latest generation zero-copy and pick up new
+generations without reloading the JSON store.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+import numpy as np
+
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+
+def _atomic_write_bytes(path: Path, data: bytes):
+    """Write a file atomically via a temporary file and rename."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SharedIndexPublisher:
+    """
+    Publishes index generations for reader processes.
+
+    Each generation consists of '<name>.<gen>.npy' (float32 embedding
+    matrix) and '<name>.<gen>.json' (ids, texts and metadata columns).
+    The '<name>.generation' file is updated last, so readers never see
+    a partially written generation.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        name: str,
+        keep_generations: int = 2
+    ):
+        """
+        Initialize the publisher.
+
+        Args:
+            directory: Directory holding the shared files
+            name: Collection name used as file prefix
+            keep_generations: Number of generations kept on disk
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.keep_generations = max(1, keep_generations)
+        self.generation = read_generation(self.directory, self.name)
+
+    def publish(self, vectors: np.ndarray, items: List[Dict[str, Any]]) -> int:
+        """
+        Publish a new generation.
+
+        Args:
+            vectors: Normalized embedding matrix, one row per item
+            items: Memory items in row order
+
+        Returns:
+            The published generation number
+        """
+        generation = self.generation + 1
+
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        vectors_path = self.directory / f"{self.name}.{generation}.npy"
+        tmp_path = vectors_path.with_name(f".{vectors_path.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, vectors_path)
+
+        columns = {
+            'ids': [item.get('id') for item in items],
+            'texts': [item.get('text', '') for item in items],
+            'metadatas': [item.get('metadata', {}) for item in items]
+        }
+        columns_path = self.directory / f"{self.name}.{generation}.json"
+        _atomic_write_bytes(columns_path, json.dumps(columns).encode('utf-8'))
+
+        # Flip the generation counter last
+        _atomic_write_bytes(
+            self.directory / f"{self.name}.generation",
+            str(generation).encode('utf-8')
+        )
+        self.generation = generation
+
+        self._remove_old_generations()
+        logger.debug(f"Published shared index generation {generation} ({len(items)} items)")
+        return generation
+
+    def _remove_old_generations(self):
+        """Delete generations older than the retention window."""
+        oldest_kept = self.generation - self.keep_generations + 1
+        for path in self.directory.glob(f"{self.name}.*.*"):
+            parts = path.name[len(self.name) + 1:].split('.')
+            if len(parts) == 2 and parts[0].isdigit() and int(parts[0]) < oldest_kept:
+                try:
+                    # Readers that mapped the file keep their mapping
+                    path.unlink()
+                except OSError as e:
+                    logger.debug(f"Could not remove {path}: {str(e)}")
+
+
+class SharedIndexReader:
+    """
+    Attaches to generations published by a SharedIndexPublisher.
+
+    The embedding matrix is memory-mapped read-only, so all reader
+    processes share the same physical pages.
+    """
+
+    def __init__(self, directory: Union[str, Path], name: str):
+        """
+        Initialize the reader.
+
+        Args:
+            directory: Directory holding the shared files
+            name: Collection name used as file prefix
+        """
+        self.directory = Path(directory)
+        self.name = name
+        self.generation = 0
+        self.vectors: np.ndarray = np.zeros((0, 0), dtype=np.float32)
+        self.items: List[Dict[str, Any]] = []
+
+    def refresh(self) -> bool:
+        """
+        Attach to the latest generation if it changed.
+
+        Returns:
+            True if a new generation was attached, False otherwise
+        """
+        generation = read_generation(self.directory, self.name)
+        if generation <= self.generation:
+            return False
+
+        try:
+            vectors = np.load(
+                self.directory / f"{self.name}.{generation}.npy",
+                mmap_mode='r'
+            )
+            with open(self.directory / f"{self.name}.{generation}.json", 'r') as f:
+                columns = json.load(f)
+        except (OSError, ValueError) as e:
+            # The generation may have been superseded and removed meanwhile
+            logger.warning(f"Could not attach shared index generation {generation}: {str(e)}")
+            return False
+
+        self.items = [
+            {
+                'id': item_id,
+                'text': text,
+                'metadata': metadata,
+                'embedding': vectors[row] if vectors.ndim == 2 and vectors.shape[1] else None
+            }
+            for row, (item_id, text, metadata) in enumerate(
+                zip(columns['ids'], columns['texts'], columns['metadatas'])
+            )
+        ]
+        self.vectors = vectors
+        self.generation = generation
+
+        logger.info(f"Attached shared index generation {generation} ({len(self.items)} items)")
+        return True
+
+
+def read_generation(directory: Union[str, Path], name: str) -> int:
+    """
+    Read the latest published generation number.
+
+    Args:
+        directory: Directory holding the shared files
+        name: Collection name used as file prefix
+
+    Returns:
+        Generation number (0 if nothing has been published)
+    """
+    try:
+        with open(Path(directory) / f"{name}.generation", 'r') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
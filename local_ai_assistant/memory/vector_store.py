@@ -10,8 +10,10 @@ import json
 import os
 import time
 import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union, Tuple
+from typing import Dict, Iterator, List, Optional, Any, Union, Tuple
+import numpy as np
 import yaml
 
 # Try importing ChromaDB, but don't fail if it's not available
@@ -23,12 +25,31 @@ except ImportError:
 
 # Local imports
 from local_ai_assistant.models.model_manager import ModelManager
+from local_ai_assistant.models.scheduler import PRIORITY_INTERACTIVE
+from local_ai_assistant.models.vectors import Embedding
+from local_ai_assistant.memory.index import InMemoryIndex
+from local_ai_assistant.memory.ranking import RecencyRanker
+from local_ai_assistant.memory.shared_index import SharedIndexPublisher, SharedIndexReader
 
 
 # Logger for this module
 logger = logging.getLogger(__name__)
 
 
+def _json_default(value: Any) -> Any:
+    """Serialize embedding arrays in memory items as JSON lists."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _chroma_vector(embedding: Embedding) -> List[float]:
+    """Convert an embedding to the list of Python floats ChromaDB accepts."""
+    if isinstance(embedding, np.ndarray):
+        return embedding.tolist()
+    return [float(x) for x in embedding]
+
+
 class VectorStore:
     """
     Vector database for persistent memory storage.
@@ -37,12 +58,17 @@ class VectorStore:
     memory and document chunks using a vector database.
     """
     
-    def __init__(self, config_path: Union[str, Path]):
+    def __init__(
+        self,
+        config_path: Union[str, Path],
+        model_manager: Optional[ModelManager] = None
+    ):
         """
         Initialize the vector store.
         
         Args:
             config_path: Path to the configuration file
+            model_manager: Optional shared model manager for embeddings
         """
         self.config_path = Path(config_path)
         
@@ -63,16 +89,40 @@ class VectorStore:
         # Distance metric
         self.distance_metric = memory_config.get('distance_metric', 'cosine')
         
-        # Initialize model manager (needed for embeddings)
-        self.model_manager = None
+        # Embedding dimension (model.embedding_dim; None = the model's full size)
+        self.embedding_dim = self.config.get('model', {}).get('embedding_dim') or None
+        
+        # Model manager (needed for embeddings), resolved lazily if not shared
+        self.model_manager = model_manager
+        
+        # Recency-weighted ranking stage for conversation context
+        self.ranker = RecencyRanker.from_config(self.config)
         
         # Initialize ChromaDB client and collection if available
         self.chromadb_available = CHROMADB_AVAILABLE
         self.client = None
         self.collection = None
         
-        # For mock mode, use a simple in-memory list
+        # For mock mode, use a simple in-memory list plus an exact vector index
         self.memory_items = []
+        self.index = InMemoryIndex(
+            prefilter_threshold=memory_config.get('prefilter_threshold', 0.25),
+            dim=self.embedding_dim
+        )
+        
+        # Optional sharing of the in-memory index between processes:
+        # 'writer' publishes generations, 'reader' attaches to them read-only
+        shared_config = memory_config.get('shared_index', {}) or {}
+        self.shared_mode = shared_config.get('mode', 'off')
+        self.shared_directory = Path(
+            shared_config.get('directory', self.persist_directory / 'shared')
+        )
+        self._shared_publisher = None
+        self._shared_reader = None
+        
+        # Nesting depth of batch_writes blocks, and whether one has unsaved items
+        self._batch_depth = 0
+        self._batch_dirty = False
         
         # Initialize ChromaDB if available
         if self.chromadb_available:
@@ -86,18 +136,32 @@ class VectorStore:
                 logger.warning("Running in mock mode with in-memory storage")
         else:
             logger.warning("ChromaDB not available. Running in mock mode with in-memory storage")
+            
+            if self.shared_mode == 'writer':
+                self._shared_publisher = SharedIndexPublisher(
+                    self.shared_directory,
+                    self.collection_name,
+                    keep_generations=shared_config.get('keep_generations', 2)
+                )
+            elif self.shared_mode == 'reader':
+                self._shared_reader = SharedIndexReader(self.shared_directory, self.collection_name)
+            
             # Try to load existing items from disk in mock mode
             self._load_memory_items()
+            
+            if self._shared_publisher is not None:
+                self._publish_shared_index()
     
     def _ensure_embedding_generator(self):
         """
         Make sure we have a model manager for generating embeddings.
         
-        This is initialized lazily to avoid circular imports.
+        Falls back to the process-wide registry so a standalone vector
+        store never builds a second ModelManager.
         """
         if self.model_manager is None:
-            from local_ai_assistant.models.model_manager import ModelManager
-            self.model_manager = ModelManager(self.config_path)
+            from local_ai_assistant.registry import get_registry
+            self.model_manager = get_registry(self.config_path).model_manager
     
     def _get_or_create_collection(self):
         """Get or create the ChromaDB collection."""
@@ -107,18 +171,33 @@ class VectorStore:
                 name=self.collection_name,
                 embedding_function=None  # We'll handle embeddings ourselves
             )
-            return collection
         except Exception:
             # Create new collection
-            collection = self.client.create_collection(
+            metadata = {"distance_metric": self.distance_metric}
+            if self.embedding_dim:
+                metadata["embedding_dim"] = self.embedding_dim
+            return self.client.create_collection(
                 name=self.collection_name,
                 embedding_function=None,
-                metadata={"distance_metric": self.distance_metric}
+                metadata=metadata
+            )
+        
+        # ChromaDB fixes a collection's dimension when the first vector is added
+        stored_dim = (collection.metadata or {}).get("embedding_dim")
+        if self.embedding_dim and stored_dim and stored_dim != self.embedding_dim:
+            logger.warning(
+                f"Collection {self.collection_name} holds {stored_dim}-dimensional embeddings "
+                f"but model.embedding_dim is {self.embedding_dim}; use a new collection_name "
+                f"or re-index"
             )
-            return collection
+        return collection
     
     def _load_memory_items(self):
         """Load memory items from disk in mock mode."""
+        if self._shared_reader is not None:
+            self._refresh_shared_index()
+            return
+        
         try:
             memory_file = self.persist_directory / f"{self.collection_name}.json"
             if memory_file.exists():
@@ -128,22 +207,93 @@ class VectorStore:
         except Exception as e:
             logger.error(f"Error loading memory items: {str(e)}")
             self.memory_items = []
+        
+        # Items stored at full size are truncated to the configured dimension
+        # (and saved that way on the next write)
+        if self.embedding_dim:
+            for item in self.memory_items:
+                embedding = item.get('embedding')
+                if embedding is not None and len(embedding) > self.embedding_dim:
+                    item['embedding'] = embedding[:self.embedding_dim]
+        
+        self.index.rebuild(self.memory_items)
             
     def _save_memory_items(self):
-        """Save memory items to disk in mock mode."""
+        """Save memory items to disk in mock mode (deferred inside batch_writes)."""
+        if self._batch_depth:
+            self._batch_dirty = True
+            return
+        
         try:
             memory_file = self.persist_directory / f"{self.collection_name}.json"
             with open(memory_file, 'w') as f:
-                json.dump(self.memory_items, f)
+                json.dump(self.memory_items, f, default=_json_default)
             logger.debug(f"Saved {len(self.memory_items)} items to {memory_file}")
         except Exception as e:
             logger.error(f"Error saving memory items: {str(e)}")
+        
+        if self._shared_publisher is not None:
+            self._publish_shared_index()
+    
+    @contextmanager
+    def batch_writes(self) -> Iterator[None]:
+        """
+        Save memory items once, when the block ends, instead of after every write.
+        
+        In mock mode every write rewrites the memory file and publishes a
+        new shared index generation, so adding many items (e.g. the chunks
+        of a document) should happen inside one batch.
+        
+        Yields:
+            None
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._batch_dirty:
+                self._batch_dirty = False
+                self._save_memory_items()
+    
+    def _publish_shared_index(self):
+        """Publish the current in-memory index for reader processes."""
+        try:
+            self._shared_publisher.publish(self.index.vectors, self.memory_items)
+        except Exception as e:
+            logger.error(f"Error publishing shared index: {str(e)}")
+    
+    def _refresh_shared_index(self):
+        """Attach to a newer shared index generation, if one was published."""
+        if self._shared_reader is None or not self._shared_reader.refresh():
+            return
+        
+        self.memory_items = self._shared_reader.items
+        self.index.attach(
+            self._shared_reader.vectors,
+            [item['metadata'] for item in self.memory_items]
+        )
+    
+    def _is_read_only(self, action: str) -> bool:
+        """
+        Check whether writes are disabled (shared index reader mode).
+        
+        Args:
+            action: Description of the attempted write, for logging
+            
+        Returns:
+            True if the store is read-only
+        """
+        if self._shared_reader is not None and not self.chromadb_available:
+            logger.warning(f"Vector store is a read-only shared index reader; skipped {action}")
+            return True
+        return False
     
     def add_to_memory(
         self,
         text: str,
         metadata: Optional[Dict[str, Any]] = None,
-        embedding: Optional[List[float]] = None,
+        embedding: Optional[Embedding] = None,
         id: Optional[str] = None
     ) -> str:
         """
@@ -152,7 +302,8 @@ class VectorStore:
         Args:
             text: Text content to store
             metadata: Optional metadata for the item
-            embedding: Optional pre-computed embedding vector
+            embedding: Optional pre-computed embedding vector (float32 row
+                from generate_embeddings; stored without copying)
             id: Optional ID for the item (generated if not provided)
             
         Returns:
@@ -181,7 +332,7 @@ class VectorStore:
                 # Add to ChromaDB collection
                 self.collection.add(
                     ids=[id],
-                    embeddings=[embedding],
+                    embeddings=[_chroma_vector(embedding)],
                     metadatas=[metadata],
                     documents=[text]
                 )
@@ -194,6 +345,9 @@ class VectorStore:
                 logger.warning("Falling back to in-memory storage")
                 self.chromadb_available = False
         
+        if self._is_read_only(f"adding item {id}"):
+            return id
+        
         # Mock mode: store in memory list
         self.memory_items.append({
             'id': id,
@@ -201,6 +355,7 @@ class VectorStore:
             'embedding': embedding,
             'metadata': metadata
         })
+        self.index.add(embedding, metadata)
         
         # Save to disk in mock mode
         self._save_memory_items()
@@ -227,6 +382,9 @@ class VectorStore:
         Returns:
             Tuple of (user_id, assistant_id)
         """
+        if not self.chromadb_available and self._is_read_only("adding conversation pair"):
+            return '', ''
+        
         # Ensure metadata dictionaries
         if user_metadata is None:
             user_metadata = {}
@@ -248,17 +406,18 @@ class VectorStore:
         embeddings = self.model_manager.generate_embeddings([user_message, assistant_response])
         
         # Add messages to memory
-        user_id = self.add_to_memory(
-            text=user_message,
-            metadata=user_metadata,
-            embedding=embeddings[0]
-        )
-        
-        assistant_id = self.add_to_memory(
-            text=assistant_response,
-            metadata=assistant_metadata,
-            embedding=embeddings[1]
-        )
+        with self.batch_writes():
+            user_id = self.add_to_memory(
+                text=user_message,
+                metadata=user_metadata,
+                embedding=embeddings[0]
+            )
+            
+            assistant_id = self.add_to_memory(
+                text=assistant_response,
+                metadata=assistant_metadata,
+                embedding=embeddings[1]
+            )
         
         logger.debug(f"Added conversation pair to memory: {user_id}, {assistant_id}")
         return user_id, assistant_id
@@ -268,7 +427,7 @@ class VectorStore:
         query_text: str,
         n_results: int = 5,
         metadata_filter: Optional[Dict[str, Any]] = None,
-        embedding: Optional[List[float]] = None
+        embedding: Optional[Embedding] = None
     ) -> List[Dict[str, Any]]:
         """
         Search memory for items related to the query.
@@ -282,32 +441,86 @@ class VectorStore:
         Returns:
             List of matching items with their texts, metadata, and IDs
         """
-        # Generate embedding if not provided
-        if embedding is None and query_text:
+        return self.search_memory_batch(
+            queries=[query_text],
+            n_results=n_results,
+            metadata_filter=metadata_filter,
+            embeddings=[embedding]
+        )[0]
+    
+    def search_memory_batch(
+        self,
+        queries: Optional[List[str]] = None,
+        n_results: int = 5,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        embeddings: Optional[List[Optional[Embedding]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search memory for several queries at once.
+        
+        Missing query embeddings are generated in a single batch, and all
+        queries are scored together (one multi-embedding ChromaDB query or
+        one matrix product in mock mode).
+        
+        Args:
+            queries: Texts to search for
+            n_results: Maximum number of results per query
+            metadata_filter: Optional filter for metadata fields
+            embeddings: Optional pre-computed query embeddings (entries may
+                be None where the text should be embedded)
+            
+        Returns:
+            One list of matching items per query, in query order
+        """
+        if queries is None and embeddings is None:
+            return []
+        
+        n_queries = len(queries) if queries is not None else len(embeddings)
+        queries = list(queries) if queries is not None else [''] * n_queries
+        embeddings = list(embeddings) if embeddings is not None else [None] * n_queries
+        
+        if len(queries) != len(embeddings):
+            raise ValueError("queries and embeddings must have the same length")
+        
+        # Generate all missing embeddings in one call
+        missing = [i for i in range(n_queries) if embeddings[i] is None and queries[i]]
+        if missing:
             self._ensure_embedding_generator()
-            embedding = self.model_manager.generate_embeddings(query_text)[0]
+            generated = self.model_manager.generate_embeddings(
+                [queries[i] for i in missing], priority=PRIORITY_INTERACTIVE
+            )
+            for i, embedding in zip(missing, generated):
+                embeddings[i] = embedding
+        
+        results: List[List[Dict[str, Any]]] = [[] for _ in range(n_queries)]
+        pending = list(range(n_queries))
         
-        if self.chromadb_available and embedding is not None:
+        embedded = [i for i in pending if embeddings[i] is not None]
+        if self.chromadb_available and embedded:
             try:
-                # Search ChromaDB
+                # Search ChromaDB with all query embeddings at once
                 where = metadata_filter if metadata_filter else None
-                results = self.collection.query(
-                    query_embeddings=[embedding],
+                chroma_results = self.collection.query(
+                    query_embeddings=[_chroma_vector(embeddings[i]) for i in embedded],
                     n_results=n_results,
                     where=where
                 )
                 
                 # Format results
-                items = []
-                for i in range(len(results['ids'][0])):
-                    items.append({
-                        'id': results['ids'][0][i],
-                        'text': results['documents'][0][i],
-                        'metadata': results['metadatas'][0][i],
-                        'distance': results.get('distances', [[0] * len(results['ids'][0])])[0][i]
-                    })
+                for q, i in enumerate(embedded):
+                    ids = chroma_results['ids'][q]
+                    distances = (chroma_results.get('distances') or [[0] * len(ids)] * len(embedded))[q]
+                    results[i] = [
+                        {
+                            'id': ids[j],
+                            'text': chroma_results['documents'][q][j],
+                            'metadata': chroma_results['metadatas'][q][j],
+                            'distance': distances[j]
+                        }
+                        for j in range(len(ids))
+                    ]
                 
-                return items
+                pending = [i for i in pending if embeddings[i] is None]
             except Exception as e:
                 logger.error(f"Error searching ChromaDB: {str(e)}")
                 
@@ -315,31 +528,25 @@ class VectorStore:
                 logger.warning("Falling back to in-memory search")
                 self.chromadb_available = False
         
-        # Mock mode: simple in-memory search
-        # In a real implementation, we'd calculate embedding similarity
-        # For this mock version, just do basic filtering
-        filtered_items = self.memory_items
+        if not pending:
+            return results
         
-        # Apply metadata filter if provided
-        if metadata_filter:
-            filtered_items = []
-            for item in self.memory_items:
-                match = True
-                for key, value in metadata_filter.items():
-                    if key not in item['metadata'] or item['metadata'][key] != value:
-                        match = False
-                        break
-                if match:
-                    filtered_items.append(item)
-        
-        # Sort by recency (as a simple approximation of relevance)
-        filtered_items.sort(
-            key=lambda x: x['metadata'].get('timestamp', 0), 
-            reverse=True
+        # Mock mode: exact in-memory search (ties broken by recency)
+        self._refresh_shared_index()
+        matches = self.index.search_batch(
+            [embeddings[i] for i in pending], n_results, metadata_filter
         )
+        for i, query_matches in zip(pending, matches):
+            for row, similarity in query_matches:
+                item = self.memory_items[row]
+                results[i].append({
+                    'id': item['id'],
+                    'text': item['text'],
+                    'metadata': item['metadata'],
+                    'distance': 1.0 - similarity
+                })
         
-        # Return the requested number of items
-        return filtered_items[:n_results]
+        return results
     
     def get_conversation_context(
         self,
@@ -350,7 +557,12 @@ class VectorStore:
         """
         Get conversation context for the current query.
         
-        This combines semantically relevant and recent messages.
+        The search hits for the query and the include_recent latest
+        messages form one candidate set, ranked by similarity blended with
+        an exponential time decay. The latest messages are always kept (a
+        follow-up usually refers to the last turn even when it shares no
+        words with it); the best ranked other messages fill the remaining
+        n_relevant slots.
         
         Args:
             query_text: Current query text
@@ -360,34 +572,27 @@ class VectorStore:
         Returns:
             List of context items sorted in chronological order
         """
-        # Get recent items
-        recent_items = self.get_recent_messages(include_recent)
+        recent_items = self.get_recent_messages(include_recent) if include_recent > 0 else []
         
-        # Get relevant items based on query
-        relevant_items = []
-        if query_text:
-            relevant_items = self.search_memory(
-                query_text=query_text, 
-                n_results=n_relevant
-            )
+        # Without a query there is nothing to rank against
+        if not query_text or n_relevant <= 0:
+            return recent_items
         
-        # Combine, ensuring no duplicates
-        context_items = []
-        seen_ids = set()
+        n_results = n_relevant + include_recent
+        hits = self.search_memory(
+            query_text=query_text,
+            n_results=n_results,
+            metadata_filter={'role': {'$in': ['user', 'assistant']}}
+        )
         
-        # Add recent items first
-        for item in recent_items:
-            item_id = item['id']
-            if item_id not in seen_ids:
-                context_items.append(item)
-                seen_ids.add(item_id)
+        # Recent messages the search did not find count as dissimilar
+        hit_ids = {item['id'] for item in hits}
+        candidates = hits + [item for item in recent_items if item['id'] not in hit_ids]
+        ranked = self.ranker.rank(candidates, len(candidates))
         
-        # Then add relevant items
-        for item in relevant_items:
-            item_id = item['id']
-            if item_id not in seen_ids:
-                context_items.append(item)
-                seen_ids.add(item_id)
+        recent_ids = {item['id'] for item in recent_items}
+        context_items = [item for item in ranked if item['id'] in recent_ids]
+        context_items += [item for item in ranked if item['id'] not in recent_ids][:n_relevant]
         
         # Sort by timestamp for chronological order
         context_items.sort(
@@ -562,6 +767,8 @@ class VectorStore:
                 # Fall back to in-memory method
                 
         # Mock mode or fallback
+        self._refresh_shared_index()
+        
         # Sort by timestamp (most recent first)
         sorted_items = sorted(
             [item for item in self.memory_items if item.get('metadata', {}).get('role') in ['user', 'assistant']],
@@ -608,6 +815,7 @@ class VectorStore:
                 # Fall back to in-memory method
         
         # Mock mode or fallback
+        self._refresh_shared_index()
         for item in self.memory_items:
             if item.get('id') == id:
                 return item
@@ -636,11 +844,15 @@ class VectorStore:
                 # Fall back to in-memory method
         
         # Mock mode or fallback
+        if self._is_read_only(f"deleting item {id}"):
+            return False
+        
         before_len = len(self.memory_items)
         self.memory_items = [item for item in self.memory_items if item.get('id') != id]
         
         # Check if any item was removed
         if len(self.memory_items) < before_len:
+            self.index.rebuild(self.memory_items)
             self._save_memory_items()
             logger.debug(f"Deleted message with ID: {id} from memory")
             return True
@@ -664,12 +876,8 @@ class VectorStore:
                 self.client.delete_collection(name)
                 logger.warning(f"Deleted collection '{name}'")
                 
-                # Recreate the collection
-                self.collection = self.client.create_collection(
-                    name=name,
-                    embedding_function=None,
-                    metadata={"hnsw:space": self.distance_metric}
-                )
+                # Recreate the collection with the same metadata as at startup
+                self.collection = self._get_or_create_collection()
                 
                 logger.info(f"Recreated empty collection '{name}'")
                 return True
@@ -679,7 +887,11 @@ class VectorStore:
                 # Fall back to in-memory method
         
         # Mock mode or fallback
+        if self._is_read_only("clearing memory"):
+            return False
+        
         self.memory_items = []
+        self.index.rebuild(self.memory_items)
         self._save_memory_items()
         logger.warning("Cleared in-memory storage")
         return True
@@ -734,6 +946,7 @@ class VectorStore:
                 # Fall back to in-memory method
         
         # Mock mode
+        self._refresh_shared_index()
         user_count = sum(1 for item in self.memory_items if item.get('metadata', {}).get('role') == 'user')
         assistant_count = sum(1 for item in self.memory_items if item.get('metadata', {}).get('role') == 'assistant')
         doc_chunks = sum(1 for item in self.memory_items if item.get('metadata', {}).get('type') == 'document_chunk')
@@ -0,0 +1,297 @@
+"""
+Persistent caches for model outputs.
+
+This module provides on-disk caches for embeddings (keyed by embedding
+model and text hash) and for deterministic generation responses (keyed
+by a hash of the request), stored in SQLite with a size cap and LRU
+eviction.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+
+def text_hash(text: str) -> str:
+    """
+    Hash a text for use as a cache key.
+
+    Args:
+        text: Text to hash
+
+    Returns:
+        Hex SHA-256 digest of the UTF-8 encoded text
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class _SQLiteLRUCache:
+    """
+    Base class for SQLite-backed caches with LRU eviction.
+
+    Subclasses set TABLE and COLUMNS; every table has a 'last_access'
+    column used for eviction. The cache is safe to share between
+    threads, and the database file can be shared between processes.
+    """
+
+    TABLE = ''
+    COLUMNS = ''
+    PRIMARY_KEY = ''
+
+    def __init__(self, path: Union[str, Path], max_entries: int):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Path of the SQLite database file
+            max_entries: Maximum number of cached entries
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max(1, int(max_entries))
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+            f" {self.COLUMNS},"
+            f" last_access REAL NOT NULL,"
+            f" PRIMARY KEY ({self.PRIMARY_KEY}))"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.TABLE}_last_access ON {self.TABLE} (last_access)"
+        )
+        self._conn.commit()
+
+        logger.info(f"{type(self).__name__} initialized at {self.path} (max {self.max_entries} entries)")
+
+    def _evict(self):
+        """Delete the least recently used entries above the size cap."""
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.TABLE} WHERE rowid IN ("
+                f" SELECT rowid FROM {self.TABLE} ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            logger.debug(f"Evicted {excess} entries from {self.TABLE} cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with entry count, hits, misses and hit rate
+        """
+        with self._lock:
+            entries = self._conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingCache(_SQLiteLRUCache):
+    """
+    SQLite-backed embedding cache with LRU eviction.
+
+    Vectors are stored as float32 blobs keyed by (model, sha256(text)).
+    """
+
+    TABLE = 'embeddings'
+    COLUMNS = 'model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL'
+    PRIMARY_KEY = 'model, hash'
+
+    def __init__(self, path: Union[str, Path], max_entries: int = 100000):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            path: Path of the SQLite database file
+            max_entries: Maximum number of cached vectors
+        """
+        super().__init__(path, max_entries)
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            One read-only float32 vector per text (a view of the stored
+            blob), or None where the text is not cached
+        """
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[str, bytes] = {}
+
+        with self._lock:
+            unique = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique), _SQL_CHUNK):
+                chunk = unique[start:start + _SQL_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall()
+                found.update(rows)
+
+                # Refresh recency of the hits
+                hit_hashes = [row[0] for row in rows]
+                if hit_hashes:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_access = ? WHERE model = ? "
+                        f"AND hash IN ({','.join('?' * len(hit_hashes))})",
+                        [time.time(), model, *hit_hashes]
+                    )
+            self._conn.commit()
+
+            results = [
+                np.frombuffer(found[h], dtype=np.float32) if h in found else None
+                for h in hashes
+            ]
+            hits = sum(1 for result in results if result is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """
+        Store embeddings, evicting least recently used entries if needed.
+
+        Args:
+            model: Embedding model name
+            texts: Embedded texts
+            embeddings: Embedding vectors, one per text
+        """
+        now = time.time()
+        rows = [
+            (model, text_hash(text), np.asarray(embedding, dtype=np.float32).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+
+
+def response_key(model: str, request: Any, options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Hash a generation request for use as a response cache key.
+
+    Args:
+        model: Model name
+        request: Prompt string or list of chat messages
+        options: Generation options
+
+    Returns:
+        Hex SHA-256 digest of the canonical JSON encoding of the request
+    """
+    payload = json.dumps(
+        {'model': model, 'request': request, 'options': options or {}},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return text_hash(payload)
+
+
+class ResponseCache(_SQLiteLRUCache):
+    """
+    SQLite-backed cache of generated responses with LRU eviction.
+
+    Responses are keyed by response_key(model, prompt or messages,
+    options), so only deterministic requests should be cached.
+    """
+
+    TABLE = 'responses'
+    COLUMNS = 'key TEXT NOT NULL, response TEXT NOT NULL'
+    PRIMARY_KEY = 'key'
+
+    def __init__(self, path: Union[str, Path], max_entries: int = 10000):
+        """
+        Initialize the response cache.
+
+        Args:
+            path: Path of the SQLite database file
+            max_entries: Maximum number of cached responses
+        """
+        super().__init__(path, max_entries)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Request key from response_key()
+
+        Returns:
+            The cached response, or None if not cached
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """
+        Store a response, evicting least recently used entries if needed.
+
+        Args:
+            key: Request key from response_key()
+            response: Generated response text
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, last_access) VALUES (?, ?, ?)",
+                (key, response, time.time())
+            )
+            self._evict()
+            self._conn.commit()
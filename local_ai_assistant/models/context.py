@@ -0,0 +1,125 @@
+"""
+Context window sizing for Local AI Assistant.
+
+Ollama allocates the KV cache for the whole context window (num_ctx) when
+it loads a model, silently drops the start of prompts that do not fit,
+and reloads the model whenever num_ctx changes. This module sizes num_ctx
+per request from the measured prompt length, rounded up to a few fixed
+bucket sizes so that consecutive requests rarely change it.
+"""
+
+import logging
+import math
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+# Context window sizes requests are rounded up to
+DEFAULT_BUCKETS = [2048, 4096, 8192, 16384, 32768]
+
+# Tokens added per chat message by the model's chat template (approximate)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class ContextSizer:
+    """
+    Chooses num_ctx from the prompt length and the output budget.
+
+    Prompt token counts are estimates (the token counter does not use
+    each model's own tokenizer), so a safety margin is added before
+    rounding up to a bucket. While a model is loaded with a large enough
+    window, that window is reused rather than shrunk, which would make
+    Ollama reload the model.
+    """
+
+    def __init__(self, buckets: Optional[Sequence[int]] = None, margin: float = 0.15, enabled: bool = True):
+        """
+        Initialize the sizer.
+
+        Args:
+            buckets: Allowed num_ctx values; the largest is the hard limit
+            margin: Fraction added to prompt token estimates
+            enabled: Whether num_ctx is set at all (False leaves Ollama's default)
+        """
+        self.buckets = sorted({int(b) for b in (buckets or DEFAULT_BUCKETS) if int(b) > 0})
+        if not self.buckets:
+            raise ValueError("At least one positive context bucket is required")
+        self.margin = max(0.0, float(margin))
+        self.enabled = enabled
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ContextSizer":
+        """
+        Create a sizer from the 'model.context' config section.
+
+        Args:
+            config: Full configuration dictionary
+
+        Returns:
+            Configured ContextSizer
+        """
+        context_config = config.get('model', {}).get('context', {}) or {}
+        return cls(
+            buckets=context_config.get('buckets'),
+            margin=context_config.get('margin', 0.15),
+            enabled=context_config.get('auto', True)
+        )
+
+    @property
+    def max_ctx(self) -> int:
+        """The largest context window requests may use."""
+        return self.buckets[-1]
+
+    def prompt_budget(self, num_predict: int) -> int:
+        """
+        Get the number of (estimated) prompt tokens that fit the largest window.
+
+        At most half of the window is reserved for the output.
+
+        Args:
+            num_predict: Maximum number of generated tokens
+
+        Returns:
+            Prompt token budget
+        """
+        reserved = min(max(num_predict, 0), self.max_ctx // 2)
+        return int((self.max_ctx - reserved) / (1 + self.margin))
+
+    def choose(self, prompt_tokens: int, num_predict: int, current: Optional[int] = None) -> int:
+        """
+        Choose num_ctx for a request.
+
+        Args:
+            prompt_tokens: Estimated prompt length in tokens
+            num_predict: Maximum number of generated tokens
+            current: Window the model is currently loaded with, if known
+
+        Returns:
+            Smallest bucket that fits the prompt and output, the current
+            window if that fits as well, or the largest bucket
+        """
+        needed = math.ceil(prompt_tokens * (1 + self.margin)) + max(num_predict, 0)
+        if current is not None and needed <= current <= self.max_ctx:
+            return current
+        for bucket in self.buckets:
+            if bucket >= needed:
+                return bucket
+        return self.max_ctx
+
+    def split_budget(self, budget: int) -> Tuple[int, int]:
+        """
+        Split a token budget between the start and end of a trimmed text.
+
+        Prompts carry instructions at the start and the question at the
+        end, with retrieved context in between, so the middle is cut.
+
+        Args:
+            budget: Tokens to keep
+
+        Returns:
+            Tuple of (tokens kept from the start, tokens kept from the end)
+        """
+        head = budget // 2
+        return head, budget - head
@@ -12,6 +12,9 @@ from pathlib import Path
 
 # Local imports
 from local_ai_assistant.models.model_manager import ModelManager
+from local_ai_assistant.models.vectors import (
+    EMBEDDING_DTYPE, Embedding, EmbeddingMatrix, as_embedding_matrix, normalize_rows
+)
 
 
 # Logger for this module
@@ -35,7 +38,7 @@ class EmbeddingGenerator:
         self.embedding_model = self.model_manager.embedding_model
         logger.info(f"Embedding generator initialized with model: {self.embedding_model}")
     
-    def generate_embeddings(self, texts: Union[str, List[str]]) -> List[List[float]]:
+    def generate_embeddings(self, texts: Union[str, List[str]]) -> EmbeddingMatrix:
         """
         Generate embeddings for text(s).
         
@@ -43,11 +46,11 @@ class EmbeddingGenerator:
             texts: Single text or list of texts to embed
             
         Returns:
-            List of embedding vectors
+            Float32 matrix with one L2-normalized row per text
         """
         if not texts:
             logger.warning("Empty text passed to generate_embeddings")
-            return []
+            return np.zeros((0, 0), dtype=EMBEDDING_DTYPE)
         
         # Handle single text
         if isinstance(texts, str):
@@ -63,34 +66,28 @@ class EmbeddingGenerator:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise RuntimeError(f"Failed to generate embeddings: {str(e)}")
     
-    def normalize_embeddings(self, embeddings: List[List[float]]) -> List[List[float]]:
+    def normalize_embeddings(
+        self,
+        embeddings: Union[EmbeddingMatrix, List[List[float]]]
+    ) -> EmbeddingMatrix:
         """
         Normalize embedding vectors to unit length (L2 norm).
         
+        Embeddings from generate_embeddings are already normalized; this
+        is for vectors obtained elsewhere.
+        
         Args:
-            embeddings: List of embedding vectors
+            embeddings: Embedding matrix or list of embedding vectors
             
         Returns:
-            List of normalized embedding vectors
+            Float32 matrix of normalized embedding vectors (a new array)
         """
-        if not embeddings:
-            return []
+        if len(embeddings) == 0:
+            return np.zeros((0, 0), dtype=EMBEDDING_DTYPE)
         
         try:
-            # Convert to numpy for efficient operations
-            np_embeddings = np.array(embeddings)
-            
-            # Calculate L2 norm (sqrt of sum of squares)
-            norms = np.linalg.norm(np_embeddings, axis=1, keepdims=True)
-            
-            # Avoid division by zero
-            norms = np.where(norms == 0, 1e-10, norms)
-            
-            # Normalize
-            normalized = np_embeddings / norms
-            
-            # Convert back to list
-            return normalized.tolist()
+            # Copy once into float32 and normalize the copy in place
+            return normalize_rows(np.array(embeddings, dtype=EMBEDDING_DTYPE, ndmin=2))
             
         except Exception as e:
             logger.error(f"Error normalizing embeddings: {str(e)}")
@@ -99,8 +96,8 @@ class EmbeddingGenerator:
     
     def compute_similarity(
         self,
-        embedding1: List[float],
-        embedding2: List[float],
+        embedding1: Embedding,
+        embedding2: Embedding,
         method: str = "cosine"
     ) -> float:
         """
@@ -114,14 +111,14 @@ class EmbeddingGenerator:
         Returns:
             Similarity score
         """
-        if not embedding1 or not embedding2:
+        if embedding1 is None or embedding2 is None or len(embedding1) == 0 or len(embedding2) == 0:
             logger.warning("Empty embedding passed to compute_similarity")
             return 0.0
         
         try:
-            # Convert to numpy
-            v1 = np.array(embedding1)
-            v2 = np.array(embedding2)
+            # View as float32 arrays (no copy for pipeline embeddings)
+            v1 = np.asarray(embedding1, dtype=EMBEDDING_DTYPE)
+            v2 = np.asarray(embedding2, dtype=EMBEDDING_DTYPE)
             
             if method == "cosine":
                 # Cosine similarity: dot product of normalized vectors
@@ -132,17 +129,17 @@ class EmbeddingGenerator:
                 if norm1 == 0 or norm2 == 0:
                     return 0.0
                     
-                return np.dot(v1, v2) / (norm1 * norm2)
+                return float(np.dot(v1, v2) / (norm1 * norm2))
                 
             elif method == "dot":
                 # Simple dot product
-                return np.dot(v1, v2)
+                return float(np.dot(v1, v2))
                 
             elif method == "euclidean":
                 # Euclidean distance (converted to similarity)
                 distance = np.linalg.norm(v1 - v2)
                 # Convert distance to similarity (1 / (1 + distance))
-                return 1.0 / (1.0 + distance)
+                return float(1.0 / (1.0 + distance))
                 
             else:
                 logger.warning(f"Unknown similarity method: {method}, using cosine")
@@ -154,7 +151,7 @@ class EmbeddingGenerator:
                 if norm1 == 0 or norm2 == 0:
                     return 0.0
                     
-                return np.dot(v1, v2) / (norm1 * norm2)
+                return float(np.dot(v1, v2) / (norm1 * norm2))
                 
         except Exception as e:
             logger.error(f"Error computing similarity: {str(e)}")
@@ -162,81 +159,61 @@ class EmbeddingGenerator:
     
     def batch_compute_similarity(
         self,
-        query_embedding: List[float],
-        document_embeddings: List[List[float]],
-        method: str = "cosine"
-    ) -> List[float]:
+        query_embedding: Embedding,
+        document_embeddings: Union[EmbeddingMatrix, List[List[float]]],
+        method: str = "cosine",
+        normalized: bool = False
+    ) -> np.ndarray:
         """
         Compute similarity between one query embedding and multiple document embeddings.
         
         Args:
             query_embedding: Query embedding
-            document_embeddings: List of document embeddings
+            document_embeddings: Document embedding matrix (one row per document)
             method: Similarity method (cosine, dot, euclidean)
+            normalized: Whether the inputs are already L2-normalized (as
+                returned by generate_embeddings); cosine is then a plain
+                dot product
             
         Returns:
-            List of similarity scores
+            Float32 array of similarity scores, one per document
         """
-        if not query_embedding or not document_embeddings:
+        n_docs = len(document_embeddings) if document_embeddings is not None else 0
+        if query_embedding is None or len(query_embedding) == 0 or not n_docs:
             logger.warning("Empty embeddings passed to batch_compute_similarity")
-            return [0.0] * len(document_embeddings) if document_embeddings else []
+            return np.zeros(n_docs, dtype=EMBEDDING_DTYPE)
         
         try:
-            # Convert to numpy
-            query = np.array(query_embedding)
-            docs = np.array(document_embeddings)
+            # View as float32 arrays (no copy for pipeline embeddings)
+            query = np.asarray(query_embedding, dtype=EMBEDDING_DTYPE)
+            docs = as_embedding_matrix(document_embeddings)
             
-            if method == "cosine":
-                # Cosine similarity: normalize and then dot product
-                query_norm = np.linalg.norm(query)
-                
-                # Avoid division by zero
-                if query_norm == 0:
-                    return [0.0] * len(document_embeddings)
-                    
-                # Normalize query
-                query_normalized = query / query_norm
-                
-                # Normalize documents (row-wise)
-                docs_norm = np.linalg.norm(docs, axis=1, keepdims=True)
-                # Replace zeros with small value to avoid division by zero
-                docs_norm = np.where(docs_norm == 0, 1e-10, docs_norm)
-                docs_normalized = docs / docs_norm
-                
-                # Compute dot products
-                similarities = np.dot(docs_normalized, query_normalized)
-                
-                return similarities.tolist()
-                
-            elif method == "dot":
+            if method == "dot" or (method == "cosine" and normalized):
                 # Simple dot product
-                similarities = np.dot(docs, query)
-                return similarities.tolist()
+                return docs @ query
                 
             elif method == "euclidean":
                 # Euclidean distance (converted to similarity)
                 distances = np.linalg.norm(docs - query, axis=1)
                 # Convert distances to similarities (1 / (1 + distance))
-                similarities = 1.0 / (1.0 + distances)
-                return similarities.tolist()
+                return 1.0 / (1.0 + distances)
                 
-            else:
+            if method != "cosine":
                 logger.warning(f"Unknown similarity method: {method}, using cosine")
-                # Default to cosine (same as above)
-                query_norm = np.linalg.norm(query)
-                
-                # Avoid division by zero
-                if query_norm == 0:
-                    return [0.0] * len(document_embeddings)
-                    
-                query_normalized = query / query_norm
-                docs_norm = np.linalg.norm(docs, axis=1, keepdims=True)
-                docs_norm = np.where(docs_norm == 0, 1e-10, docs_norm)
-                docs_normalized = docs / docs_norm
-                
-                similarities = np.dot(docs_normalized, query_normalized)
-                return similarities.tolist()
+            
+            # Cosine similarity: dot products divided by the norms
+            query_norm = np.linalg.norm(query)
+            
+            # Avoid division by zero
+            if query_norm == 0:
+                return np.zeros(n_docs, dtype=EMBEDDING_DTYPE)
+            
+            docs_norm = np.linalg.norm(docs, axis=1)
+            similarities = docs @ query
+            np.divide(similarities, docs_norm * query_norm, out=similarities, where=docs_norm > 0)
+            similarities[docs_norm == 0] = 0.0
+            return similarities
                 
         except Exception as e:
             logger.error(f"Error in batch_compute_similarity: {str(e)}")
-            return [0.0] * len(document_embeddings) 
\ No newline at end of file
+            return np.zeros(n_docs, dtype=EMBEDDING_DTYPE)
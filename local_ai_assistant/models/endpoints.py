@@ -0,0 +1,335 @@
+"""
+Pool of Ollama server instances.
+
+Requests are spread over one or more Ollama endpoints. Embedding calls go
+to the instance with the fewest outstanding requests; generation and chat
+calls for a model stick to one instance (rendezvous hashing), so its
+weights are loaded once and its KV cache is reused across turns.
+Instances that keep failing are taken out of rotation until a health
+check succeeds again.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from local_ai_assistant.models.resilience import is_transient_error
+
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+# Routing policies
+ROUTE_LEAST_OUTSTANDING = 'least_outstanding'
+ROUTE_STICKY = 'sticky'
+
+# Default policy per operation
+DEFAULT_ROUTES = {
+    'embed': ROUTE_LEAST_OUTSTANDING,
+    'list': ROUTE_LEAST_OUTSTANDING,
+    'generate': ROUTE_STICKY,
+    'chat': ROUTE_STICKY,
+}
+
+
+def _rendezvous_score(key: str, url: str) -> int:
+    """Hash a (key, endpoint) pair for rendezvous (highest random weight) hashing."""
+    digest = hashlib.blake2b(f"{key}|{url}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class OllamaEndpoint:
+    """One Ollama instance with its clients and request accounting."""
+
+    def __init__(
+        self,
+        url: str,
+        client_factory: Callable[[str], Any],
+        async_client_factory: Optional[Callable[[str], Any]] = None
+    ):
+        """
+        Initialize the endpoint.
+
+        Args:
+            url: Ollama host URL (e.g. http://localhost:11434)
+            client_factory: Creates the sync client for a URL
+            async_client_factory: Creates an async client for a URL
+        """
+        self.url = url
+        self.client = client_factory(url)
+        self._async_client_factory = async_client_factory
+        self._async_client = None
+        self._async_client_loop = None
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.healthy = True
+
+    def async_client(self):
+        """
+        Get the async client for the running event loop.
+
+        An async connection pool belongs to the loop it was created on,
+        so a new client is created when called from a different loop.
+
+        Returns:
+            Async Ollama client
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = self._async_client_factory(self.url)
+            self._async_client_loop = loop
+        return self._async_client
+
+    def close(self):
+        """Close the sync client's connections."""
+        http_client = getattr(self.client, '_client', None)
+        if http_client is not None and hasattr(http_client, 'close'):
+            http_client.close()
+
+    async def aclose(self):
+        """Close the async client's connections (call from its event loop)."""
+        if self._async_client is not None:
+            http_client = getattr(self._async_client, '_client', None)
+            if http_client is not None and hasattr(http_client, 'aclose'):
+                await http_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
+
+
+class EndpointPool:
+    """
+    Routes Ollama calls over a set of endpoints.
+
+    An endpoint is removed from rotation after failure_threshold
+    consecutive transient failures, or at once when it refuses the
+    connection, and restored by the next successful call or health
+    check. If no endpoint is healthy, all of them are tried (the circuit
+    breaker then decides whether calls are sent).
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        client_factory: Callable[[str], Any],
+        async_client_factory: Optional[Callable[[str], Any]] = None,
+        failure_threshold: int = 2,
+        health_check_interval: float = 15.0,
+        routes: Optional[Dict[str, str]] = None
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            urls: Endpoint URLs; the first is the primary instance
+            client_factory: Creates the sync client for a URL
+            async_client_factory: Creates an async client for a URL
+            failure_threshold: Consecutive failures that take an endpoint
+                out of rotation
+            health_check_interval: Seconds between background health checks
+                (0 disables them)
+            routes: Routing policy overrides per operation
+        """
+        if not urls:
+            raise ValueError("At least one Ollama endpoint is required")
+
+        self.endpoints = [
+            OllamaEndpoint(url, client_factory, async_client_factory)
+            for url in dict.fromkeys(urls)
+        ]
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.health_check_interval = float(health_check_interval)
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    @property
+    def primary(self) -> OllamaEndpoint:
+        """The first configured endpoint."""
+        return self.endpoints[0]
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def _candidates(self) -> List[OllamaEndpoint]:
+        """Get the endpoints in rotation (all of them if none is healthy)."""
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+        return healthy or list(self.endpoints)
+
+    def _select(self, operation: str, key: Optional[str]) -> OllamaEndpoint:
+        """Pick an endpoint for an operation (caller holds the lock)."""
+        candidates = self._candidates()
+        if len(candidates) == 1:
+            return candidates[0]
+
+        if self.routes.get(operation) == ROUTE_STICKY and key:
+            return max(candidates, key=lambda endpoint: _rendezvous_score(key, endpoint.url))
+        return min(candidates, key=lambda endpoint: (endpoint.outstanding, endpoint.requests))
+
+    def select(self, operation: str, key: Optional[str] = None) -> OllamaEndpoint:
+        """
+        Pick the endpoint an operation would be sent to.
+
+        Args:
+            operation: Operation name ('generate', 'chat', 'embed' or 'list')
+            key: Sticky routing key (the model name)
+
+        Returns:
+            Selected endpoint
+        """
+        with self._lock:
+            return self._select(operation, key)
+
+    def endpoints_for_model(self, model: str, operation: str) -> List[OllamaEndpoint]:
+        """
+        Get the endpoints that serve a model's requests, for loading and unloading it.
+
+        Args:
+            model: Model name
+            operation: Operation the model is used for
+
+        Returns:
+            All endpoints in rotation for spread operations, otherwise the
+            model's sticky endpoint
+        """
+        with self._lock:
+            if self.routes.get(operation) == ROUTE_STICKY:
+                return [self._select(operation, model)]
+            return self._candidates()
+
+    @contextmanager
+    def lease(self, operation: str, key: Optional[str] = None) -> Iterator[OllamaEndpoint]:
+        """
+        Select an endpoint and count the call as outstanding on it while in use.
+
+        Args:
+            operation: Operation name ('generate', 'chat', 'embed' or 'list')
+            key: Sticky routing key (the model name)
+
+        Yields:
+            Selected endpoint
+        """
+        with self._lock:
+            endpoint = self._select(operation, key)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+
+        error = None
+        try:
+            yield endpoint
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release(endpoint, error)
+
+    def _release(self, endpoint: OllamaEndpoint, error: Optional[BaseException]):
+        """
+        Finish an outstanding call and update the endpoint's health.
+
+        Cancelled calls and streams closed early say nothing about the
+        endpoint's health and are only released.
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if isinstance(error, Exception) and is_transient_error(error):
+                self._record_failure(endpoint, error, conclusive=isinstance(error, ConnectionError))
+            elif error is None or isinstance(error, Exception):
+                self._record_success(endpoint)
+
+    def _record_failure(self, endpoint: OllamaEndpoint, error: BaseException, conclusive: bool = False):
+        """
+        Count a failure, taking the endpoint out of rotation at the threshold.
+
+        Conclusive failures (refused connections, failed health checks)
+        take it out of rotation immediately.
+        """
+        endpoint.failures += 1
+        if conclusive:
+            endpoint.failures = max(endpoint.failures, self.failure_threshold)
+        if endpoint.healthy and endpoint.failures >= self.failure_threshold and len(self.endpoints) > 1:
+            endpoint.healthy = False
+            logger.warning(f"Removing Ollama endpoint {endpoint.url} from rotation: {str(error)}")
+
+    def _record_success(self, endpoint: OllamaEndpoint):
+        """Reset the failure count, returning the endpoint to rotation."""
+        endpoint.failures = 0
+        if not endpoint.healthy:
+            endpoint.healthy = True
+            logger.info(f"Ollama endpoint {endpoint.url} is back in rotation")
+
+    def check_health(self, probe: Callable[[Any], Any] = lambda client: client.list()) -> int:
+        """
+        Probe every endpoint and update its health.
+
+        Args:
+            probe: Cheap call made with each endpoint's sync client
+
+        Returns:
+            Number of healthy endpoints
+        """
+        for endpoint in self.endpoints:
+            try:
+                probe(endpoint.client)
+            except Exception as e:
+                with self._lock:
+                    self._record_failure(endpoint, e, conclusive=True)
+                continue
+            with self._lock:
+                self._record_success(endpoint)
+
+        return sum(1 for endpoint in self.endpoints if endpoint.healthy)
+
+    def start_health_checks(self) -> Optional[threading.Thread]:
+        """
+        Check endpoint health periodically in a background thread.
+
+        Returns:
+            The started (daemon) thread, or None with a single endpoint or
+            health checks disabled
+        """
+        if len(self.endpoints) < 2 or self.health_check_interval <= 0 or self._health_thread is not None:
+            return None
+
+        def run():
+            while not self._stop.wait(self.health_check_interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=run, name="ollama-health", daemon=True)
+        self._health_thread.start()
+        return self._health_thread
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Get the state of every endpoint.
+
+        Returns:
+            List of dictionaries with url, healthy, outstanding, requests
+            and failures
+        """
+        with self._lock:
+            return [
+                {
+                    'url': endpoint.url,
+                    'healthy': endpoint.healthy,
+                    'outstanding': endpoint.outstanding,
+                    'requests': endpoint.requests,
+                    'failures': endpoint.failures
+                }
+                for endpoint in self.endpoints
+            ]
+
+    def close(self):
+        """Stop health checks and close the sync clients."""
+        self._stop.set()
+        for endpoint in self.endpoints:
+            endpoint.close()
+
+    async def aclose(self):
+        """Close the async clients (call from their event loop)."""
+        for endpoint in self.endpoints:
+            await endpoint.aclose()
@@ -0,0 +1,191 @@
+"""
+Generation metrics for Local AI Assistant.
+
+This module collects the statistics Ollama returns with each generation
+(prompt and output token counts, evaluation and load durations) per
+model and task, for sizing hardware and spotting model reloads.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+# Statistics fields returned by Ollama (durations in nanoseconds)
+STAT_FIELDS = [
+    'prompt_eval_count', 'prompt_eval_duration', 'eval_count',
+    'eval_duration', 'load_duration', 'total_duration'
+]
+
+
+class GenerationMetrics:
+    """
+    Registry of per-model, per-task generation statistics.
+
+    Rates are computed over a rolling window of the most recent requests
+    of each model and task; request and token totals cover the whole
+    session. A request whose load_duration exceeds load_event_seconds is
+    recorded as a model-load event.
+    """
+
+    def __init__(self, window: int = 100, load_event_seconds: float = 0.5, max_load_events: int = 50):
+        """
+        Initialize an empty registry.
+
+        Args:
+            window: Number of recent requests per model and task used for rates
+            load_event_seconds: Load time above which a request counts as a model load
+            max_load_events: Number of model-load events kept
+        """
+        self.window = max(1, int(window))
+        self.load_event_seconds = float(load_event_seconds)
+        self._samples: Dict[Tuple[str, str], Deque[Dict[str, int]]] = {}
+        self._totals: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._load_events: Deque[Dict[str, Any]] = deque(maxlen=max(1, int(max_load_events)))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "GenerationMetrics":
+        """
+        Create a registry from the 'model.metrics' config section.
+
+        Args:
+            config: Full configuration dictionary
+
+        Returns:
+            Configured GenerationMetrics
+        """
+        metrics_config = config.get('model', {}).get('metrics', {}) or {}
+        return cls(
+            window=metrics_config.get('window', 100),
+            load_event_seconds=metrics_config.get('load_event_seconds', 0.5)
+        )
+
+    def record(self, model: str, task: str, stats: Dict[str, Optional[int]]) -> bool:
+        """
+        Record the server statistics of one generation.
+
+        Args:
+            model: Model that produced the response
+            task: Task type of the request
+            stats: Ollama statistics fields (missing or None fields count as 0)
+
+        Returns:
+            True if the statistics were recorded, False if they were empty
+        """
+        sample = {field: int(stats.get(field) or 0) for field in STAT_FIELDS}
+        if not sample['eval_count'] and not sample['prompt_eval_count']:
+            return False
+
+        key = (model, task)
+        load_seconds = sample['load_duration'] / 1e9
+
+        with self._lock:
+            samples = self._samples.setdefault(key, deque(maxlen=self.window))
+            samples.append(sample)
+
+            totals = self._totals.setdefault(key, {'requests': 0, 'prompt_tokens': 0, 'tokens': 0, 'loads': 0})
+            totals['requests'] += 1
+            totals['prompt_tokens'] += sample['prompt_eval_count']
+            totals['tokens'] += sample['eval_count']
+
+            if load_seconds >= self.load_event_seconds:
+                totals['loads'] += 1
+                self._load_events.append({
+                    'model': model,
+                    'task': task,
+                    'time': time.time(),
+                    'load_seconds': load_seconds
+                })
+
+        if load_seconds >= self.load_event_seconds:
+            logger.info(f"Model {model} was loaded for a {task} request ({load_seconds:.1f}s)")
+        return True
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Summarize the recorded statistics.
+
+        Returns:
+            Mapping of model to task to requests, prompt_tokens, tokens and
+            loads (session totals), and tokens_per_second,
+            prompt_tokens_per_second, prompt_eval_share and
+            avg_total_seconds over the rolling window
+        """
+        with self._lock:
+            snapshot = {key: (list(samples), dict(self._totals[key])) for key, samples in self._samples.items()}
+
+        result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (model, task), (samples, totals) in sorted(snapshot.items()):
+            eval_count = sum(s['eval_count'] for s in samples)
+            eval_seconds = sum(s['eval_duration'] for s in samples) / 1e9
+            prompt_count = sum(s['prompt_eval_count'] for s in samples)
+            prompt_seconds = sum(s['prompt_eval_duration'] for s in samples) / 1e9
+            total_seconds = sum(s['total_duration'] for s in samples) / 1e9
+            busy_seconds = eval_seconds + prompt_seconds
+
+            result.setdefault(model, {})[task] = {
+                **totals,
+                'window': len(samples),
+                'tokens_per_second': eval_count / eval_seconds if eval_seconds else 0.0,
+                'prompt_tokens_per_second': prompt_count / prompt_seconds if prompt_seconds else 0.0,
+                # Fraction of evaluation time spent reading the prompt
+                'prompt_eval_share': prompt_seconds / busy_seconds if busy_seconds else 0.0,
+                'avg_total_seconds': total_seconds / len(samples) if samples else 0.0
+            }
+        return result
+
+    def load_events(self) -> List[Dict[str, Any]]:
+        """
+        Get the recent model-load events, oldest first.
+
+        Returns:
+            List of events with model, task, time and load_seconds
+        """
+        with self._lock:
+            return list(self._load_events)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get all metrics as a JSON-serializable dictionary.
+
+        Returns:
+            Dictionary with generated_at, window, models and load_events
+        """
+        return {
+            'generated_at': time.time(),
+            'window': self.window,
+            'models': self.summary(),
+            'load_events': self.load_events()
+        }
+
+    def dump(self, path: Union[str, Path]) -> Path:
+        """
+        Write the metrics to a JSON file.
+
+        Args:
+            path: Output file path (parent directories are created)
+
+        Returns:
+            The path written
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logger.info(f"Wrote generation metrics to {path}")
+        return path
+
+    def clear(self):
+        """Drop all recorded statistics."""
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._load_events.clear()
@@ -4,6 +4,7 @@ Model manager for Local AI Assistant.
 This module handles loading, unloading, and interacting with Ollama models.
 """
 
+import asyncio
 import logging
 import os
 import time
@@ -11,22 +12,121 @@ import json
 import sys
 import yaml
 import re
+import numpy as np
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union, Tuple
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Any, Union, Tuple
 
 # Try importing Ollama, but don't fail if it's not available
 try:
     import ollama
+    import httpx  # Installed with ollama; used to configure the client pool
     OLLAMA_AVAILABLE = True
 except ImportError:
     OLLAMA_AVAILABLE = False
 
 # Local imports
 from local_ai_assistant.utils.token_counter import TokenCounter
+from local_ai_assistant.models.cache import EmbeddingCache, ResponseCache, response_key
+from local_ai_assistant.models.residency import ModelResidencyManager, model_key
+from local_ai_assistant.models.context import MESSAGE_OVERHEAD_TOKENS, ContextSizer
+from local_ai_assistant.models.endpoints import EndpointPool
+from local_ai_assistant.models.metrics import GenerationMetrics, STAT_FIELDS
+from local_ai_assistant.models.resilience import (
+    CircuitBreaker, LatencyTracker, OllamaUnavailable, acall_with_deadline, aretry_call,
+    call_with_deadline, is_transient_error, retry_call
+)
+from local_ai_assistant.models.session import ChatSession
+from local_ai_assistant.models.scheduler import (
+    RequestScheduler, PRIORITY_INTERACTIVE, PRIORITY_MEMORY
+)
+from local_ai_assistant.models.vectors import (
+    EMBEDDING_DTYPE, Embedding, EmbeddingMatrix, as_embedding_matrix, normalize_rows, truncate_rows
+)
 
 # Logger for this module
 logger = logging.getLogger(__name__)
 
+# Tasks used for model routing
+TASK_CHAT = 'chat'
+TASK_RAG = 'rag'
+TASK_ANALYSIS = 'analysis'
+TASK_SUMMARIZATION = 'summarization'
+
+
+def _response_field(response: Any, name: str, default: Any = None) -> Any:
+    """
+    Read a field from an Ollama response (dict or object).
+    
+    Args:
+        response: Response dictionary or object
+        name: Field name
+        default: Value returned if the field is missing
+        
+    Returns:
+        Field value or default
+    """
+    if isinstance(response, dict):
+        return response.get(name, default)
+    return getattr(response, name, default)
+
+
+def _chunk_text(chunk: Any) -> str:
+    """
+    Extract the text of a generate or chat response (or stream chunk).
+    
+    Args:
+        chunk: Response dictionary or object
+        
+    Returns:
+        Text content (empty string if none)
+    """
+    message = _response_field(chunk, 'message')
+    if message is not None:
+        return _response_field(message, 'content', '') or ''
+    return _response_field(chunk, 'response', '') or ''
+
+
+class EmbeddingError(RuntimeError):
+    """
+    Raised when some texts could not be embedded.
+    
+    Attributes:
+        failures: Mapping of input positions to error messages
+        embeddings: Normalized float32 embeddings in input order, None
+            where embedding failed
+    """
+    
+    def __init__(self, failures: Dict[int, str], embeddings: List[Optional[Embedding]]):
+        self.failures = failures
+        self.embeddings = embeddings
+        super().__init__(
+            f"Failed to embed {len(failures)} of {len(embeddings)} texts: "
+            + "; ".join(f"#{i}: {error}" for i, error in sorted(failures.items())[:3])
+        )
+
+
+class GenerationError(RuntimeError):
+    """
+    Raised when no model of the fallback chain could generate a response.
+    
+    Attributes:
+        errors: Mapping of model names to error messages
+    """
+    
+    def __init__(self, errors: Dict[str, str]):
+        self.errors = errors
+        super().__init__(
+            "Could not generate a response: "
+            + "; ".join(f"{model}: {error}" for model, error in errors.items())
+        )
+
+
+def _should_retry(error: BaseException) -> bool:
+    """Retry transient errors, but not while the circuit breaker is open."""
+    return is_transient_error(error) and not isinstance(error, OllamaUnavailable)
+
 
 class ModelManager:
     """
@@ -36,12 +136,17 @@ class ModelManager:
     using Ollama models.
     """
     
-    def __init__(self, config_path: Union[str, Path]):
+    def __init__(
+        self,
+        config_path: Union[str, Path],
+        token_counter: Optional[TokenCounter] = None
+    ):
         """
         Initialize the model manager.
         
         Args:
             config_path: Path to the configuration file
+            token_counter: Optional shared token counter instance
         """
         self.config_path = Path(config_path)
         
@@ -60,34 +165,217 @@ class ModelManager:
         self.temperature = model_config.get('temperature', 0.7)
         self.max_tokens = model_config.get('max_tokens', 2000)
         
+        # Context window (num_ctx) sized per request from the prompt length;
+        # the window each model was last loaded with is reused while it fits
+        self.context = ContextSizer.from_config(self.config)
+        self._context_sizes: Dict[str, int] = {}
+        
         # Embedding model
         self.embedding_model = model_config.get('embedding', 'nomic-embed-text')
         
+        # Reduced embedding dimension (Matryoshka truncation; None = full size).
+        # Cache entries are keyed by model and dimension.
+        self.embedding_dim = model_config.get('embedding_dim') or None
+        self._embedding_cache_model = (
+            f"{self.embedding_model}@{self.embedding_dim}d" if self.embedding_dim else self.embedding_model
+        )
+        
+        # Embedding request batching
+        batch_config = model_config.get('embedding_batch', {}) or {}
+        self.embedding_batch_size = max(1, batch_config.get('max_batch_size', 64))
+        self.embedding_batch_tokens = max(1, batch_config.get('max_batch_tokens', 8192))
+        self._batch_embed_supported = True
+        
+        # Concurrent embedding requests (bounded thread pool, per-item retries)
+        self.embedding_concurrency = max(1, model_config.get('embedding_concurrency', 4))
+        self.embedding_retries = max(0, model_config.get('embedding_retries', 2))
+        self._embedding_executor = None
+        self._embedding_executor_lock = threading.Lock()
+        
+        # Persistent embedding cache (read through by generate_embeddings)
+        cache_config = model_config.get('embedding_cache', {}) or {}
+        self.embedding_cache = None
+        if cache_config.get('enabled', True):
+            try:
+                self.embedding_cache = EmbeddingCache(
+                    cache_config.get('path', 'data/cache/embeddings.sqlite3'),
+                    max_entries=cache_config.get('max_entries', 100000)
+                )
+            except Exception as e:
+                logger.warning(f"Embedding cache disabled: {str(e)}")
+        
+        # Persistent cache of deterministic (temperature 0 or opt-in) responses
+        response_cache_config = model_config.get('response_cache', {}) or {}
+        self.response_cache = None
+        if response_cache_config.get('enabled', True):
+            try:
+                self.response_cache = ResponseCache(
+                    response_cache_config.get('path', 'data/cache/responses.sqlite3'),
+                    max_entries=response_cache_config.get('max_entries', 10000)
+                )
+            except Exception as e:
+                logger.warning(f"Response cache disabled: {str(e)}")
+        
+        # Task-based routing: task -> fallback chain of models
+        self.routes = {
+            TASK_CHAT: ['active'],
+            TASK_RAG: ['rag', 'active'],
+            TASK_ANALYSIS: ['active'],
+            TASK_SUMMARIZATION: ['active']
+        }
+        self.routes.update(model_config.get('routing', {}) or {})
+        
+        # Model preloading (warm-up) and how long Ollama keeps models loaded
+        preload_config = model_config.get('preload', {}) or {}
+        self.preload_enabled = preload_config.get('enabled', True)
+        self.preload_models = preload_config.get('models', ['embedding', 'default'])
+        self.keep_alive = preload_config.get('keep_alive', '30m')
+        self.warmup_thread: Optional[threading.Thread] = None
+        
+        # Resident models are kept within a RAM budget; the embedding model
+        # is always pinned
+        residency_config = model_config.get('residency', {}) or {}
+        self.residency = ModelResidencyManager(
+            self.list_running_models,
+            self.unload_model,
+            ram_budget_bytes=float(residency_config.get('ram_budget_gb', 0) or 0) * 1e9,
+            pinned=[self.embedding_model, *(residency_config.get('pinned', []) or [])],
+            priorities=residency_config.get('priorities', {}) or {}
+        )
+        
+        # Requests to Ollama are ordered by priority class (interactive,
+        # memory, indexing, analysis) with per-class concurrency limits
+        self.scheduler = RequestScheduler.from_config(self.config)
+        
+        # Deadlines, retries with jittered backoff and circuit breaking for
+        # Ollama calls; deadlines are total seconds per call (0 = none)
+        resilience_config = model_config.get('resilience', {}) or {}
+        self.deadlines = {'generate': 300.0, 'chat': 300.0, 'embed': 60.0, 'list': 10.0}
+        self.deadlines.update(resilience_config.get('deadlines', {}) or {})
+        retry_config = resilience_config.get('retries', {}) or {}
+        self.retry_attempts = max(1, retry_config.get('attempts', 3))
+        self.retry_base_delay = retry_config.get('base_delay', 0.2)
+        self.retry_max_delay = retry_config.get('max_delay', 5.0)
+        breaker_config = resilience_config.get('circuit_breaker', {}) or {}
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=breaker_config.get('failure_threshold', 5),
+            reset_timeout=breaker_config.get('reset_timeout', 30.0)
+        )
+        
+        # Hedged embedding requests: a duplicate is sent when a call runs
+        # past the given percentile of recent embedding latencies
+        hedge_config = resilience_config.get('hedging', {}) or {}
+        self.hedge_embeddings = hedge_config.get('enabled', False)
+        self.hedge_percentile = hedge_config.get('percentile', 0.95)
+        self.embed_latency = LatencyTracker(min_samples=hedge_config.get('min_samples', 20))
+        self._call_executor = None
+        self._call_executor_lock = threading.Lock()
+        
+        # Ollama generation statistics per model and task (shown by /perf)
+        metrics_config = model_config.get('metrics', {}) or {}
+        self.metrics = GenerationMetrics.from_config(self.config)
+        self.metrics_dump_path = metrics_config.get('dump_path', 'data/metrics/generation.json')
+        self.metrics_dump_on_exit = metrics_config.get('dump_on_exit', False)
+        
         # Ollama settings
-        if 'ollama' in model_config:
-            ollama_config = model_config['ollama']
-            self.ollama_host = ollama_config.get('host', 'http://localhost')
-            self.ollama_port = ollama_config.get('port', 11434)
-        else:
-            self.ollama_host = 'http://localhost'
-            self.ollama_port = 11434
+        ollama_config = model_config.get('ollama', {}) or {}
+        self.ollama_host = ollama_config.get('host', 'http://localhost')
+        self.ollama_port = ollama_config.get('port', 11434)
+        
+        # Several Ollama instances may be listed instead of host/port; the
+        # first one is the primary, whose loaded models drive residency
+        self.ollama_endpoints = list(
+            ollama_config.get('endpoints') or [f"{self.ollama_host}:{self.ollama_port}"]
+        )
+        self.endpoint_failure_threshold = ollama_config.get('failure_threshold', 2)
+        self.health_check_interval = ollama_config.get('health_check_interval', 15.0)
+        
+        # HTTP timeouts and connection pool for the shared Ollama client
+        timeout_config = ollama_config.get('timeout', {}) or {}
+        self.connect_timeout = timeout_config.get('connect', 5.0)
+        self.read_timeout = timeout_config.get('read', 300.0)
+        pool_config = ollama_config.get('pool', {}) or {}
+        self.pool_max_connections = pool_config.get('max_connections', 10)
+        self.pool_max_keepalive = pool_config.get('max_keepalive_connections', 10)
+        self.pool_keepalive_expiry = pool_config.get('keepalive_expiry', 300.0)
+        
+        # Initialize token counter (shared if provided)
+        self.token_counter = token_counter or TokenCounter()
         
-        # Initialize token counter
-        self.token_counter = TokenCounter()
+        # Timing statistics of the last streamed generation
+        self.last_generation_stats: Dict[str, Any] = {}
+        
+        # Model catalog (client.list()) cached for catalog_ttl seconds
+        self.catalog_ttl = model_config.get('catalog_ttl', 300)
+        self._catalog: Optional[List[Dict[str, Any]]] = None
+        self._catalog_time = 0.0
+        self._catalog_lock = threading.Lock()
+        
+        # Ollama clients (keep-alive connection pools), one per endpoint;
+        # the async API uses AsyncClients created on first use
+        self.endpoints = None
+        self.client = None
+        if OLLAMA_AVAILABLE:
+            self.endpoints = EndpointPool(
+                self.ollama_endpoints,
+                client_factory=self._create_client,
+                async_client_factory=lambda host: ollama.AsyncClient(**self._client_options(host)),
+                failure_threshold=self.endpoint_failure_threshold,
+                health_check_interval=self.health_check_interval
+            )
+            self.client = self.endpoints.primary.client
         
         # Check if Ollama is available
         self.ollama_available = OLLAMA_AVAILABLE and self._check_ollama_available()
         
         if self.ollama_available:
-            # Set Ollama host if needed
-            if self.ollama_host != 'http://localhost' or self.ollama_port != 11434:
-                os.environ['OLLAMA_HOST'] = f"{self.ollama_host}:{self.ollama_port}"
+            self.endpoints.start_health_checks()
             
             # Try to load the default model
             self.load_model(self.default_model)
+            
+            # Load weights in the background so the prompt appears immediately
+            if self.preload_enabled:
+                self.warm_up_async(self._resolve_preload_models())
         else:
             logger.warning("Ollama is not available. Running in mock mode.")
     
+    def _create_client(self, host: Optional[str] = None):
+        """
+        Create the Ollama client used by generation, chat and embedding calls.
+        
+        The client holds one HTTP connection pool, so requests reuse
+        keep-alive connections instead of opening a new one per call.
+        
+        Args:
+            host: Endpoint URL (default: the configured host and port)
+            
+        Returns:
+            Configured ollama.Client instance
+        """
+        return ollama.Client(**self._client_options(host))
+    
+    def _client_options(self, host: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get the host, timeout and pool settings shared by the sync and
+        async Ollama clients.
+        
+        Args:
+            host: Endpoint URL (default: the configured host and port)
+            
+        Returns:
+            Keyword arguments for ollama.Client / ollama.AsyncClient
+        """
+        return {
+            'host': host or f"{self.ollama_host}:{self.ollama_port}",
+            'timeout': httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            'limits': httpx.Limits(
+                max_connections=self.pool_max_connections,
+                max_keepalive_connections=self.pool_max_keepalive,
+                keepalive_expiry=self.pool_keepalive_expiry
+            )
+        }
+    
     def _check_ollama_available(self) -> bool:
         """
         Check if Ollama service is available.
@@ -100,18 +388,24 @@ class ModelManager:
             return False
             
         try:
-            # Try to list models
-            ollama.list()
+            # Try to list models (this also fills the model catalog)
+            self._store_catalog(self._fetch_models(attempts=1))
             logger.info("Ollama service is available")
             return True
         except Exception as e:
             logger.warning(f"Ollama service is not available: {str(e)}")
             return False
     
-    def list_models(self) -> List[Dict[str, Any]]:
+    def list_models(self, refresh: bool = False) -> List[Dict[str, Any]]:
         """
         List available models.
         
+        The list is served from the model catalog cache while it is
+        younger than catalog_ttl seconds.
+        
+        Args:
+            refresh: Fetch the list from Ollama even if the cache is fresh
+            
         Returns:
             List of model information dictionaries
         """
@@ -125,29 +419,71 @@ class ModelManager:
                 {'name': 'deepseek-rag', 'size': 7000000000, 'modified_at': time.time()}
             ]
         
-        try:
-            response = ollama.list()
-            
-            # Handle new Ollama API response format (after ollama v0.1.26)
-            if hasattr(response, 'models') and isinstance(response.models, list):
-                # Convert new response format to dict format for backward compatibility
-                return [
-                    {
-                        'name': model.model,
-                        'size': getattr(model, 'size', 0),
-                        'modified_at': getattr(model, 'modified_at', time.time()),
-                        'details': getattr(model, 'details', {})
-                    }
-                    for model in response.models
-                ]
-            # Handle older Ollama API response format (dict with 'models' key)
-            elif isinstance(response, dict) and 'models' in response:
-                return response.get('models', [])
-            else:
-                logger.error(f"Unexpected response format from Ollama: {response}")
+        with self._catalog_lock:
+            if (not refresh and self._catalog is not None and
+                    time.monotonic() - self._catalog_time < self.catalog_ttl):
+                return list(self._catalog)
+            
+            try:
+                models = self._fetch_models()
+            except Exception as e:
+                logger.error(f"Error listing models: {str(e)}")
                 return []
-        except Exception as e:
-            logger.error(f"Error listing models: {str(e)}")
+            
+            self._store_catalog(models)
+            return list(models)
+    
+    def invalidate_model_catalog(self):
+        """Drop the cached model list so the next lookup fetches it again."""
+        with self._catalog_lock:
+            self._catalog = None
+    
+    def _store_catalog(self, models: List[Dict[str, Any]]):
+        """Cache a fetched model list."""
+        self._catalog = models
+        self._catalog_time = time.monotonic()
+    
+    def _fetch_models(self, attempts: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch the model list from Ollama.
+        
+        Transient failures are retried with jittered backoff.
+        
+        Args:
+            attempts: Maximum number of attempts (default: configured retries)
+            
+        Returns:
+            List of model information dictionaries
+            
+        Raises:
+            Exception: If the request fails
+        """
+        response = retry_call(
+            lambda: self._call_ollama('list', lambda client: client.list()),
+            attempts=attempts or self.retry_attempts,
+            base_delay=self.retry_base_delay,
+            max_delay=self.retry_max_delay,
+            should_retry=_should_retry,
+            description="Model list"
+        )
+        
+        # Handle new Ollama API response format (after ollama v0.1.26)
+        if hasattr(response, 'models') and isinstance(response.models, list):
+            # Convert new response format to dict format for backward compatibility
+            return [
+                {
+                    'name': model.model,
+                    'size': getattr(model, 'size', 0),
+                    'modified_at': getattr(model, 'modified_at', time.time()),
+                    'details': getattr(model, 'details', {})
+                }
+                for model in response.models
+            ]
+        # Handle older Ollama API response format (dict with 'models' key)
+        elif isinstance(response, dict) and 'models' in response:
+            return response.get('models', [])
+        else:
+            logger.error(f"Unexpected response format from Ollama: {response}")
             return []
     
     def load_model(self, model_name: str) -> bool:
@@ -172,7 +508,9 @@ class ModelManager:
             
             if model_name not in model_names:
                 logger.info(f"Pulling model: {model_name}")
-                ollama.pull(model_name)
+                for endpoint in self.endpoints.endpoints:
+                    endpoint.client.pull(model_name)
+                self.invalidate_model_catalog()
                 
             self.active_model = model_name
             logger.info(f"Loaded model: {model_name}")
@@ -182,10 +520,138 @@ class ModelManager:
             logger.error(f"Error loading model {model_name}: {str(e)}")
             return False
     
+    def _resolve_model_entry(self, entry: str) -> str:
+        """
+        Resolve a preload or routing entry to a model name.
+        
+        'active' is the currently active model, entries naming a model
+        config key (e.g. 'default', 'embedding', 'rag') are replaced by
+        the configured model, and anything else is a model name.
+        
+        Args:
+            entry: Entry from the configuration
+            
+        Returns:
+            Model name
+        """
+        if entry == 'active':
+            return self.active_model
+        value = self.config['model'].get(entry)
+        return value if isinstance(value, str) else entry
+    
+    def _resolve_preload_models(self) -> List[str]:
+        """
+        Resolve the configured preload entries to model names.
+        
+        Returns:
+            Model names to preload, without duplicates
+        """
+        names = []
+        for entry in self.preload_models or []:
+            name = self._resolve_model_entry(entry)
+            if name not in names:
+                names.append(name)
+        return names
+    
+    def route_models(self, kwargs: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Get the models to try for a request, in order.
+        
+        An explicit model= wins. Otherwise the fallback chain configured
+        for task= (default 'chat') is resolved, keeping the models that are
+        in the model catalog; the active model is the last resort.
+        
+        Args:
+            kwargs: Keyword arguments of the generation call
+            
+        Returns:
+            Non-empty list of model names
+        """
+        kwargs = kwargs or {}
+        if kwargs.get('model'):
+            return [kwargs['model']]
+        
+        task = kwargs.get('task', TASK_CHAT)
+        chain = self.routes.get(task) or ['active']
+        available = {model.get('name') for model in self.list_models()}
+        
+        models = []
+        for entry in chain:
+            name = self._resolve_model_entry(entry)
+            if name in models:
+                continue
+            if name == self.active_model or name in available or f"{name}:latest" in available:
+                models.append(name)
+        
+        return models or [self.active_model]
+    
+    def warm_up(self, model_name: str) -> bool:
+        """
+        Load a model's weights into memory.
+        
+        Sends an empty request, which makes Ollama load the model without
+        generating anything, and keeps it loaded for keep_alive.
+        
+        Args:
+            model_name: Name of the model to warm up
+            
+        Returns:
+            True if the model was loaded, False otherwise
+        """
+        if not self.ollama_available:
+            logger.info(f"Mock warming up model: {model_name}")
+            return True
+        
+        self._use_model(model_name)
+        
+        start = time.perf_counter()
+        try:
+            for client in self._model_clients(model_name):
+                if model_name == self.embedding_model:
+                    client.embed(model=model_name, input='', keep_alive=self.keep_alive)
+                elif self.context.enabled:
+                    # Load with the window requests will use, so the first
+                    # request does not reload the model
+                    num_ctx = self._context_sizes.setdefault(model_name, self.context.buckets[0])
+                    client.generate(
+                        model=model_name, prompt='', keep_alive=self.keep_alive,
+                        options={'num_ctx': num_ctx}
+                    )
+                else:
+                    client.generate(model=model_name, prompt='', keep_alive=self.keep_alive)
+        except Exception as e:
+            logger.warning(f"Error warming up model {model_name}: {str(e)}")
+            return False
+        
+        logger.info(f"Warmed up model {model_name} in {time.perf_counter() - start:.1f}s")
+        return True
+    
+    def warm_up_async(self, model_names: List[str]) -> threading.Thread:
+        """
+        Warm up models one after another in a background thread.
+        
+        Args:
+            model_names: Names of the models to warm up
+            
+        Returns:
+            The started (daemon) thread
+        """
+        def run():
+            for model_name in model_names:
+                self.warm_up(model_name)
+        
+        thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        thread.start()
+        self.warmup_thread = thread
+        return thread
+    
     def unload_model(self, model_name: str) -> bool:
         """
         Unload a model.
         
+        Asks Ollama to release the model's memory by sending an empty
+        request with keep_alive=0.
+        
         Args:
             model_name: Name of the model to unload
             
@@ -195,12 +661,102 @@ class ModelManager:
         if not self.ollama_available:
             logger.info(f"Mock unloading model: {model_name}")
             return True
-            
-        # For now, we don't actually unload the model
-        # Ollama handles resource management
-        logger.info(f"Model {model_name} will be managed by Ollama")
+        
+        try:
+            for client in self._model_clients(model_name):
+                if model_name == self.embedding_model:
+                    client.embed(model=model_name, input='', keep_alive=0)
+                else:
+                    client.generate(model=model_name, prompt='', keep_alive=0)
+        except Exception as e:
+            logger.error(f"Error unloading model {model_name}: {str(e)}")
+            return False
+        
+        self._context_sizes.pop(model_name, None)
+        logger.info(f"Unloaded model: {model_name}")
         return True
     
+    def _model_clients(self, model_name: str) -> List[Any]:
+        """
+        Get the clients of the endpoints that serve a model.
+        
+        The embedding model is loaded on every endpoint in rotation;
+        other models only on the endpoint their requests stick to.
+        
+        Args:
+            model_name: Name of the model
+            
+        Returns:
+            Sync Ollama clients
+        """
+        operation = 'embed' if model_name == self.embedding_model else 'generate'
+        return [endpoint.client for endpoint in self.endpoints.endpoints_for_model(model_name, operation)]
+    
+    def list_running_models(self) -> List[Dict[str, Any]]:
+        """
+        List the models currently loaded in memory.
+        
+        Returns:
+            List of dictionaries with 'name', 'size' and 'size_vram' (bytes)
+        """
+        if not self.ollama_available:
+            return []
+        
+        try:
+            response = self.client.ps()
+        except Exception as e:
+            logger.error(f"Error listing running models: {str(e)}")
+            return []
+        
+        return [
+            {
+                'name': _response_field(model, 'model') or _response_field(model, 'name'),
+                'size': _response_field(model, 'size', 0) or 0,
+                'size_vram': _response_field(model, 'size_vram', 0) or 0
+            }
+            for model in _response_field(response, 'models', []) or []
+        ]
+    
+    def _make_room(self, model_name: str) -> List[str]:
+        """
+        Unload idle models so that a model fits in the RAM budget.
+        
+        Args:
+            model_name: Model about to be loaded
+            
+        Returns:
+            Names of the unloaded models
+        """
+        if not self.residency.ram_budget_bytes:
+            return []
+        
+        size = 0
+        for model in self.list_models():
+            if model_key(model.get('name') or '') == model_key(model_name):
+                size = model.get('size', 0) or 0
+                break
+        
+        return self.residency.make_room(model_name, size)
+    
+    def _use_model(self, model_name: str):
+        """
+        Prepare a model for a request.
+        
+        Unloads idle models if the model is not loaded yet and would not
+        fit in the RAM budget, and records its use for eviction order.
+        
+        Args:
+            model_name: Model the request is sent to
+        """
+        self._make_room(model_name)
+        self.residency.touch(model_name)
+    
+    async def _ause_model(self, model_name: str):
+        """Async version of _use_model (Ollama is queried in a worker thread)."""
+        if self.residency.ram_budget_bytes:
+            await asyncio.to_thread(self._make_room, model_name)
+        self.residency.touch(model_name)
+    
     def switch_model(self, model_name: str) -> bool:
         """
         Switch to a different model.
@@ -220,6 +776,10 @@ class ModelManager:
         models = self.list_models()
         model_names = [model.get('name') for model in models]
         
+        if model_name not in model_names:
+            # The cached catalog may predate models pulled outside the assistant
+            model_names = [model.get('name') for model in self.list_models(refresh=True)]
+        
         if model_name not in model_names:
             logger.warning(f"Model {model_name} is not available")
             
@@ -231,192 +791,1757 @@ class ModelManager:
         self.active_model = model_name
         logger.info(f"Switched to model: {model_name}")
         
+        # Load the new model's weights before the first query needs them,
+        # unloading idle models if the RAM budget requires it
+        if self.preload_enabled:
+            self.warm_up_async([model_name])
+        else:
+            self._make_room(model_name)
+        
         return True
     
-    def generate_text(self, prompt: str, **kwargs) -> str:
+    def _response_cache_key(self, model: str, request: Any, kwargs: Dict[str, Any]) -> Optional[str]:
         """
-        Generate text using the active model.
+        Get the response cache key of a generation request.
+        
+        Requests are cached when sampling is deterministic (temperature 0)
+        or when the caller passes cache=True; cache=False disables it.
         
         Args:
-            prompt: Input prompt
-            **kwargs: Additional parameters to pass to the model
+            model: Model the request is routed to
+            request: Prompt string or list of chat messages
+            kwargs: Keyword arguments of the generation call
             
         Returns:
-            Generated text
+            Cache key, or None if the request should not be cached
         """
-        if not self.ollama_available:
-            logger.info("Mock generating text (Ollama not available)")
-            time.sleep(1)  # Simulate processing time
-            
-            # Return a mock response
-            return f"This is a mock response from {self.active_model}. Ollama is not available."
-            
-        try:
-            # Check if the generate method requires parameters in 'options'
-            # or directly as keyword arguments based on Ollama version
-            try:
-                # Try the new API format with options
-                params = {
-                    'model': self.active_model,
-                    'prompt': prompt,
-                    'options': {
-                        'temperature': kwargs.get('temperature', self.temperature),
-                        'num_predict': kwargs.get('max_tokens', self.max_tokens)
-                    }
-                }
-                
-                # Generate response
-                response = ollama.generate(**params)
-            except TypeError as e:
-                # If that fails, try the old API format
-                logger.warning(f"Trying old API format: {str(e)}")
-                params = {
-                    'model': self.active_model,
-                    'prompt': prompt
-                }
-                
-                # Add params directly if the options format failed
-                if 'temperature' in kwargs or self.temperature is not None:
-                    params['temperature'] = kwargs.get('temperature', self.temperature)
-                if 'max_tokens' in kwargs or self.max_tokens is not None:
-                    params['num_predict'] = kwargs.get('max_tokens', self.max_tokens)
-                
-                # Generate response
-                response = ollama.generate(**params)
-            
-            # Handle both dictionary and object responses
-            if isinstance(response, dict):
-                return response.get('response', '')
-            elif hasattr(response, 'response'):
-                return response.response
-            else:
-                logger.warning(f"Unexpected response format: {response}")
-                return str(response)
-            
-        except Exception as e:
-            logger.error(f"Error generating text: {str(e)}")
-            return f"Error generating response: {str(e)}"
+        if self.response_cache is None:
+            return None
+        
+        options = self._generation_options(kwargs)
+        if not kwargs.get('cache', options['temperature'] == 0):
+            return None
+        
+        return response_key(model, request, options)
     
-    def generate_chat_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
+    def _generation_options(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Generate a chat response using the active model.
+        Build the Ollama options of a generation request.
         
         Args:
-            messages: List of message dictionaries with 'role' and 'content'
-            **kwargs: Additional parameters to pass to the model
+            kwargs: Keyword arguments of the generation call
             
         Returns:
-            Generated response text
+            Options dictionary
         """
-        if not self.ollama_available:
-            logger.info("Mock generating chat response (Ollama not available)")
-            time.sleep(1)  # Simulate processing time
-            
-            # Return a mock response
-            return f"This is a mock chat response from {self.active_model}. Ollama is not available."
-            
-        try:
-            # Try the new API format with options
-            try:
-                # Set default parameters
-                params = {
-                    'model': self.active_model,
-                    'messages': messages,
-                    'options': {
-                        'temperature': kwargs.get('temperature', self.temperature),
-                        'num_predict': kwargs.get('max_tokens', self.max_tokens)
-                    }
-                }
-                
-                # Generate response
-                response = ollama.chat(**params)
-            except TypeError as e:
-                # If that fails, try the old API format
-                logger.warning(f"Trying old API format: {str(e)}")
-                params = {
-                    'model': self.active_model,
-                    'messages': messages
-                }
-                
-                # Add params directly if the options format failed
-                if 'temperature' in kwargs or self.temperature is not None:
-                    params['temperature'] = kwargs.get('temperature', self.temperature)
-                if 'max_tokens' in kwargs or self.max_tokens is not None:
-                    params['num_predict'] = kwargs.get('max_tokens', self.max_tokens)
-                
-                # Generate response
-                response = ollama.chat(**params)
-            
-            # Handle both old and new Ollama API formats
-            if isinstance(response, dict):
-                # Old format with message dictionary
-                if 'message' in response:
-                    return response['message'].get('content', '')
-                # New format with direct response
-                elif 'response' in response:
-                    return response.get('response', '')
-            # New format with object attributes
-            elif hasattr(response, 'message') and hasattr(response.message, 'content'):
-                return response.message.content
-            elif hasattr(response, 'response'):
-                return response.response
-                
-            # Fallback
-            logger.warning(f"Unexpected response format: {response}")
-            return str(response)
+        options = {
+            'temperature': kwargs.get('temperature', self.temperature),
+            'num_predict': kwargs.get('max_tokens', self.max_tokens)
+        }
+        if kwargs.get('num_ctx'):
+            options['num_ctx'] = kwargs['num_ctx']
+        return options
+    
+    def _context_size(self, model: str, prompt_tokens: int, num_predict: int) -> int:
+        """
+        Choose num_ctx for a request and remember it as the model's window.
+        
+        Args:
+            model: Model to use
+            prompt_tokens: Estimated prompt length in tokens
+            num_predict: Maximum number of generated tokens
             
-        except Exception as e:
-            logger.error(f"Error generating chat response: {str(e)}")
-            return f"Error generating chat response: {str(e)}"
+        Returns:
+            Context window size
+        """
+        current = self._context_sizes.get(model)
+        num_ctx = self.context.choose(prompt_tokens, num_predict, current)
+        if num_ctx != current:
+            logger.info(f"Using a {num_ctx}-token context for {model} (~{prompt_tokens} prompt tokens)")
+        self._context_sizes[model] = num_ctx
+        return num_ctx
     
-    def generate_embeddings(self, texts: Union[str, List[str]]) -> List[List[float]]:
+    def _trim_text(self, text: str, max_tokens: int, model: str) -> str:
         """
-        Generate embeddings for text.
+        Cut the middle of a text so it fits a token budget.
         
         Args:
-            texts: Text or list of texts to embed
+            text: Text to trim
+            max_tokens: Tokens to keep
+            model: Model whose tokens are counted
             
         Returns:
-            List of embedding vectors
+            Start and end of the text, joined by an ellipsis
         """
-        if isinstance(texts, str):
-            texts = [texts]
+        head, tail = self.context.split_budget(max_tokens)
+        start = self.token_counter.truncate_to_token_limit(text, head, model)
+        end = self.token_counter.truncate_to_token_limit(text, tail, model, from_end=True)
+        return f"{start}\n...\n{end}"
+    
+    def _fit_prompt(self, model: str, prompt: str, num_predict: int) -> Tuple[str, int]:
+        """
+        Size the context window for a prompt, trimming prompts that do not fit.
+        
+        Args:
+            model: Model to use
+            prompt: Input prompt
+            num_predict: Maximum number of generated tokens
             
-        if not self.ollama_available:
-            logger.info("Mock generating embeddings (Ollama not available)")
+        Returns:
+            Tuple of (prompt to send, num_ctx)
+        """
+        tokens = self.token_counter.count_tokens(prompt, model)
+        budget = self.context.prompt_budget(num_predict)
+        if tokens > budget:
+            logger.warning(
+                f"Prompt of ~{tokens} tokens does not fit the {self.context.max_ctx}-token "
+                f"context of {model}; trimmed to ~{budget} tokens"
+            )
+            prompt = self._trim_text(prompt, budget, model)
+            tokens = budget
+        return prompt, self._context_size(model, tokens, num_predict)
+    
+    def _fit_messages(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        num_predict: int
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Size the context window for chat messages, trimming conversations that do not fit.
+        
+        The oldest turns after the system prompt are dropped first; if the
+        remaining messages are still too long, the longest one is cut in
+        the middle.
+        
+        Args:
+            model: Model to use
+            messages: List of message dictionaries with 'role' and 'content'
+            num_predict: Maximum number of generated tokens
+            
+        Returns:
+            Tuple of (messages to send, num_ctx)
+        """
+        counts = [
+            self.token_counter.count_tokens(message.get('content', ''), model) + MESSAGE_OVERHEAD_TOKENS
+            for message in messages
+        ]
+        tokens = sum(counts)
+        budget = self.context.prompt_budget(num_predict)
+        
+        if tokens > budget:
+            original_tokens, original_count = tokens, len(messages)
+            messages = list(messages)
+            first = 1 if messages and messages[0].get('role') == 'system' else 0
+            while tokens > budget and len(messages) - first > 1:
+                tokens -= counts.pop(first)
+                messages.pop(first)
+            
+            if tokens > budget:
+                longest = max(range(len(messages)), key=counts.__getitem__)
+                keep = max(counts[longest] - (tokens - budget) - MESSAGE_OVERHEAD_TOKENS, 1)
+                messages[longest] = {
+                    **messages[longest],
+                    'content': self._trim_text(messages[longest].get('content', ''), keep, model)
+                }
+                tokens = budget
+            
+            logger.warning(
+                f"Conversation of ~{original_tokens} tokens does not fit the "
+                f"{self.context.max_ctx}-token context of {model}; dropped "
+                f"{original_count - len(messages)} earlier messages and trimmed to ~{tokens} tokens"
+            )
+        
+        return messages, self._context_size(model, tokens, num_predict)
+    
+    def _generate_params(
+        self,
+        model: str,
+        prompt: str,
+        kwargs: Dict[str, Any],
+        stream: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Build the parameters of a generate request.
+        
+        Unless num_ctx is passed, the context window is sized from the
+        prompt length (see _fit_prompt).
+        
+        Args:
+            model: Model to use
+            prompt: Input prompt
+            kwargs: Keyword arguments of the generation call
+            stream: Whether to stream the response
+            
+        Returns:
+            Keyword arguments for client.generate
+        """
+        options = self._generation_options(kwargs)
+        if self.context.enabled and 'num_ctx' not in options:
+            prompt, options['num_ctx'] = self._fit_prompt(model, prompt, options['num_predict'])
+        
+        params = {
+            'model': model,
+            'prompt': prompt,
+            'options': options,
+            'keep_alive': self.keep_alive
+        }
+        if stream:
+            params['stream'] = True
+        return params
+    
+    def _chat_params(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        kwargs: Dict[str, Any],
+        stream: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Build the parameters of a chat request.
+        
+        Unless num_ctx is passed, the context window is sized from the
+        length of the messages (see _fit_messages).
+        
+        Args:
+            model: Model to use
+            messages: List of message dictionaries with 'role' and 'content'
+            kwargs: Keyword arguments of the generation call
+            stream: Whether to stream the response
+            
+        Returns:
+            Keyword arguments for client.chat
+        """
+        options = self._generation_options(kwargs)
+        if self.context.enabled and 'num_ctx' not in options:
+            messages, options['num_ctx'] = self._fit_messages(model, messages, options['num_predict'])
+        
+        params = {
+            'model': model,
+            'messages': messages,
+            'options': options,
+            'keep_alive': self.keep_alive
+        }
+        if stream:
+            params['stream'] = True
+        return params
+    
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        """
+        Generate text using the model routed for the task.
+        
+        If the request fails, the next model of the task's fallback
+        chain is tried.
+        
+        Args:
+            prompt: Input prompt
+            **kwargs: Additional parameters to pass to the model; pass
+                task= to route the request (default 'chat'), model= to
+                force a model, and cache=True/False to force or skip the
+                response cache (by default only temperature-0 requests
+                are cached)
+        
+        Returns:
+            Generated text
+        
+        Raises:
+            GenerationError: If every model of the fallback chain failed
+        """
+        if not self.ollama_available:
+            logger.info("Mock generating text (Ollama not available)")
+            time.sleep(1)  # Simulate processing time
+            
+            # Return a mock response
+            return f"This is a mock response from {self.active_model}. Ollama is not available."
+        
+        return self._generate_with_fallback('generate', prompt, kwargs)
+    
+    def generate_chat_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        Generate a chat response using the model routed for the task.
+        
+        If the request fails, the next model of the task's fallback
+        chain is tried.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            **kwargs: Additional parameters to pass to the model; see
+                generate_text for task, model and cache
+        
+        Returns:
+            Generated response text
+        
+        Raises:
+            GenerationError: If every model of the fallback chain failed
+        """
+        if not self.ollama_available:
+            logger.info("Mock generating chat response (Ollama not available)")
+            time.sleep(1)  # Simulate processing time
+            
+            # Return a mock response
+            return f"This is a mock chat response from {self.active_model}. Ollama is not available."
+        
+        return self._generate_with_fallback('chat', messages, kwargs)
+    
+    def _generate_with_fallback(self, operation: str, request: Any, kwargs: Dict[str, Any]) -> str:
+        """
+        Send a generate or chat request to the routed models in turn.
+        
+        Args:
+            operation: Client method to call ('generate' or 'chat')
+            request: Prompt string or list of chat messages
+            kwargs: Keyword arguments of the generation call
+        
+        Returns:
+            Text of the first successful (or cached) response
+        
+        Raises:
+            GenerationError: If every model of the fallback chain failed
+        """
+        errors: Dict[str, str] = {}
+        
+        for model in self.route_models(kwargs):
+            cache_key, cached = self._cached_response(model, request, kwargs)
+            if cached is not None:
+                return cached
+            
+            self._use_model(model)
+            try:
+                response = self._call_ollama(
+                    operation, self._request_fn(operation, model, request, kwargs),
+                    key=model, priority=kwargs.get('priority', PRIORITY_INTERACTIVE)
+                )
+            except Exception as e:
+                self._record_model_error(model, e, errors)
+                continue
+            
+            return self._finish_response(model, response, cache_key, kwargs)
+        
+        raise self._generation_failed(errors)
+    
+    def _request_fn(
+        self,
+        operation: str,
+        model: str,
+        request: Any,
+        kwargs: Dict[str, Any],
+        stream: bool = False
+    ) -> Callable[[Any], Any]:
+        """
+        Build the call of a generate or chat request.
+        
+        The returned function works with sync and async clients alike. If
+        the client rejects the request parameters (older Ollama clients),
+        the request is sent again with the options as top-level arguments.
+        
+        Args:
+            operation: Client method to call ('generate' or 'chat')
+            model: Model to use
+            request: Prompt string or list of chat messages
+            kwargs: Keyword arguments of the generation call
+            stream: Whether to request a streamed response
+        
+        Returns:
+            Function making the call with a client
+        """
+        if operation == 'generate':
+            params = self._generate_params(model, request, kwargs, stream=stream)
+            legacy_params = {'model': model, 'prompt': request}
+        else:
+            params = self._chat_params(model, request, kwargs, stream=stream)
+            legacy_params = {'model': model, 'messages': request}
+        
+        # Add params directly if the options format fails
+        if 'temperature' in kwargs or self.temperature is not None:
+            legacy_params['temperature'] = kwargs.get('temperature', self.temperature)
+        if 'max_tokens' in kwargs or self.max_tokens is not None:
+            legacy_params['num_predict'] = kwargs.get('max_tokens', self.max_tokens)
+        if stream:
+            legacy_params['stream'] = True
+        
+        def send(client):
+            method = getattr(client, operation)
+            try:
+                return method(**params)
+            except TypeError as e:
+                logger.warning(f"Trying old API format: {str(e)}")
+                return method(**legacy_params)
+        
+        return send
+    
+    def _cached_response(
+        self,
+        model: str,
+        request: Any,
+        kwargs: Dict[str, Any]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Look up a request in the response cache.
+        
+        Answers are cached under the model that produced them.
+        
+        Args:
+            model: Model the request is about to be sent to
+            request: Prompt string or list of chat messages
+            kwargs: Keyword arguments of the generation call
+        
+        Returns:
+            Tuple of (cache key, or None if the request is not cached;
+            cached text, or None on a miss)
+        """
+        cache_key = self._response_cache_key(model, request, kwargs)
+        if cache_key is None:
+            return None, None
+        
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Serving response of {model} from the response cache")
+        return cache_key, cached
+    
+    def _finish_response(
+        self,
+        model: str,
+        response: Any,
+        cache_key: Optional[str],
+        kwargs: Dict[str, Any]
+    ) -> str:
+        """
+        Record a non-streamed response and store it in the response cache.
+        
+        Args:
+            model: Model that produced the response
+            response: Generate or chat response
+            cache_key: Response cache key (None = not cached)
+            kwargs: Keyword arguments of the generation call
+        
+        Returns:
+            Response text
+        """
+        self._record_metrics(model, kwargs.get('task', TASK_CHAT), response)
+        text = _chunk_text(response)
+        if cache_key is not None:
+            self.response_cache.put(cache_key, text)
+        return text
+    
+    def _record_model_error(self, model: str, error: Exception, errors: Dict[str, str]):
+        """Note a model's failure before falling back to the next one."""
+        errors[model] = str(error)
+        logger.warning(f"Error generating a response with {model}: {str(error)}")
+    
+    def _generation_failed(self, errors: Dict[str, str]) -> GenerationError:
+        """Log and build the error raised once the fallback chain is exhausted."""
+        logger.error(f"Error generating a response: {errors}")
+        return GenerationError(errors)
+    
+    def generate_text_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """
+        Generate text using the model routed for the task, yielding chunks as they arrive.
+        
+        Timing statistics for the call are stored in last_generation_stats
+        once the stream is exhausted.
+        
+        Args:
+            prompt: Input prompt
+            **kwargs: Additional parameters to pass to the model; see
+                generate_text for task and model
+        
+        Yields:
+            Text chunks in generation order
+        
+        Raises:
+            GenerationError: If every model of the fallback chain failed
+                before answering
+        """
+        if not self.ollama_available:
+            logger.info("Mock streaming text (Ollama not available)")
+            mock = f"This is a mock response from {self.active_model}. Ollama is not available."
+            yield from self._record_stream(self._mock_stream(mock), self.active_model)
+            return
+        
+        yield from self._stream_with_fallback('generate', prompt, kwargs)
+    
+    def generate_chat_response_stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        """
+        Generate a chat response using the model routed for the task, yielding chunks.
+        
+        Timing statistics for the call are stored in last_generation_stats
+        once the stream is exhausted.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            **kwargs: Additional parameters to pass to the model; see
+                generate_text for task and model
+        
+        Yields:
+            Response text chunks in generation order
+        
+        Raises:
+            GenerationError: If every model of the fallback chain failed
+                before answering
+        """
+        if not self.ollama_available:
+            logger.info("Mock streaming chat response (Ollama not available)")
+            mock = f"This is a mock chat response from {self.active_model}. Ollama is not available."
+            yield from self._record_stream(self._mock_stream(mock), self.active_model)
+            return
+        
+        yield from self._stream_with_fallback('chat', messages, kwargs)
+    
+    def _stream_with_fallback(
+        self,
+        operation: str,
+        request: Any,
+        kwargs: Dict[str, Any],
+        models: Optional[List[str]] = None,
+        on_answered: Optional[Callable[[str], None]] = None
+    ) -> Iterator[str]:
+        """
+        Stream a response from the first routed model that starts answering.
+        
+        A model that fails before its first chunk is skipped for the next
+        model of the task's fallback chain; once text has been yielded,
+        errors are raised to the caller.
+        
+        Args:
+            operation: Client method to call ('generate' or 'chat')
+            request: Prompt string or list of chat messages
+            kwargs: Keyword arguments of the generation call
+            models: Models to try in order (default: the routed models)
+            on_answered: Called with the model once its stream completed
+        
+        Yields:
+            Text chunks in generation order
+        
+        Raises:
+            GenerationError: If every model of the fallback chain failed
+        """
+        errors: Dict[str, str] = {}
+        
+        for model in models or self.route_models(kwargs):
+            send = self._request_fn(operation, model, request, kwargs, stream=True)
+            self._use_model(model)
+            started = False
+            try:
+                with self.scheduler.slot(kwargs.get('priority', PRIORITY_INTERACTIVE)):
+                    chunks = self._guard_stream(operation, send, model)
+                    for text in self._record_stream(chunks, model, kwargs.get('task', TASK_CHAT)):
+                        started = True
+                        yield text
+                if on_answered is not None:
+                    on_answered(model)
+                return
+            except Exception as e:
+                if started:
+                    raise
+                self._record_model_error(model, e, errors)
+        
+        raise self._generation_failed(errors)
+    
+    def session_chat_stream(
+        self,
+        session: ChatSession,
+        user_message: str,
+        system_prompt: str,
+        context_key: str,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        Answer one turn of a chat session, yielding chunks.
+        
+        The session's earlier messages are sent unchanged, so Ollama can
+        reuse their KV cache and only evaluate the new turn. The session
+        is keyed by the model that answered it: while that model is in the
+        task's fallback chain and context_key is unchanged, it is tried
+        first and system_prompt is ignored. Otherwise the session restarts
+        with system_prompt. If a model fails, the turn falls back like any
+        chat request. The turn is added to the session, under the model
+        that answered it, once the stream completes.
+        
+        Args:
+            session: Chat session to extend
+            user_message: The user's message
+            system_prompt: System message used when the session (re)starts
+            context_key: Key identifying the retrieved context in system_prompt
+            **kwargs: Additional parameters to pass to the model
+            
+        Yields:
+            Response text chunks in generation order
+        """
+        models = self.route_models(kwargs)
+        if session.model in models and session.is_current(session.model, context_key):
+            models.remove(session.model)
+            models.insert(0, session.model)
+        else:
+            session.restart(models[0], context_key, system_prompt)
+        
+        messages = session.messages + [{'role': 'user', 'content': user_message}]
+        
+        answered = [session.model]
+        if self.ollama_available:
+            chunks = self._stream_with_fallback('chat', messages, kwargs, models, on_answered=answered.append)
+        else:
+            chunks = self.generate_chat_response_stream(messages, **kwargs)
+        
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        
+        session.add_turn(user_message, ''.join(parts), model=answered[-1])
+    
+    def _guard_stream(
+        self,
+        operation: str,
+        request: Callable[[Any], Iterator[Any]],
+        key: Optional[str] = None
+    ) -> Iterator[Any]:
+        """
+        Stream a call from an endpoint, reporting the outcome to the circuit breaker.
+        
+        The endpoint counts the stream as outstanding until it is consumed
+        or closed. If the endpoint refuses the connection, the request is
+        sent to another one. Streams have no total deadline; a stalled
+        server is detected by the client's read timeout between chunks.
+        
+        Args:
+            operation: Operation name ('generate' or 'chat')
+            request: Makes the streaming call with a client
+            key: Sticky routing key (the model name)
+            
+        Yields:
+            The streamed chunks
+            
+        Raises:
+            OllamaUnavailable: If the circuit breaker is open
+        """
+        self.circuit_breaker.allow()
+        for remaining in reversed(range(len(self.endpoints))):
+            started = False
+            try:
+                with self.endpoints.lease(operation, key) as endpoint:
+                    for chunk in request(endpoint.client):
+                        started = True
+                        yield chunk
+                break
+            except ConnectionError as e:
+                if started or not remaining:
+                    self._record_call_outcome(e)
+                    raise
+                logger.warning(f"Could not connect to {endpoint.url}, trying another Ollama instance")
+            except Exception as e:
+                self._record_call_outcome(e)
+                raise
+            except BaseException:
+                self._abandon_call(started)
+                raise
+        self.circuit_breaker.record_success()
+    
+    def _mock_stream(self, text: str) -> Iterator[Dict[str, Any]]:
+        """Yield a mock response word by word, like a streaming model."""
+        time.sleep(0.2)  # Simulate prompt processing
+        words = text.split(' ')
+        for i, word in enumerate(words):
+            time.sleep(0.02)
+            yield {'response': word if i == 0 else f" {word}", 'done': False}
+        yield {'response': '', 'done': True}
+    
+    def _record_stream(self, chunks: Iterator[Any], model: str, task: str = TASK_CHAT) -> Iterator[str]:
+        """
+        Extract text from streamed responses and record timing statistics.
+        
+        Args:
+            chunks: Streamed generate or chat responses
+            model: Model producing the stream
+            task: Task type of the request (for the metrics registry)
+            
+        Yields:
+            Text of each chunk
+        """
+        start = time.perf_counter()
+        first_token_at = None
+        parts = []
+        final = None
+        
+        try:
+            for chunk in chunks:
+                text = _chunk_text(chunk)
+                if text:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(text)
+                    yield text
+                if _response_field(chunk, 'done'):
+                    final = chunk
+        finally:
+            # Close the source right away when the consumer stops early
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        
+        self._store_stream_stats(model, start, first_token_at, parts, final, task)
+    
+    def _store_stream_stats(
+        self,
+        model: str,
+        start: float,
+        first_token_at: Optional[float],
+        parts: List[str],
+        final: Any,
+        task: str = TASK_CHAT
+    ):
+        """
+        Compute and store the timing statistics of a finished stream.
+        
+        Args:
+            model: Model that produced the stream
+            start: perf_counter() value when the request was sent
+            first_token_at: perf_counter() value of the first text chunk
+            parts: Text chunks in order
+            final: Last ('done') response, carrying server statistics
+            task: Task type of the request (for the metrics registry)
+        """
+        total_time = time.perf_counter() - start
+        
+        # Prefer the server's own token count and timing when available
+        eval_count = _response_field(final, 'eval_count') if final is not None else None
+        eval_duration = _response_field(final, 'eval_duration') if final is not None else None
+        tokens = eval_count or self.token_counter.count_tokens(''.join(parts), model)
+        
+        if eval_count and eval_duration:
+            tokens_per_second = eval_count / (eval_duration / 1e9)
+        else:
+            generation_time = total_time - ((first_token_at or start) - start)
+            tokens_per_second = tokens / generation_time if generation_time > 0 else 0.0
+        
+        self.last_generation_stats = {
+            'model': model,
+            'time_to_first_token': (first_token_at - start) if first_token_at else None,
+            'total_time': total_time,
+            'tokens': tokens,
+            'tokens_per_second': tokens_per_second,
+            # Prompt tokens evaluated by the server (reused KV cache is skipped)
+            'prompt_tokens': _response_field(final, 'prompt_eval_count') if final is not None else None
+        }
+        
+        logger.info(
+            f"Streamed {tokens} tokens from {model}: "
+            f"TTFT {self.last_generation_stats['time_to_first_token'] or 0.0:.2f}s, "
+            f"{tokens_per_second:.1f} tokens/s"
+        )
+        
+        if final is not None:
+            self._record_metrics(model, task, final)
+    
+    def _record_metrics(self, model: str, task: str, response: Any):
+        """
+        Add the server statistics of a finished generation to the metrics registry.
+        
+        Args:
+            model: Model that produced the response
+            task: Task type of the request
+            response: Non-streamed response or last ('done') stream chunk
+        """
+        self.metrics.record(model, task, {field: _response_field(response, field) for field in STAT_FIELDS})
+    
+    def _get_call_executor(self) -> ThreadPoolExecutor:
+        """
+        Get the thread pool running Ollama calls that have a deadline.
+        
+        Returns:
+            Executor sized for the scheduler's concurrency plus hedged calls
+        """
+        with self._call_executor_lock:
+            if self._call_executor is None:
+                self._call_executor = ThreadPoolExecutor(
+                    max_workers=self.scheduler.max_concurrency * 2 + 2,
+                    thread_name_prefix="ollama-call"
+                )
+            return self._call_executor
+    
+    def _record_call_outcome(self, error: Optional[BaseException] = None):
+        """
+        Report a finished call to the circuit breaker.
+        
+        Any answer from the server (even an error such as an unknown
+        model) shows it is up; only transient errors count as failures.
+        
+        Args:
+            error: Error raised by the call, or None on success
+        """
+        if error is not None and is_transient_error(error):
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+    
+    def _abandon_call(self, answered: bool = False):
+        """
+        Report a call that was cancelled, interrupted or closed early.
+        
+        Its outcome is unknown unless the server had already answered, so
+        a half-open trial is released for the next call to retry.
+        
+        Args:
+            answered: Whether the server had sent part of a response
+        """
+        if answered:
+            self.circuit_breaker.record_success()
+        else:
+            self.circuit_breaker.release_trial()
+    
+    def _take_slot(self, priority: Optional[str]) -> Callable[[], None]:
+        """
+        Wait for a scheduler slot.
+        
+        Args:
+            priority: Scheduler priority class (None = no slot is taken)
+            
+        Returns:
+            Function releasing the slot (call exactly once)
+        """
+        if priority is None:
+            return lambda: None
+        self.scheduler.acquire(priority)
+        return lambda: self.scheduler.release(priority)
+    
+    def _call_limits(self, operation: str, hedge: bool) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Get the deadline and hedging delay of a call.
+        
+        Args:
+            operation: Deadline key ('generate', 'chat', 'embed' or 'list')
+            hedge: Whether the call may be hedged
+        
+        Returns:
+            Tuple of (deadline, seconds after which to send a duplicate
+            request), each None when not used
+        """
+        deadline = self.deadlines.get(operation) or None
+        hedge_after = None
+        if hedge and self.hedge_embeddings:
+            hedge_after = self.embed_latency.percentile(self.hedge_percentile)
+        return deadline, hedge_after
+    
+    def _record_call_success(self, operation: str, start: float):
+        """Report a successful call to the circuit breaker and the latency tracker."""
+        self._record_call_outcome()
+        if operation == 'embed':
+            self.embed_latency.record(time.perf_counter() - start)
+    
+    def _call_ollama(
+        self,
+        operation: str,
+        fn: Callable[[Any], Any],
+        hedge: bool = False,
+        key: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> Any:
+        """
+        Call Ollama through the circuit breaker, bounded by the operation's deadline.
+        
+        Each attempt is sent to an endpoint chosen by the pool's routing
+        policy for the operation, so a hedged duplicate usually goes to
+        a different instance. With a priority, the call holds a scheduler
+        slot until its request has finished, even if that is after the
+        deadline: an abandoned request still occupies the server.
+        
+        Args:
+            operation: Deadline key ('generate', 'chat', 'embed' or 'list')
+            fn: Makes the call with the selected endpoint's client
+            hedge: Send a duplicate request if the call runs past the
+                hedging percentile of recent latencies (idempotent calls only)
+            key: Sticky routing key (the model name)
+            priority: Scheduler priority class (None = no scheduler slot)
+        
+        Returns:
+            Result of fn
+        
+        Raises:
+            OllamaUnavailable: If the circuit breaker is open
+            DeadlineExceeded: If the call does not finish within its deadline
+        """
+        release = self._take_slot(priority)
+        try:
+            self.circuit_breaker.allow()
+        except BaseException:
+            release()
+            raise
+        
+        deadline, hedge_after = self._call_limits(operation, hedge)
+        
+        def attempt():
+            for remaining in reversed(range(len(self.endpoints))):
+                try:
+                    with self.endpoints.lease(operation, key) as endpoint:
+                        return fn(endpoint.client)
+                except ConnectionError:
+                    # The request never reached the instance, which is now
+                    # out of rotation; resend it to another one
+                    if not remaining:
+                        raise
+                    logger.warning(f"Could not connect to {endpoint.url}, trying another Ollama instance")
+        
+        start = time.perf_counter()
+        try:
+            if deadline is None and hedge_after is None:
+                try:
+                    result = attempt()
+                finally:
+                    release()
+            else:
+                result = call_with_deadline(
+                    self._get_call_executor(), attempt, deadline, hedge_after, on_finished=release
+                )
+        except Exception as e:
+            self._record_call_outcome(e)
+            raise
+        except BaseException:
+            self._abandon_call()
+            raise
+        
+        self._record_call_success(operation, start)
+        return result
+    
+    async def _acall_ollama(
+        self,
+        operation: str,
+        fn: Callable[[Any], Awaitable[Any]],
+        hedge: bool = False,
+        key: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> Any:
+        """
+        Async version of _call_ollama.
+        
+        A call that misses its deadline is cancelled, which aborts its
+        HTTP request, so its scheduler slot is released right away.
+        
+        Args:
+            operation: Deadline key ('generate', 'chat', 'embed' or 'list')
+            fn: Returns the coroutine to await, given the selected
+                endpoint's async client
+            hedge: Send a duplicate request if the call runs past the
+                hedging percentile of recent latencies (idempotent calls only)
+            key: Sticky routing key (the model name)
+            priority: Scheduler priority class (None = no scheduler slot)
+        
+        Returns:
+            Result of the call
+        
+        Raises:
+            OllamaUnavailable: If the circuit breaker is open
+            DeadlineExceeded: If the call does not finish within its deadline
+        """
+        if priority is None:
+            return await self._acall_ollama_in_slot(operation, fn, hedge, key)
+        async with self.scheduler.slot_async(priority):
+            return await self._acall_ollama_in_slot(operation, fn, hedge, key)
+    
+    async def _acall_ollama_in_slot(
+        self,
+        operation: str,
+        fn: Callable[[Any], Awaitable[Any]],
+        hedge: bool,
+        key: Optional[str]
+    ) -> Any:
+        """Make the call of _acall_ollama once its scheduler slot is held."""
+        self.circuit_breaker.allow()
+        deadline, hedge_after = self._call_limits(operation, hedge)
+        
+        async def attempt():
+            for remaining in reversed(range(len(self.endpoints))):
+                try:
+                    with self.endpoints.lease(operation, key) as endpoint:
+                        return await fn(endpoint.async_client())
+                except ConnectionError:
+                    if not remaining:
+                        raise
+                    logger.warning(f"Could not connect to {endpoint.url}, trying another Ollama instance")
+        
+        start = time.perf_counter()
+        try:
+            if deadline is None and hedge_after is None:
+                result = await attempt()
+            else:
+                result = await acall_with_deadline(attempt, deadline, hedge_after)
+        except Exception as e:
+            self._record_call_outcome(e)
+            raise
+        except BaseException:
+            # Cancelled (e.g. by asyncio.wait_for) or interrupted
+            self._abandon_call()
+            raise
+        
+        self._record_call_success(operation, start)
+        return result
+    
+    def generate_embeddings(
+        self,
+        texts: Union[str, List[str]],
+        priority: str = PRIORITY_MEMORY
+    ) -> EmbeddingMatrix:
+        """
+        Generate embeddings for text.
+        
+        Cached embeddings are served from the persistent embedding cache;
+        the remaining texts are sent to Ollama's batch embed endpoint in
+        batches bounded by the configured size and token budget, with up
+        to embedding_concurrency requests in flight. With embedding_dim
+        set, vectors are truncated to that many leading dimensions.
+        
+        Args:
+            texts: Text or list of texts to embed
+            priority: Scheduler priority class of the requests
+        
+        Returns:
+            Float32 matrix with one L2-normalized row per text, in input order
+        
+        Raises:
+            EmbeddingError: If any text could not be embedded after retries
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        
+        if not self.ollama_available:
+            logger.info("Mock generating embeddings (Ollama not available)")
             
-            # Return mock embeddings (128-dimensional vectors of 0.0)
-            return [[0.0] * 128 for _ in range(len(texts))]
+            # Return mock embeddings (128-dimensional unless configured, all 0.0)
+            return np.zeros((len(texts), self.embedding_dim or 128), dtype=EMBEDDING_DTYPE)
+        
+        embeddings, missing_texts, batches = self._plan_embeddings(texts)
+        if not missing_texts:
+            return self._stack_embeddings(embeddings)
+        
+        def run_batch(batch: List[int]):
+            return self._embed_batch([missing_texts[i] for i in batch], priority)
+        
+        # Run batches concurrently; results are merged by position, so
+        # the output order always matches the input order
+        if len(batches) > 1 and self.embedding_concurrency > 1:
+            futures = [self._get_embedding_executor().submit(run_batch, batch) for batch in batches]
+            results = [future.result() for future in futures]
+        else:
+            results = [run_batch(batch) for batch in batches]
+        
+        return self._merge_embeddings(embeddings, missing_texts, batches, results)
+    
+    def _plan_embeddings(
+        self,
+        texts: List[str]
+    ) -> Tuple[List[Optional[Embedding]], List[str], List[List[int]]]:
+        """
+        Look texts up in the embedding cache and batch the rest.
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            Tuple of (embeddings in input order with None where not cached,
+            texts that were not cached, request batches of indices into
+            those texts)
+        """
+        if self.embedding_cache is not None:
+            embeddings = self.embedding_cache.get_many(self._embedding_cache_model, texts)
+        else:
+            embeddings = [None] * len(texts)
+        
+        missing_texts = [text for text, embedding in zip(texts, embeddings) if embedding is None]
+        
+        # Without the batch endpoint every text is its own request
+        if self._batch_embed_supported:
+            batches = self._plan_embedding_batches(missing_texts)
+        else:
+            batches = [[i] for i in range(len(missing_texts))]
+        
+        return embeddings, missing_texts, batches
+    
+    def _merge_embeddings(
+        self,
+        embeddings: List[Optional[Embedding]],
+        missing_texts: List[str],
+        batches: List[List[int]],
+        results: List[Tuple[List[Optional[Embedding]], Dict[int, str]]]
+    ) -> EmbeddingMatrix:
+        """
+        Merge freshly computed embeddings into the cached ones.
+        
+        The computed vectors are converted to float32, truncated to
+        embedding_dim and L2-normalized once, here, before they are cached
+        or returned.
+        
+        Args:
+            embeddings: Embeddings in input order (None where not cached)
+            missing_texts: Texts that were not cached, in input order
+            batches: Request batches of indices into missing_texts
+            results: Result of each batch request, as returned by _embed_batch
+        
+        Returns:
+            Float32 matrix with one L2-normalized row per text, in input order
+        
+        Raises:
+            EmbeddingError: If any text could not be embedded
+        """
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        computed: List[Optional[Embedding]] = [None] * len(missing_texts)
+        failures: Dict[int, str] = {}
+        for batch, (vectors, errors) in zip(batches, results):
+            for local_index, vector in enumerate(vectors):
+                computed[batch[local_index]] = vector
+            for local_index, error in errors.items():
+                failures[missing[batch[local_index]]] = error
+        
+        succeeded = [j for j, vector in enumerate(computed) if vector is not None]
+        fresh = None
+        if succeeded:
+            fresh = np.array([computed[j] for j in succeeded], dtype=EMBEDDING_DTYPE)
+            if self.embedding_dim and fresh.shape[1] < self.embedding_dim:
+                logger.warning(
+                    f"{self.embedding_model} returned {fresh.shape[1]}-dimensional embeddings, "
+                    f"fewer than the configured embedding_dim {self.embedding_dim}"
+                )
+            fresh = normalize_rows(truncate_rows(fresh, self.embedding_dim))
+            for row, j in enumerate(succeeded):
+                embeddings[missing[j]] = fresh[row]
+        
+        if self.embedding_cache is not None and succeeded:
+            self.embedding_cache.put_many(
+                self._embedding_cache_model,
+                [missing_texts[j] for j in succeeded],
+                fresh
+            )
+        
+        if failures:
+            logger.error(f"Failed to embed {len(failures)} of {len(embeddings)} texts")
+            raise EmbeddingError(failures, embeddings)
+        
+        # Nothing was cached: the fresh matrix is already in input order
+        if fresh is not None and len(succeeded) == len(embeddings):
+            return fresh
+        return self._stack_embeddings(embeddings)
+    
+    def _stack_embeddings(self, embeddings: List[Embedding]) -> EmbeddingMatrix:
+        """
+        Stack embedding rows into one normalized float32 matrix.
+        
+        Rows read from caches written before vectors were normalized at
+        ingest are normalized here as well.
+        
+        Args:
+            embeddings: Embedding vectors in input order
+        
+        Returns:
+            Matrix with one L2-normalized row per vector
+        """
+        if not embeddings:
+            return np.zeros((0, 0), dtype=EMBEDDING_DTYPE)
+        return normalize_rows(np.array(embeddings, dtype=EMBEDDING_DTYPE))
+    
+    def _get_embedding_executor(self) -> ThreadPoolExecutor:
+        """
+        Get the thread pool used for concurrent embedding requests.
+        
+        Returns:
+            Executor bounded by the configured embedding concurrency
+        """
+        with self._embedding_executor_lock:
+            if self._embedding_executor is None:
+                self._embedding_executor = ThreadPoolExecutor(
+                    max_workers=self.embedding_concurrency,
+                    thread_name_prefix="embed"
+                )
+            return self._embedding_executor
+    
+    def _plan_embedding_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Split texts into embedding request batches.
+        
+        A batch is closed when it reaches the configured maximum number of
+        texts or when adding the next text would exceed the token budget.
+        A single text larger than the budget gets a batch of its own.
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            List of batches, each a list of indices into texts
+        """
+        batches = []
+        current = []
+        current_tokens = 0
+        
+        for i, text in enumerate(texts):
+            tokens = self.token_counter.count_tokens(text, self.embedding_model)
             
-        try:
-            embeddings = []
+            if current and (len(current) >= self.embedding_batch_size or
+                            current_tokens + tokens > self.embedding_batch_tokens):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            
+            current.append(i)
+            current_tokens += tokens
+        
+        if current:
+            batches.append(current)
+        
+        return batches
+    
+    def _embed_request(self, texts: List[str]) -> Callable[[Any], Any]:
+        """Build a batch endpoint request, for sync and async clients alike."""
+        return lambda client: client.embed(model=self.embedding_model, input=texts, keep_alive=self.keep_alive)
+    
+    def _legacy_embed_request(self, text: str) -> Callable[[Any], Any]:
+        """Build a request to the legacy per-text endpoint, for sync and async clients alike."""
+        return lambda client: client.embeddings(model=self.embedding_model, prompt=text)
+    
+    def _batch_vectors(self, response: Any, texts: List[str]) -> Optional[List[Embedding]]:
+        """
+        Read the vectors of a batch embedding response.
+        
+        Args:
+            response: Batch endpoint response
+            texts: Texts of the request
+        
+        Returns:
+            One vector per text, or None if the response does not match the request
+        """
+        vectors = _response_field(response, 'embeddings', []) or []
+        if len(vectors) == len(texts):
+            return list(as_embedding_matrix(vectors))
+        
+        logger.warning(
+            f"Batch embedding returned {len(vectors)} vectors for "
+            f"{len(texts)} texts, retrying per text"
+        )
+        return None
+    
+    def _single_vector(self, response: Any, legacy: bool = False) -> List[float]:
+        """
+        Read the vector of a single-text embedding response.
+        
+        Args:
+            response: Batch or legacy endpoint response
+            legacy: Whether the response is from the legacy endpoint
+        
+        Returns:
+            Embedding vector
+        
+        Raises:
+            ValueError: If the response contains no embedding
+        """
+        if legacy:
+            embedding = _response_field(response, 'embedding')
+        else:
+            vectors = _response_field(response, 'embeddings', []) or []
+            embedding = vectors[0] if len(vectors) == 1 else None
+        
+        if embedding is None:
+            raise ValueError(f"No embedding in response: {response}")
+        return list(embedding)
+    
+    def _batch_endpoint_missing(self, error: Exception) -> bool:
+        """
+        Check whether an error means the batch embed endpoint is not available.
+        
+        The first such error switches all later requests to the legacy
+        per-text endpoint.
+        
+        Args:
+            error: Error raised by a batch endpoint request
+        
+        Returns:
+            True if the endpoint (or client method) does not exist
+        """
+        if not (isinstance(error, AttributeError) or getattr(error, 'status_code', None) == 404):
+            return False
+        
+        if self._batch_embed_supported:
+            logger.warning("Batch embedding endpoint not available, using per-text requests")
+            self._batch_embed_supported = False
+        return True
+    
+    def _embedding_retry_policy(self) -> Dict[str, Any]:
+        """Get the retry_call/aretry_call arguments for single-text embedding requests."""
+        return {
+            'attempts': self.embedding_retries + 1,
+            'base_delay': self.retry_base_delay,
+            'max_delay': self.retry_max_delay,
+            'should_retry': lambda e: not isinstance(e, OllamaUnavailable),
+            'description': "Embedding"
+        }
+    
+    def _embed_batch(
+        self,
+        texts: List[str],
+        priority: Optional[str] = None
+    ) -> Tuple[List[Optional[Embedding]], Dict[int, str]]:
+        """
+        Embed a batch of texts with one request to the batch endpoint.
+        
+        Falls back to one request per text if the server or client does
+        not support the batch endpoint, or if the batch request fails.
+        Each request takes its own scheduler slot, so no slot is held
+        while waiting to retry.
+        
+        Args:
+            texts: Texts to embed
+            priority: Scheduler priority class of the requests
+        
+        Returns:
+            Tuple of (vectors in input order with None for failed texts,
+            mapping of failed positions to error messages)
+        """
+        if self._batch_embed_supported and len(texts) > 1:
+            try:
+                response = self._call_ollama('embed', self._embed_request(texts), hedge=True, priority=priority)
+                vectors = self._batch_vectors(response, texts)
+                if vectors is not None:
+                    return vectors, {}
+            except Exception as e:
+                if not self._batch_endpoint_missing(e):
+                    logger.warning(f"Batch embedding request failed, retrying per text: {str(e)}")
+        
+        vectors: List[Optional[Embedding]] = []
+        errors: Dict[int, str] = {}
+        for i, text in enumerate(texts):
+            try:
+                vectors.append(self._embed_single_with_retries(text, priority))
+            except Exception as e:
+                vectors.append(None)
+                errors[i] = str(e)
+        
+        return vectors, errors
+    
+    def _embed_single_with_retries(self, text: str, priority: Optional[str] = None) -> List[float]:
+        """
+        Embed one text, retrying failed requests with jittered backoff.
+        
+        Args:
+            text: Text to embed
+            priority: Scheduler priority class of the requests
+        
+        Returns:
+            Embedding vector
+        
+        Raises:
+            Exception: The last error once all attempts have failed
+        """
+        return retry_call(lambda: self._embed_single(text, priority), **self._embedding_retry_policy())
+    
+    def _embed_single(self, text: str, priority: Optional[str] = None) -> List[float]:
+        """
+        Embed one text.
+        
+        Uses the batch endpoint with a single input when it is supported,
+        otherwise the legacy per-text endpoint.
+        
+        Args:
+            text: Text to embed
+            priority: Scheduler priority class of the request
+        
+        Returns:
+            Embedding vector
+        
+        Raises:
+            ValueError: If the response contains no embedding
+        """
+        if self._batch_embed_supported:
+            try:
+                response = self._call_ollama('embed', self._embed_request([text]), hedge=True, priority=priority)
+                return self._single_vector(response)
+            except Exception as e:
+                if not self._batch_endpoint_missing(e):
+                    raise
+        
+        response = self._call_ollama('embed', self._legacy_embed_request(text), hedge=True, priority=priority)
+        return self._single_vector(response, legacy=True)
+    
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """
+        Generate text using the routed model without blocking the event loop.
+        
+        Cancelling the awaiting task (e.g. on Ctrl-C or through
+        asyncio.wait_for) aborts the HTTP request and frees its
+        scheduler slot.
+        
+        Args:
+            prompt: Input prompt
+            **kwargs: Same parameters as generate_text
+        
+        Returns:
+            Generated text
+        
+        Raises:
+            GenerationError: If every model of the fallback chain failed
+        """
+        if not self.ollama_available:
+            logger.info("Mock generating text (Ollama not available)")
+            await asyncio.sleep(1)  # Simulate processing time
+            return f"This is a mock response from {self.active_model}. Ollama is not available."
+        
+        return await self._agenerate_with_fallback('generate', prompt, kwargs)
+    
+    async def achat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        Generate a chat response without blocking the event loop.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            **kwargs: Same parameters as generate_chat_response
+        
+        Returns:
+            Generated response text
+        
+        Raises:
+            GenerationError: If every model of the fallback chain failed
+        """
+        if not self.ollama_available:
+            logger.info("Mock generating chat response (Ollama not available)")
+            await asyncio.sleep(1)  # Simulate processing time
+            return f"This is a mock chat response from {self.active_model}. Ollama is not available."
+        
+        return await self._agenerate_with_fallback('chat', messages, kwargs)
+    
+    async def _agenerate_with_fallback(self, operation: str, request: Any, kwargs: Dict[str, Any]) -> str:
+        """Async version of _generate_with_fallback."""
+        errors: Dict[str, str] = {}
+        
+        for model in self.route_models(kwargs):
+            cache_key, cached = self._cached_response(model, request, kwargs)
+            if cached is not None:
+                return cached
             
-            for text in texts:
-                # Generate embedding
-                response = ollama.embeddings(
-                    model=self.embedding_model,
-                    prompt=text
+            await self._ause_model(model)
+            try:
+                response = await self._acall_ollama(
+                    operation, self._request_fn(operation, model, request, kwargs),
+                    key=model, priority=kwargs.get('priority', PRIORITY_INTERACTIVE)
                 )
-                
-                # Extract embedding from response
-                if isinstance(response, dict) and 'embedding' in response:
-                    embeddings.append(response['embedding'])
-                elif hasattr(response, 'embedding'):
-                    embeddings.append(response.embedding)
-                else:
-                    logger.error(f"No embedding in response: {response}")
-                    embeddings.append([0.0] * 128)  # Fallback
+            except Exception as e:
+                self._record_model_error(model, e, errors)
+                continue
+            
+            return self._finish_response(model, response, cache_key, kwargs)
+        
+        raise self._generation_failed(errors)
+    
+    async def agenerate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Generate text asynchronously, yielding chunks as they arrive.
+        
+        Closing or cancelling the iteration closes the HTTP stream.
+        
+        Args:
+            prompt: Input prompt
+            **kwargs: Same parameters as generate_text_stream
+        
+        Yields:
+            Text chunks in generation order
+        
+        Raises:
+            GenerationError: If every model of the fallback chain failed
+                before answering
+        """
+        if not self.ollama_available:
+            logger.info("Mock streaming text (Ollama not available)")
+            mock = f"This is a mock response from {self.active_model}. Ollama is not available."
+            async for text in self._arecord_stream(self._amock_stream(mock), self.active_model):
+                yield text
+            return
+        
+        async for text in self._astream_with_fallback('generate', prompt, kwargs):
+            yield text
+    
+    async def achat_stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """
+        Generate a chat response asynchronously, yielding chunks.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            **kwargs: Same parameters as generate_chat_response_stream
+        
+        Yields:
+            Response text chunks in generation order
+        
+        Raises:
+            GenerationError: If every model of the fallback chain failed
+                before answering
+        """
+        if not self.ollama_available:
+            logger.info("Mock streaming chat response (Ollama not available)")
+            mock = f"This is a mock chat response from {self.active_model}. Ollama is not available."
+            async for text in self._arecord_stream(self._amock_stream(mock), self.active_model):
+                yield text
+            return
+        
+        async for text in self._astream_with_fallback('chat', messages, kwargs):
+            yield text
+    
+    async def _astream_with_fallback(
+        self,
+        operation: str,
+        request: Any,
+        kwargs: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """
+        Async version of _stream_with_fallback.
+        
+        Args:
+            operation: Client method to call ('generate' or 'chat')
+            request: Prompt string or list of chat messages
+            kwargs: Keyword arguments of the generation call
+        
+        Yields:
+            Text chunks in generation order
+        
+        Raises:
+            GenerationError: If every model of the fallback chain failed
+        """
+        errors: Dict[str, str] = {}
+        
+        for model in self.route_models(kwargs):
+            send = self._request_fn(operation, model, request, kwargs, stream=True)
+            await self._ause_model(model)
+            started = False
+            try:
+                async with self.scheduler.slot_async(kwargs.get('priority', PRIORITY_INTERACTIVE)):
+                    chunks = self._aguard_stream(operation, send, model)
+                    async for text in self._arecord_stream(chunks, model, kwargs.get('task', TASK_CHAT)):
+                        started = True
+                        yield text
+                return
+            except Exception as e:
+                if started:
+                    raise
+                self._record_model_error(model, e, errors)
+        
+        raise self._generation_failed(errors)
+    
+    async def _aguard_stream(
+        self,
+        operation: str,
+        request: Callable[[Any], Awaitable[AsyncIterator[Any]]],
+        key: Optional[str] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Async version of _guard_stream.
+        
+        Args:
+            operation: Operation name ('generate' or 'chat')
+            request: Makes the streaming call with an async client
+            key: Sticky routing key (the model name)
             
-            return embeddings
+        Yields:
+            The streamed chunks
             
-        except Exception as e:
-            logger.error(f"Error generating embeddings: {str(e)}")
-            return [[0.0] * 128 for _ in range(len(texts))]  # Fallback
+        Raises:
+            OllamaUnavailable: If the circuit breaker is open
+        """
+        self.circuit_breaker.allow()
+        for remaining in reversed(range(len(self.endpoints))):
+            started = False
+            try:
+                with self.endpoints.lease(operation, key) as endpoint:
+                    async for chunk in await request(endpoint.async_client()):
+                        started = True
+                        yield chunk
+                break
+            except ConnectionError as e:
+                if started or not remaining:
+                    self._record_call_outcome(e)
+                    raise
+                logger.warning(f"Could not connect to {endpoint.url}, trying another Ollama instance")
+            except Exception as e:
+                self._record_call_outcome(e)
+                raise
+            except BaseException:
+                self._abandon_call(started)
+                raise
+        self.circuit_breaker.record_success()
+    
+    async def _amock_stream(self, text: str) -> AsyncIterator[Dict[str, Any]]:
+        """Async version of _mock_stream."""
+        await asyncio.sleep(0.2)  # Simulate prompt processing
+        words = text.split(' ')
+        for i, word in enumerate(words):
+            await asyncio.sleep(0.02)
+            yield {'response': word if i == 0 else f" {word}", 'done': False}
+        yield {'response': '', 'done': True}
+    
+    async def _arecord_stream(
+        self,
+        chunks: AsyncIterator[Any],
+        model: str,
+        task: str = TASK_CHAT
+    ) -> AsyncIterator[str]:
+        """
+        Async version of _record_stream.
+        
+        Args:
+            chunks: Streamed generate or chat responses
+            model: Model producing the stream
+            task: Task type of the request (for the metrics registry)
+            
+        Yields:
+            Text of each chunk
+        """
+        start = time.perf_counter()
+        first_token_at = None
+        parts = []
+        final = None
+        
+        try:
+            async for chunk in chunks:
+                text = _chunk_text(chunk)
+                if text:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(text)
+                    yield text
+                if _response_field(chunk, 'done'):
+                    final = chunk
+        finally:
+            # Close the source right away when the consumer stops early
+            if hasattr(chunks, 'aclose'):
+                await chunks.aclose()
+        
+        self._store_stream_stats(model, start, first_token_at, parts, final, task)
+    
+    async def aembed(
+        self,
+        texts: Union[str, List[str]],
+        priority: str = PRIORITY_MEMORY
+    ) -> EmbeddingMatrix:
+        """
+        Generate embeddings without blocking the event loop.
+        
+        Uses the same cache, batching and retry policy as
+        generate_embeddings; batches are sent concurrently.
+        
+        Args:
+            texts: Text or list of texts to embed
+            priority: Scheduler priority class of the requests
+        
+        Returns:
+            Float32 matrix with one L2-normalized row per text, in input order
+        
+        Raises:
+            EmbeddingError: If any text could not be embedded after retries
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        
+        if not self.ollama_available:
+            logger.info("Mock generating embeddings (Ollama not available)")
+            return np.zeros((len(texts), self.embedding_dim or 128), dtype=EMBEDDING_DTYPE)
+        
+        embeddings, missing_texts, batches = self._plan_embeddings(texts)
+        if not missing_texts:
+            return self._stack_embeddings(embeddings)
+        
+        results = await asyncio.gather(*(
+            self._aembed_batch([missing_texts[i] for i in batch], priority) for batch in batches
+        ))
+        
+        return self._merge_embeddings(embeddings, missing_texts, batches, list(results))
+    
+    async def _aembed_batch(
+        self,
+        texts: List[str],
+        priority: Optional[str] = None
+    ) -> Tuple[List[Optional[Embedding]], Dict[int, str]]:
+        """
+        Async version of _embed_batch.
+        
+        Args:
+            texts: Texts to embed
+            priority: Scheduler priority class of the requests
+        
+        Returns:
+            Tuple of (vectors in input order with None for failed texts,
+            mapping of failed positions to error messages)
+        """
+        if self._batch_embed_supported and len(texts) > 1:
+            try:
+                response = await self._acall_ollama(
+                    'embed', self._embed_request(texts), hedge=True, priority=priority
+                )
+                vectors = self._batch_vectors(response, texts)
+                if vectors is not None:
+                    return vectors, {}
+            except Exception as e:
+                if not self._batch_endpoint_missing(e):
+                    logger.warning(f"Batch embedding request failed, retrying per text: {str(e)}")
+        
+        vectors: List[Optional[Embedding]] = []
+        errors: Dict[int, str] = {}
+        for i, text in enumerate(texts):
+            try:
+                vectors.append(await aretry_call(
+                    lambda: self._aembed_single(text, priority), **self._embedding_retry_policy()
+                ))
+            except Exception as e:
+                vectors.append(None)
+                errors[i] = str(e)
+        
+        return vectors, errors
+    
+    async def _aembed_single(self, text: str, priority: Optional[str] = None) -> List[float]:
+        """
+        Async version of _embed_single.
+        
+        Args:
+            text: Text to embed
+            priority: Scheduler priority class of the request
+        
+        Returns:
+            Embedding vector
+        
+        Raises:
+            ValueError: If the response contains no embedding
+        """
+        if self._batch_embed_supported:
+            try:
+                response = await self._acall_ollama(
+                    'embed', self._embed_request([text]), hedge=True, priority=priority
+                )
+                return self._single_vector(response)
+            except Exception as e:
+                if not self._batch_endpoint_missing(e):
+                    raise
+        
+        response = await self._acall_ollama(
+            'embed', self._legacy_embed_request(text), hedge=True, priority=priority
+        )
+        return self._single_vector(response, legacy=True)
+    
+    async def aclose(self):
+        """Close the async clients' connections (call from their event loop)."""
+        if self.endpoints is not None:
+            await self.endpoints.aclose()
     
     def shutdown(self):
         """Clean up resources before exit."""
+        if self.metrics_dump_on_exit and self.metrics.summary():
+            try:
+                self.metrics.dump(self.metrics_dump_path)
+            except Exception as e:
+                logger.warning(f"Could not write generation metrics: {str(e)}")
+        
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+        
+        if self.response_cache is not None:
+            self.response_cache.close()
+        
+        if self._embedding_executor is not None:
+            self._embedding_executor.shutdown(wait=False)
+        
+        if self._call_executor is not None:
+            self._call_executor.shutdown(wait=False)
+        
         if not self.ollama_available:
             return
             
         logger.info("Shutting down model manager")
-        # Nothing to do for now, as Ollama manages its own resources 
\ No newline at end of file
+        
+        # Stop health checks and close pooled connections
+        self.endpoints.close() 
\ No newline at end of file
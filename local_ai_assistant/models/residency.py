@@ -0,0 +1,133 @@
+"""
+Model residency management for Local AI Assistant.
+
+This module decides which loaded Ollama models to unload so the models
+resident in memory stay within a configured RAM budget.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+
+def model_key(model_name: str) -> str:
+    """
+    Normalize a model name for comparison.
+
+    Ollama reports models with their tag (e.g. 'nomic-embed-text:latest'),
+    while the configuration usually names them without one, which means
+    the 'latest' tag.
+
+    Args:
+        model_name: Model name, with or without a tag
+
+    Returns:
+        The name with an explicit tag
+    """
+    if ':' in model_name.rsplit('/', 1)[-1]:
+        return model_name
+    return f"{model_name}:latest"
+
+
+class ModelResidencyManager:
+    """
+    Keeps resident models within a RAM budget.
+
+    Loaded models are read from Ollama's running-models API (through the
+    list_running callable). When a model is about to be loaded and the
+    budget would be exceeded, unpinned models are unloaded in order of
+    priority (lowest first) and then least recent use.
+    """
+
+    def __init__(
+        self,
+        list_running: Callable[[], List[Dict[str, Any]]],
+        unload: Callable[[str], bool],
+        ram_budget_bytes: int = 0,
+        pinned: Optional[Iterable[str]] = None,
+        priorities: Optional[Dict[str, int]] = None
+    ):
+        """
+        Initialize the residency manager.
+
+        Args:
+            list_running: Returns the loaded models as dicts with 'name'
+                and 'size' (bytes)
+            unload: Unloads a model by name, returning True on success
+            ram_budget_bytes: Maximum total size of loaded models (0 = no limit)
+            pinned: Models that are never unloaded
+            priorities: Model priorities; higher priorities stay loaded longer
+        """
+        self.list_running = list_running
+        self.unload = unload
+        self.ram_budget_bytes = max(0, int(ram_budget_bytes))
+        self.pinned = {model_key(name) for name in pinned or []}
+        self.priorities = {model_key(name): priority for name, priority in (priorities or {}).items()}
+
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, model_name: str):
+        """
+        Record that a model was just used.
+
+        Args:
+            model_name: Name of the model
+        """
+        self._last_used[model_key(model_name)] = time.monotonic()
+
+    def make_room(self, model_name: str, size_bytes: int = 0) -> List[str]:
+        """
+        Unload models until the given model fits in the RAM budget.
+
+        Args:
+            model_name: Model about to be loaded (never unloaded here)
+            size_bytes: Estimated memory size of that model
+
+        Returns:
+            Names of the unloaded models
+        """
+        if not self.ram_budget_bytes:
+            return []
+
+        with self._lock:
+            running = self.list_running()
+            resident = {model_key(model['name']): int(model.get('size', 0) or 0) for model in running}
+            names = {model_key(model['name']): model['name'] for model in running}
+            key = model_key(model_name)
+
+            # An already loaded model needs no extra room
+            needed = 0 if key in resident else int(size_bytes or 0)
+            total = sum(resident.values())
+
+            if total + needed <= self.ram_budget_bytes:
+                return []
+
+            candidates = sorted(
+                (name for name in resident if name != key and name not in self.pinned),
+                key=lambda name: (self.priorities.get(name, 0), self._last_used.get(name, 0.0))
+            )
+
+            unloaded = []
+            for name in candidates:
+                if total + needed <= self.ram_budget_bytes:
+                    break
+                if self.unload(names[name]):
+                    total -= resident[name]
+                    unloaded.append(names[name])
+                    self._last_used.pop(name, None)
+
+            if total + needed > self.ram_budget_bytes:
+                logger.warning(
+                    f"Loading {model_name} exceeds the RAM budget by "
+                    f"{(total + needed - self.ram_budget_bytes) / 1e9:.1f} GB"
+                )
+
+        if unloaded:
+            logger.info(f"Unloaded {', '.join(unloaded)} to make room for {model_name}")
+        return unloaded
@@ -0,0 +1,423 @@
+"""
+Failure handling for calls to the Ollama server.
+
+This module provides per-call deadlines, jittered exponential backoff,
+a circuit breaker that fails fast while the server is down, and hedged
+duplicate requests for calls that run past their usual latency.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Awaitable, Callable, Deque, List, Optional
+
+# httpx is installed with the ollama client; its transport errors are transient
+try:
+    import httpx
+    _TRANSPORT_ERRORS = (httpx.TransportError,)
+except ImportError:
+    _TRANSPORT_ERRORS = ()
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call to Ollama does not finish within its deadline."""
+
+
+class OllamaUnavailable(RuntimeError):
+    """Raised without contacting Ollama while the circuit breaker is open."""
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Check whether an error indicates the server is down or overloaded.
+
+    Timeouts, connection failures and 5xx responses are transient;
+    errors such as an unknown model (404) are not.
+
+    Args:
+        error: Exception raised by a client call
+
+    Returns:
+        True if the error should count against the circuit breaker
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, OllamaUnavailable) + _TRANSPORT_ERRORS):
+        return True
+
+    status_code = getattr(error, 'status_code', None)
+    return isinstance(status_code, int) and status_code >= 500
+
+
+def backoff_delay(attempt: int, base_delay: float = 0.2, max_delay: float = 5.0) -> float:
+    """
+    Compute a jittered exponential backoff delay ("full jitter").
+
+    Args:
+        attempt: Number of the failed attempt (0 for the first)
+        base_delay: Delay bound of the first retry in seconds
+        max_delay: Upper bound of any delay in seconds
+
+    Returns:
+        Seconds to sleep before the next attempt
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def retry_call(
+    fn: Callable[[], Any],
+    attempts: int = 3,
+    base_delay: float = 0.2,
+    max_delay: float = 5.0,
+    should_retry: Callable[[BaseException], bool] = lambda e: True,
+    description: str = "call"
+) -> Any:
+    """
+    Call fn, retrying failures with jittered exponential backoff.
+
+    Only use this for idempotent calls.
+
+    Args:
+        fn: Function to call
+        attempts: Maximum number of attempts
+        base_delay: Delay bound of the first retry in seconds
+        max_delay: Upper bound of any delay in seconds
+        should_retry: Decides whether an error is worth retrying
+        description: Name of the call, for logging
+
+    Returns:
+        Result of fn
+
+    Raises:
+        Exception: The last error once all attempts have failed
+    """
+    attempts = max(1, attempts)
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not should_retry(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning(f"{description} attempt {attempt + 1} failed, retrying in {delay:.2f}s: {str(e)}")
+            time.sleep(delay)
+
+
+async def aretry_call(
+    fn: Callable[[], Awaitable[Any]],
+    attempts: int = 3,
+    base_delay: float = 0.2,
+    max_delay: float = 5.0,
+    should_retry: Callable[[BaseException], bool] = lambda e: True,
+    description: str = "call"
+) -> Any:
+    """
+    Async version of retry_call.
+
+    Args:
+        fn: Returns the coroutine to await for each attempt
+        attempts: Maximum number of attempts
+        base_delay: Delay bound of the first retry in seconds
+        max_delay: Upper bound of any delay in seconds
+        should_retry: Decides whether an error is worth retrying
+        description: Name of the call, for logging
+
+    Returns:
+        Result of the awaited call
+
+    Raises:
+        Exception: The last error once all attempts have failed
+    """
+    attempts = max(1, attempts)
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not should_retry(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning(f"{description} attempt {attempt + 1} failed, retrying in {delay:.2f}s: {str(e)}")
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while the server keeps failing.
+
+    After failure_threshold consecutive transient failures the circuit
+    opens and calls are rejected with OllamaUnavailable. After
+    reset_timeout seconds one trial call is let through (half-open); its
+    success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize a closed circuit breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds before a trial call is allowed
+        """
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Check that a call may be sent.
+
+        Raises:
+            OllamaUnavailable: If the circuit is open
+        """
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return
+
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == STATE_OPEN and remaining <= 0:
+                self.state = STATE_HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == STATE_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                logger.info("Circuit breaker half-open, sending a trial request to Ollama")
+                return
+
+            raise OllamaUnavailable(
+                f"Ollama appears to be down; not retrying for another {max(remaining, 0):.0f}s"
+            )
+
+    def record_success(self):
+        """Record a successful call (closes the circuit)."""
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                logger.info("Ollama is reachable again, closing circuit breaker")
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Record a transient failure (may open the circuit)."""
+        with self._lock:
+            self.failures += 1
+            if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    logger.warning(
+                        f"Opening circuit breaker after {self.failures} failed Ollama calls "
+                        f"(retry in {self.reset_timeout:.0f}s)"
+                    )
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def release_trial(self):
+        """
+        Give up a half-open trial whose outcome is unknown.
+
+        Called when the trial call is cancelled or interrupted, so that the
+        next call becomes the trial instead of every call being rejected.
+        """
+        with self._lock:
+            if self.state == STATE_HALF_OPEN:
+                self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of call latencies with percentile lookup."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """
+        Initialize an empty tracker.
+
+        Args:
+            window: Number of recent latencies kept
+            min_samples: Samples needed before percentiles are reported
+        """
+        self.min_samples = max(1, int(min_samples))
+        self._samples: Deque[float] = deque(maxlen=max(1, int(window)))
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """Add one latency sample."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Get a latency percentile.
+
+        Args:
+            fraction: Percentile as a fraction (e.g. 0.95)
+
+        Returns:
+            Latency in seconds, or None if there are too few samples
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _when_all_done(futures: List[Future], callback: Callable[[], None]):
+    """Call callback once every future has finished or been cancelled."""
+    if not futures:
+        callback()
+        return
+
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_future):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            callback()
+
+    for future in futures:
+        future.add_done_callback(done)
+
+
+def call_with_deadline(
+    executor: Executor,
+    fn: Callable[[], Any],
+    deadline: Optional[float] = None,
+    hedge_after: Optional[float] = None,
+    on_finished: Optional[Callable[[], None]] = None
+) -> Any:
+    """
+    Run fn in a worker thread, bounded by a deadline and optionally hedged.
+
+    If hedge_after seconds pass without a result, a duplicate call is
+    started and the first successful result wins. A call that misses the
+    deadline keeps running in its worker thread, but its result is
+    discarded.
+
+    Args:
+        executor: Executor running the calls
+        fn: Function to call (must be idempotent when hedging)
+        deadline: Maximum seconds to wait for a result (None = no limit)
+        hedge_after: Seconds after which to start a duplicate call
+        on_finished: Called once every started call has finished, which
+            may be after this function returned (e.g. to release
+            resources held by calls that missed the deadline)
+
+    Returns:
+        Result of the first successful call
+
+    Raises:
+        DeadlineExceeded: If no call succeeds before the deadline
+        Exception: The first call's error if all calls failed
+    """
+    start = time.monotonic()
+    end = None if deadline is None else start + deadline
+    submitted: List[Future] = []
+    failed: List[Future] = []
+    hedged = hedge_after is None
+
+    try:
+        pending = [executor.submit(fn)]
+        submitted.append(pending[0])
+        while pending:
+            timeout = None if end is None else max(0.0, end - time.monotonic())
+            if not hedged:
+                until_hedge = max(0.0, start + hedge_after - time.monotonic())
+                timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                pending.remove(future)
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                failed.append(future)
+
+            if end is not None and time.monotonic() >= end and pending:
+                raise DeadlineExceeded(f"No response within {deadline:.0f}s")
+
+            if not hedged and not done and time.monotonic() >= start + hedge_after:
+                hedged = True
+                logger.debug(f"Hedging a call still running after {hedge_after:.2f}s")
+                pending.append(executor.submit(fn))
+                submitted.append(pending[-1])
+
+        raise failed[0].exception()
+    finally:
+        if on_finished is not None:
+            _when_all_done(submitted, on_finished)
+
+
+async def acall_with_deadline(
+    fn: Callable[[], Awaitable[Any]],
+    deadline: Optional[float] = None,
+    hedge_after: Optional[float] = None
+) -> Any:
+    """
+    Async version of call_with_deadline.
+
+    Calls run as tasks on the running event loop. Unlike threads, tasks
+    can be cancelled, so calls still running when a result arrives, the
+    deadline passes or the caller is cancelled are cancelled.
+
+    Args:
+        fn: Returns the coroutine to await (must be idempotent when hedging)
+        deadline: Maximum seconds to wait for a result (None = no limit)
+        hedge_after: Seconds after which to start a duplicate call
+
+    Returns:
+        Result of the first successful call
+
+    Raises:
+        DeadlineExceeded: If no call succeeds before the deadline
+        Exception: The first call's error if all calls failed
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    end = None if deadline is None else start + deadline
+    pending = {asyncio.ensure_future(fn())}
+    failed: List[asyncio.Future] = []
+    hedged = hedge_after is None
+
+    try:
+        while pending:
+            timeout = None if end is None else max(0.0, end - loop.time())
+            if not hedged:
+                until_hedge = max(0.0, start + hedge_after - loop.time())
+                timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                failed.append(task)
+
+            if end is not None and loop.time() >= end and pending:
+                raise DeadlineExceeded(f"No response within {deadline:.0f}s")
+
+            if not hedged and not done and loop.time() >= start + hedge_after:
+                hedged = True
+                logger.debug(f"Hedging a call still running after {hedge_after:.2f}s")
+                pending.add(asyncio.ensure_future(fn()))
+
+        raise failed[0].exception()
+    finally:
+        for task in pending:
+            task.cancel()
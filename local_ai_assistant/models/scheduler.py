@@ -0,0 +1,253 @@
+"""
+Request scheduler for Local AI Assistant.
+
+This module orders requests to the Ollama server by priority class, so
+interactive generation is not stuck behind bulk embedding or debug
+analysis requests.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+# Priority classes, highest priority first
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_MEMORY = 'memory'
+PRIORITY_INDEXING = 'indexing'
+PRIORITY_ANALYSIS = 'analysis'
+PRIORITY_CLASSES = [PRIORITY_INTERACTIVE, PRIORITY_MEMORY, PRIORITY_INDEXING, PRIORITY_ANALYSIS]
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised when a request is rejected because its class queue is full or it timed out."""
+
+
+class RequestScheduler:
+    """
+    Priority scheduler with per-class concurrency limits.
+
+    At most max_concurrency requests run at once, and at most the class
+    limit of each class. A free slot always goes to the oldest waiting
+    request of the highest-priority class that is under its limit. Each
+    class can bound its queue; requests beyond the bound are rejected
+    with SchedulerBusy (backpressure).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        class_limits: Optional[Dict[str, int]] = None,
+        max_queue: Optional[Dict[str, int]] = None
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrency: Maximum number of requests running at once
+            class_limits: Maximum running requests per class (default: max_concurrency)
+            max_queue: Maximum waiting requests per class (0 or missing = unbounded)
+        """
+        self.max_concurrency = max(1, int(max_concurrency))
+        class_limits = class_limits or {}
+        max_queue = max_queue or {}
+
+        self.class_limits = {
+            name: max(1, int(class_limits.get(name, self.max_concurrency)))
+            for name in PRIORITY_CLASSES
+        }
+        self.max_queue = {name: max(0, int(max_queue.get(name, 0) or 0)) for name in PRIORITY_CLASSES}
+
+        self._condition = threading.Condition()
+        self._waiting: Dict[str, List[int]] = {name: [] for name in PRIORITY_CLASSES}
+        self._running: Dict[str, int] = {name: 0 for name in PRIORITY_CLASSES}
+        self._total_running = 0
+        self._next_ticket = 0
+
+        self._stats: Dict[str, Dict[str, float]] = {
+            name: {'started': 0, 'completed': 0, 'rejected': 0, 'max_queued': 0, 'wait_time': 0.0}
+            for name in PRIORITY_CLASSES
+        }
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RequestScheduler":
+        """
+        Create a scheduler from the 'model.scheduler' config section.
+
+        Args:
+            config: Full configuration dictionary
+
+        Returns:
+            Configured RequestScheduler
+        """
+        scheduler_config = config.get('model', {}).get('scheduler', {}) or {}
+        classes = scheduler_config.get('classes', {}) or {}
+        return cls(
+            max_concurrency=scheduler_config.get('max_concurrency', 4),
+            class_limits={
+                name: settings['limit']
+                for name, settings in classes.items() if settings and 'limit' in settings
+            },
+            max_queue={
+                name: settings['max_queue']
+                for name, settings in classes.items() if settings and 'max_queue' in settings
+            }
+        )
+
+    def _can_run(self, request_class: str, ticket: int) -> bool:
+        """Check whether a waiting ticket may take a slot now."""
+        if self._total_running >= self.max_concurrency:
+            return False
+
+        for name in PRIORITY_CLASSES:
+            if name == request_class:
+                break
+            # A higher-priority class that could run goes first
+            if self._waiting[name] and self._running[name] < self.class_limits[name]:
+                return False
+
+        return (self._waiting[request_class][0] == ticket and
+                self._running[request_class] < self.class_limits[request_class])
+
+    def acquire(self, request_class: str = PRIORITY_INTERACTIVE, timeout: Optional[float] = None):
+        """
+        Wait for a slot for a request.
+
+        Args:
+            request_class: Priority class of the request
+            timeout: Maximum seconds to wait (None = wait indefinitely)
+
+        Raises:
+            ValueError: If the priority class is unknown
+            SchedulerBusy: If the class queue is full or the timeout expires
+        """
+        if request_class not in self._running:
+            raise ValueError(f"Unknown priority class: {request_class}")
+
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._condition:
+            queue = self._waiting[request_class]
+            stats = self._stats[request_class]
+
+            if self.max_queue[request_class] and len(queue) >= self.max_queue[request_class]:
+                stats['rejected'] += 1
+                raise SchedulerBusy(f"Too many queued {request_class} requests ({len(queue)})")
+
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            queue.append(ticket)
+            stats['max_queued'] = max(stats['max_queued'], len(queue))
+
+            try:
+                while not self._can_run(request_class, ticket):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        stats['rejected'] += 1
+                        raise SchedulerBusy(f"Timed out waiting for a {request_class} slot")
+                    self._condition.wait(remaining)
+            finally:
+                queue.remove(ticket)
+                # Our departure may unblock other waiters
+                self._condition.notify_all()
+
+            self._running[request_class] += 1
+            self._total_running += 1
+            stats['started'] += 1
+            stats['wait_time'] += time.monotonic() - start
+
+    def release(self, request_class: str = PRIORITY_INTERACTIVE):
+        """
+        Release a slot taken with acquire().
+
+        Args:
+            request_class: Priority class of the request
+        """
+        with self._condition:
+            self._running[request_class] -= 1
+            self._total_running -= 1
+            self._stats[request_class]['completed'] += 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, request_class: str = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Hold a slot for the duration of a with-block.
+
+        Args:
+            request_class: Priority class of the request
+            timeout: Maximum seconds to wait for the slot
+
+        Raises:
+            SchedulerBusy: If the class queue is full or the timeout expires
+        """
+        self.acquire(request_class, timeout)
+        try:
+            yield
+        finally:
+            self.release(request_class)
+
+    @asynccontextmanager
+    async def slot_async(
+        self,
+        request_class: str = PRIORITY_INTERACTIVE,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of an async with-block.
+
+        Waiting happens in a worker thread, so the event loop is not
+        blocked. If the waiting task is cancelled, the slot is released
+        as soon as the abandoned wait obtains it.
+
+        Args:
+            request_class: Priority class of the request
+            timeout: Maximum seconds to wait for the slot
+
+        Raises:
+            SchedulerBusy: If the class queue is full or the timeout expires
+        """
+        loop = asyncio.get_running_loop()
+        acquiring = loop.run_in_executor(None, self.acquire, request_class, timeout)
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            def release_abandoned(future):
+                if not future.cancelled() and future.exception() is None:
+                    self.release(request_class)
+
+            acquiring.add_done_callback(release_abandoned)
+            raise
+
+        try:
+            yield
+        finally:
+            self.release(request_class)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get queue-depth and throughput metrics per priority class.
+
+        Returns:
+            Mapping of class name to queued, running, completed, rejected,
+            max_queued and average wait seconds
+        """
+        with self._condition:
+            return {
+                name: {
+                    'queued': len(self._waiting[name]),
+                    'running': self._running[name],
+                    'completed': int(stats['completed']),
+                    'rejected': int(stats['rejected']),
+                    'max_queued': int(stats['max_queued']),
+                    'avg_wait': stats['wait_time'] / stats['started'] if stats['started'] else 0.0
+                }
+                for name, stats in self._stats.items()
+            }
@@ -0,0 +1,99 @@
+"""
+Chat sessions for Local AI Assistant.
+
+A session keeps the chat messages of a conversation as a stable prefix,
+so Ollama can reuse the KV cache of earlier turns and only evaluate the
+tokens of each new turn.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+
+class ChatSession:
+    """
+    Conversation state reused across turns.
+
+    The messages start with a system prompt carrying the retrieved
+    context, followed by the user and assistant turns. Earlier messages
+    are never modified, so each request extends the previous one. The
+    session is restarted when the model or the retrieved context changes,
+    or after max_turns turns.
+    """
+
+    def __init__(self, max_turns: int = 20):
+        """
+        Initialize an empty session.
+
+        Args:
+            max_turns: Number of turns after which the session restarts
+        """
+        self.max_turns = max(1, int(max_turns))
+        self.model: Optional[str] = None
+        self.context_key: Optional[str] = None
+        self.messages: List[Dict[str, str]] = []
+        self.turns = 0
+        self.restarts = 0
+
+    def is_current(self, model: str, context_key: str) -> bool:
+        """
+        Check whether the session can be extended with another turn.
+
+        Args:
+            model: Model that will answer the turn
+            context_key: Key identifying the retrieved context
+
+        Returns:
+            True if the session's prefix is still valid
+        """
+        return (
+            bool(self.messages) and
+            self.model == model and
+            self.context_key == context_key and
+            self.turns < self.max_turns
+        )
+
+    def restart(self, model: str, context_key: str, system_prompt: str):
+        """
+        Start over with a new system prompt.
+
+        Args:
+            model: Model that will answer the turns
+            context_key: Key identifying the retrieved context
+            system_prompt: System message (instructions and context)
+        """
+        if self.messages:
+            self.restarts += 1
+            logger.debug(f"Restarting chat session after {self.turns} turns")
+
+        self.model = model
+        self.context_key = context_key
+        self.messages = [{'role': 'system', 'content': system_prompt}]
+        self.turns = 0
+
+    def add_turn(self, user_message: str, assistant_message: str, model: Optional[str] = None):
+        """
+        Append a completed turn.
+
+        Args:
+            user_message: The user's message
+            assistant_message: The model's full reply
+            model: Model that answered (if it differs from the session's
+                model, e.g. after a fallback, the session follows it)
+        """
+        if model is not None:
+            self.model = model
+        self.messages.append({'role': 'user', 'content': user_message})
+        self.messages.append({'role': 'assistant', 'content': assistant_message})
+        self.turns += 1
+
+    def clear(self):
+        """Drop the session state (e.g. after /clear or a model switch)."""
+        self.model = None
+        self.context_key = None
+        self.messages = []
+        self.turns = 0
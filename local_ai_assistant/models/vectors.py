@@ -0,0 +1,80 @@
+"""
+Embedding vector types for Local AI Assistant.
+
+Embeddings travel through the pipeline (ModelManager, EmbeddingGenerator,
+VectorStore) as float32 NumPy arrays, one row per text. Rows are
+L2-normalized when they enter the system, so cosine similarity is a
+plain dot product.
+"""
+
+from typing import Any, Optional
+
+import numpy as np
+
+
+# Element type of all embedding arrays
+EMBEDDING_DTYPE = np.float32
+
+# A single embedding, shape (dim,)
+Embedding = np.ndarray
+
+# A stack of embeddings, shape (n, dim)
+EmbeddingMatrix = np.ndarray
+
+
+def as_embedding_matrix(vectors: Any) -> EmbeddingMatrix:
+    """
+    View or convert vectors as a float32 embedding matrix.
+
+    A float32 ndarray is returned as is (no copy); lists are converted
+    once. A single vector becomes a one-row matrix.
+
+    Args:
+        vectors: Matrix, list of vectors or single vector
+
+    Returns:
+        Array of shape (n, dim)
+    """
+    matrix = np.asarray(vectors, dtype=EMBEDDING_DTYPE)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    return matrix
+
+
+def truncate_rows(matrix: EmbeddingMatrix, dim: Optional[int]) -> EmbeddingMatrix:
+    """
+    Keep the leading dim components of each row (Matryoshka truncation).
+
+    Models trained with Matryoshka representation learning, such as
+    nomic-embed-text, front-load information so a prefix of the vector is
+    itself a usable embedding. Truncated rows must be renormalized.
+
+    Args:
+        matrix: Array of shape (n, d)
+        dim: Number of leading components to keep (None = all)
+
+    Returns:
+        A contiguous copy of shape (n, dim), or the matrix itself if it is
+        not wider than dim
+    """
+    if not dim or matrix.ndim != 2 or matrix.shape[1] <= dim:
+        return matrix
+    return np.ascontiguousarray(matrix[:, :dim])
+
+
+def normalize_rows(matrix: EmbeddingMatrix) -> EmbeddingMatrix:
+    """
+    L2-normalize the rows of a writable float32 matrix in place.
+
+    All-zero rows are left unchanged.
+
+    Args:
+        matrix: Array of shape (n, dim)
+
+    Returns:
+        The same array, normalized
+    """
+    if matrix.size:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
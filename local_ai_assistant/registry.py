@@ -0,0 +1,130 @@
+"""
+Component registry for Local AI Assistant.
+
+This module builds the heavyweight components (model manager, token counter,
+vector store, document loader and indexer) once per process and shares them
+between the CLI, the memory layer and the document pipeline.
+"""
+
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Union
+
+
+# Logger for this module
+logger = logging.getLogger(__name__)
+
+# Process-wide registries, keyed by resolved config path
+_REGISTRIES: Dict[Path, "ComponentRegistry"] = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+class ComponentRegistry:
+    """
+    Lazily builds and caches shared assistant components.
+
+    Each component is constructed on first access and reused afterwards,
+    so a ModelManager (and its Ollama probes) exists only once per registry.
+    """
+
+    def __init__(self, config_path: Union[str, Path]):
+        """
+        Initialize the component registry.
+
+        Args:
+            config_path: Path to the configuration file
+        """
+        self.config_path = Path(config_path)
+        self._components: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        """
+        Return a cached component, building it on first use.
+
+        Args:
+            name: Component name
+            factory: Callable that builds the component
+
+        Returns:
+            The shared component instance
+        """
+        with self._lock:
+            if name not in self._components:
+                logger.info(f"Initializing {name.replace('_', ' ')}")
+                self._components[name] = factory()
+            return self._components[name]
+
+    def register(self, name: str, component: Any):
+        """
+        Register an externally built component.
+
+        Args:
+            name: Component name (e.g. 'model_manager')
+            component: Component instance to share
+        """
+        with self._lock:
+            self._components[name] = component
+
+    @property
+    def token_counter(self):
+        """Shared TokenCounter instance."""
+        from local_ai_assistant.utils.token_counter import TokenCounter
+        return self._get('token_counter', TokenCounter)
+
+    @property
+    def model_manager(self):
+        """Shared ModelManager instance."""
+        from local_ai_assistant.models.model_manager import ModelManager
+        return self._get(
+            'model_manager',
+            lambda: ModelManager(self.config_path, token_counter=self.token_counter)
+        )
+
+    @property
+    def vector_store(self):
+        """Shared VectorStore instance."""
+        from local_ai_assistant.memory.vector_store import VectorStore
+        return self._get(
+            'vector_store',
+            lambda: VectorStore(self.config_path, model_manager=self.model_manager)
+        )
+
+    @property
+    def document_loader(self):
+        """Shared DocumentLoader instance."""
+        from local_ai_assistant.document.loader import DocumentLoader
+        return self._get('document_loader', lambda: DocumentLoader(self.config_path))
+
+    @property
+    def document_indexer(self):
+        """Shared DocumentIndexer instance."""
+        from local_ai_assistant.document.indexer import DocumentIndexer
+        return self._get(
+            'document_indexer',
+            lambda: DocumentIndexer(
+                self.config_path,
+                self.document_loader,
+                self.vector_store,
+                self.model_manager
+            )
+        )
+
+
+def get_registry(config_path: Union[str, Path]) -> ComponentRegistry:
+    """
+    Get the process-wide component registry for a config file.
+
+    Args:
+        config_path: Path to the configuration file
+
+    Returns:
+        The shared ComponentRegistry for that config file
+    """
+    key = Path(config_path).resolve()
+
+    with _REGISTRIES_LOCK:
+        if key not in _REGISTRIES:
+            _REGISTRIES[key] = ComponentRegistry(key)
+        return _REGISTRIES[key]
@@ -123,7 +123,13 @@ class TokenCounter:
         
         return token_count
     
-    def truncate_to_token_limit(self, text: str, max_tokens: int, model: str = "default") -> str:
+    def truncate_to_token_limit(
+        self,
+        text: str,
+        max_tokens: int,
+        model: str = "default",
+        from_end: bool = False
+    ) -> str:
         """
         Truncate text to fit within a token limit.
         
@@ -131,11 +137,12 @@ class TokenCounter:
             text: Text to truncate
             max_tokens: Maximum number of tokens
             model: Model name or encoding to use
+            from_end: Keep the end of the text instead of the start
             
         Returns:
             Truncated text
         """
-        if not text:
+        if not text or max_tokens <= 0:
             return ""
             
         # Count tokens in the original text
@@ -160,7 +167,7 @@ class TokenCounter:
                 tokens = encoder.encode(text)
                 
                 # Truncate tokens
-                truncated_tokens = tokens[:max_tokens]
+                truncated_tokens = tokens[-max_tokens:] if from_end else tokens[:max_tokens]
                 
                 # Decode back to text
                 truncated_text = encoder.decode(truncated_tokens)
@@ -170,15 +177,16 @@ class TokenCounter:
                 # Fall back to heuristic method
         
         # Fall back to heuristic truncation (less accurate)
-        return self._truncate_heuristic(text, max_tokens)
+        return self._truncate_heuristic(text, max_tokens, from_end)
     
-    def _truncate_heuristic(self, text: str, max_tokens: int) -> str:
+    def _truncate_heuristic(self, text: str, max_tokens: int, from_end: bool = False) -> str:
         """
         Truncate text using a heuristic approach.
         
         Args:
             text: Text to truncate
             max_tokens: Maximum number of tokens
+            from_end: Keep the end of the text instead of the start
             
         Returns:
             Truncated text
@@ -192,7 +200,7 @@ class TokenCounter:
         
         # Truncate text
         if len(text) > char_limit:
-            return text[:char_limit]
+            return text[-char_limit:] if from_end else text[:char_limit]
         
         return text
 
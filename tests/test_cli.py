@@ -0,0 +1,92 @@
+"""
+Unit tests for the command-line interface.
+"""
+import unittest
+import tempfile
+import yaml
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+from local_ai_assistant.cli.interface import CLI
+from local_ai_assistant.models import model_manager
+from local_ai_assistant.models.model_manager import ModelManager
+
+
+class FakeOllama:
+    """Minimal stand-in for the ollama module whose failing model raises."""
+
+    def __init__(self, fail_model=None):
+        self.fail_model = fail_model
+        self.chats = []
+
+    def Client(self, host=None, **kwargs):
+        return self
+
+    def AsyncClient(self, host=None, **kwargs):
+        return self
+
+    def list(self):
+        return {'models': [{'name': 'gemma3:27b'}, {'name': 'deepseek-rag:latest'}]}
+
+    def ps(self):
+        return {'models': []}
+
+    def chat(self, model, messages, stream=False, options=None, keep_alive=None):
+        self.chats.append(model)
+        if model == self.fail_model:
+            raise RuntimeError("model failed to load")
+        chunks = [{'message': {'content': f"reply from {model}"}, 'done': False},
+                  {'message': {'content': ''}, 'done': True, 'eval_count': 3}]
+        return iter(chunks) if stream else chunks[0]
+
+
+class TestSessionStream(unittest.TestCase):
+    """Test cases for chat session turns sent from the CLI."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.config_file = Path(self.temp_dir.name) / "config.yaml"
+        config = {
+            "model": {
+                "default": "gemma3:27b",
+                "rag": "deepseek-rag",
+                "embedding": "nomic-embed-text",
+                "preload": {"enabled": False},
+                "embedding_cache": {"enabled": False},
+                "response_cache": {"enabled": False}
+            }
+        }
+        with open(self.config_file, "w") as f:
+            yaml.dump(config, f)
+
+        self.fake = FakeOllama(fail_model='deepseek-rag')
+        for patcher in (
+            mock.patch.object(model_manager, 'ollama', self.fake, create=True),
+            mock.patch.object(model_manager, 'OLLAMA_AVAILABLE', True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.manager = ModelManager(self.config_file)
+        vector_store = SimpleNamespace(format_context_for_prompt=lambda items: "context")
+        self.cli = CLI(self.config_file, self.manager, vector_store, None, debug_enabled=False)
+
+    def test_rag_turn_falls_back_when_the_primary_fails(self):
+        """Test that a failing RAG model falls back and the session follows the answering model."""
+        context = [{'source': 'document', 'id': 'doc_chunk_0', 'text': "Some text"}]
+
+        first = ''.join(self.cli._session_stream("one", context))
+        second = ''.join(self.cli._session_stream("two", context))
+
+        self.assertEqual(first, "reply from gemma3:27b")
+        self.assertEqual(second, "reply from gemma3:27b")
+        self.assertEqual(self.fake.chats, ['deepseek-rag', 'gemma3:27b', 'gemma3:27b'])
+        self.assertEqual(self.cli.chat_session.model, 'gemma3:27b')
+        self.assertEqual(self.cli.chat_session.turns, 2)
+        self.assertIn('rag', self.manager.metrics.summary()['gemma3:27b'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Unit tests for the persistent embedding and response caches.
+"""
+import time
+import unittest
+import tempfile
+from pathlib import Path
+from local_ai_assistant.models.cache import EmbeddingCache, ResponseCache, response_key
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Test cases for the EmbeddingCache class."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "embeddings.sqlite3"
+        self.cache = EmbeddingCache(self.path, max_entries=2)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def test_hits_and_misses(self):
+        """Test lookups are keyed by model and text and counted."""
+        self.cache.put_many("model-a", ["hello"], [[0.5, 0.25]])
+
+        found = self.cache.get_many("model-a", ["hello", "other"])
+        self.assertEqual([None if v is None else v.tolist() for v in found], [[0.5, 0.25], None])
+        self.assertEqual(self.cache.get_many("model-b", ["hello"]), [None])
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_persistence_and_lru_eviction(self):
+        """Test entries survive reopening and the least recently used is evicted."""
+        self.cache.put_many("m", ["first", "second"], [[1.0], [2.0]])
+        time.sleep(0.01)
+        self.cache.get_many("m", ["first"])
+        time.sleep(0.01)
+        self.cache.put_many("m", ["third"], [[3.0]])
+        self.cache.close()
+
+        self.cache = EmbeddingCache(self.path, max_entries=2)
+        found = self.cache.get_many("m", ["first", "second", "third"])
+        self.assertEqual([None if v is None else v.tolist() for v in found], [[1.0], None, [3.0]])
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for the ResponseCache class."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(Path(self.temp_dir.name) / "responses.sqlite3", max_entries=1)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def test_keys_and_eviction(self):
+        """Test keys cover model, request and options, and the size bound."""
+        key = response_key("m", "prompt", {"temperature": 0})
+        self.assertEqual(key, response_key("m", "prompt", {"temperature": 0}))
+        self.assertNotEqual(key, response_key("m", "prompt", {"temperature": 0, "num_predict": 5}))
+        self.assertNotEqual(key, response_key("m", [{"role": "user", "content": "prompt"}]))
+
+        self.cache.put(key, "answer")
+        self.assertEqual(self.cache.get(key), "answer")
+
+        self.cache.put(response_key("other", "prompt"), "newer")
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(self.cache.stats()['entries'], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Unit tests for the Ollama endpoint pool.
+"""
+import tempfile
+import unittest
+import yaml
+from pathlib import Path
+from local_ai_assistant.debug.fake_ollama import FakeOllamaServer
+from local_ai_assistant.models import model_manager
+from local_ai_assistant.models.endpoints import EndpointPool
+from local_ai_assistant.models.model_manager import ModelManager
+
+
+class StubClient:
+    """Client stand-in whose list() can be made to fail."""
+
+    def __init__(self, url):
+        self.url = url
+        self.down = False
+
+    def list(self):
+        if self.down:
+            raise ConnectionError(f"{self.url} is down")
+        return {'models': []}
+
+
+class TestEndpointPool(unittest.TestCase):
+    """Test cases for the EndpointPool class."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.urls = ["http://a:11434", "http://b:11434", "http://c:11434"]
+        self.pool = EndpointPool(self.urls, StubClient, failure_threshold=2, health_check_interval=0)
+
+    def test_least_outstanding(self):
+        """Test that spread operations go to the least busy endpoint."""
+        with self.pool.lease('embed') as first, self.pool.lease('embed') as second:
+            with self.pool.lease('embed') as third:
+                self.assertEqual(len({first.url, second.url, third.url}), 3)
+            self.assertEqual(self.pool.select('embed').url, third.url)
+        self.assertEqual([s['outstanding'] for s in self.pool.stats()], [0, 0, 0])
+
+    def test_sticky_routing(self):
+        """Test that a model's chat calls stay on one endpoint while it is healthy."""
+        endpoint = self.pool.select('chat', 'gemma3:27b')
+        with self.pool.lease('chat', 'gemma3:27b'):
+            self.assertIs(self.pool.select('chat', 'gemma3:27b'), endpoint)
+        keys = {self.pool.select('chat', f"model-{i}").url for i in range(20)}
+        self.assertGreater(len(keys), 1)
+
+    def test_failed_endpoint_leaves_rotation(self):
+        """Test removal after repeated failures and return after a health check."""
+        endpoint = self.pool.select('chat', 'gemma3:27b')
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                with self.pool.lease('chat', 'gemma3:27b'):
+                    raise ConnectionError("refused")
+
+        self.assertFalse(endpoint.healthy)
+        self.assertIsNot(self.pool.select('chat', 'gemma3:27b'), endpoint)
+        self.assertNotIn(endpoint, self.pool.endpoints_for_model('nomic-embed-text', 'embed'))
+
+        endpoint.client.down = True
+        self.assertEqual(self.pool.check_health(), 2)
+        endpoint.client.down = False
+        self.assertEqual(self.pool.check_health(), 3)
+        self.assertIs(self.pool.select('chat', 'gemma3:27b'), endpoint)
+
+    def test_non_transient_errors_keep_endpoint(self):
+        """Test that errors answered by the server do not count as failures."""
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                with self.pool.lease('embed'):
+                    raise ValueError("model not found")
+        self.assertTrue(all(s['healthy'] for s in self.pool.stats()))
+
+
+@unittest.skipUnless(model_manager.OLLAMA_AVAILABLE, "ollama package not installed")
+class TestModelManagerEndpoints(unittest.TestCase):
+    """Test cases for the ModelManager with several Ollama instances."""
+
+    def setUp(self):
+        """Start two fake servers and point a config at both."""
+        self.servers = [
+            FakeOllamaServer(port=0, ttft=0.0, tokens_per_second=0, embedding_dim=16,
+                             response_tokens=3, embed_latency=0.05).start()
+            for _ in range(2)
+        ]
+        for server in self.servers:
+            self.addCleanup(server.stop)
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.config_file = Path(self.temp_dir.name) / "config.yaml"
+        config = {
+            "model": {
+                "default": "gemma3:27b",
+                "embedding": "nomic-embed-text",
+                "preload": {"enabled": False},
+                "embedding_batch": {"max_batch_size": 1},
+                "embedding_cache": {"enabled": False},
+                "response_cache": {"enabled": False},
+                "scheduler": {"max_concurrency": 4},
+                "ollama": {
+                    "endpoints": [server.url for server in self.servers],
+                    "failure_threshold": 1,
+                    "health_check_interval": 0
+                }
+            }
+        }
+        with open(self.config_file, "w") as f:
+            yaml.dump(config, f)
+
+    def test_embeddings_spread_and_failover(self):
+        """Test that embeddings use both instances and survive one going down."""
+        manager = ModelManager(self.config_file)
+        self.addCleanup(manager.shutdown)
+
+        before = [server.request_count for server in self.servers]
+        embeddings = manager.generate_embeddings([f"text {i}" for i in range(8)])
+        self.assertEqual(embeddings.shape, (8, 16))
+        self.assertTrue(all(server.request_count > count for server, count in zip(self.servers, before)))
+
+        sticky = manager.endpoints.select('chat', 'gemma3:27b')
+        sticky_server = next(s for s in self.servers if s.url == sticky.url)
+        before = sticky_server.request_count
+        for _ in range(3):
+            manager.generate_chat_response([{'role': 'user', 'content': 'hi'}])
+        self.assertEqual(sticky_server.request_count, before + 3)
+
+        sticky_server.stop()
+        reply = manager.generate_chat_response([{'role': 'user', 'content': 'still there?'}])
+        self.assertEqual(len(reply.split()), 3)
+        self.assertFalse(sticky.healthy)
+
+        streamed = "".join(manager.generate_chat_response_stream([{'role': 'user', 'content': 'hi'}]))
+        self.assertEqual(len(streamed.split()), 3)
+        self.assertEqual(manager.circuit_breaker.state, 'closed')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Unit tests for the fake Ollama server.
+"""
+import tempfile
+import unittest
+import yaml
+import numpy as np
+from pathlib import Path
+from local_ai_assistant.debug.fake_ollama import FakeOllamaServer, hash_embedding
+from local_ai_assistant.models import model_manager
+from local_ai_assistant.models.model_manager import ModelManager
+
+
+class TestHashEmbedding(unittest.TestCase):
+    """Test cases for the deterministic embeddings."""
+
+    def test_deterministic_unit_vectors(self):
+        """Test that embeddings are repeatable, normalized and text-dependent."""
+        first = np.array(hash_embedding("the quick brown fox", 64))
+        again = np.array(hash_embedding("the quick brown fox", 64))
+        related = np.array(hash_embedding("the quick brown dog", 64))
+        other = np.array(hash_embedding("completely different words", 64))
+
+        np.testing.assert_array_equal(first, again)
+        self.assertAlmostEqual(float(np.linalg.norm(first)), 1.0, places=6)
+        self.assertGreater(float(first @ related), float(first @ other))
+
+
+@unittest.skipUnless(model_manager.OLLAMA_AVAILABLE, "ollama package not installed")
+class TestFakeOllamaServer(unittest.TestCase):
+    """Test cases for the ModelManager talking to the fake server."""
+
+    def setUp(self):
+        """Start the server and point a config at it."""
+        self.server = FakeOllamaServer(port=0, ttft=0.0, tokens_per_second=0, embedding_dim=32,
+                                       response_tokens=5).start()
+        self.addCleanup(self.server.stop)
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.config_file = Path(self.temp_dir.name) / "config.yaml"
+        config = {
+            "model": {
+                "default": "gemma3:27b",
+                "embedding": "nomic-embed-text",
+                "preload": {"enabled": False},
+                "ollama": {"host": "http://127.0.0.1", "port": self.server.port},
+                "embedding_cache": {"path": str(Path(self.temp_dir.name) / "embeddings.sqlite3")},
+                "response_cache": {"path": str(Path(self.temp_dir.name) / "responses.sqlite3")}
+            }
+        }
+        with open(self.config_file, "w") as f:
+            yaml.dump(config, f)
+
+    def test_pipeline_against_server(self):
+        """Test generation, streaming and embeddings end to end."""
+        manager = ModelManager(self.config_file)
+        self.addCleanup(manager.shutdown)
+        self.assertTrue(manager.ollama_available)
+
+        text = manager.generate_text("hello world")
+        self.assertEqual(len(text.split()), 5)
+        self.assertEqual(manager.generate_text("hello world"), text)
+
+        streamed = "".join(manager.generate_text_stream("hello world"))
+        self.assertEqual(streamed, text)
+        self.assertEqual(manager.last_generation_stats['tokens'], 5)
+
+        chat = manager.metrics.summary()['gemma3:27b']['chat']
+        self.assertEqual((chat['requests'], chat['tokens']), (3, 15))
+
+        reply = "".join(manager.generate_chat_response_stream([{'role': 'user', 'content': 'hi'}]))
+        self.assertEqual(len(reply.split()), 5)
+
+        embeddings = np.array(manager.generate_embeddings(["alpha beta", "gamma", "alpha beta"]))
+        self.assertEqual(embeddings.shape, (3, 32))
+        np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-6)
+        np.testing.assert_array_equal(embeddings[0], embeddings[2])
+        self.assertIn('gemma3:27b', [model['name'] for model in manager.list_running_models()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for the in-memory vector index.
+"""
+import unittest
+from local_ai_assistant.memory.index import (
+    InMemoryIndex, PLAN_FULL, PLAN_MASK, PLAN_PREFILTER
+)
+
+class TestInMemoryIndex(unittest.TestCase):
+    """Test cases for the InMemoryIndex class."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.index = InMemoryIndex(prefilter_threshold=0.25)
+
+        # 40 conversation messages and 10 chunks from two documents
+        for i in range(40):
+            self.index.add([1.0, 0.0, float(i % 3)], {'role': 'user', 'timestamp': i})
+        for i in range(10):
+            doc_id = 'doc-a' if i < 2 else 'doc-b'
+            self.index.add(
+                [0.0, 1.0, float(i)],
+                {'type': 'document_chunk', 'doc_id': doc_id, 'timestamp': 100 + i}
+            )
+
+    def test_planner_uses_value_counts(self):
+        """Test that the plan depends on filter selectivity."""
+        self.assertEqual(self.index.plan(None), PLAN_FULL)
+        self.assertEqual(self.index.plan({'role': 'user'}), PLAN_MASK)
+        self.assertEqual(
+            self.index.plan({'type': 'document_chunk', 'doc_id': 'doc-a'}),
+            PLAN_PREFILTER
+        )
+        self.assertEqual(self.index.value_count('doc_id', 'doc-b'), 8)
+        self.assertEqual(
+            self.index.plan({'role': {'$in': ['user', 'assistant']}}),
+            PLAN_MASK
+        )
+
+    def test_in_filter(self):
+        """Test that $in predicates match any of the listed values."""
+        results = self.index.search(None, 20, {'doc_id': {'$in': ['doc-a', 'doc-b']}})
+        self.assertEqual(sorted(row for row, _ in results), list(range(40, 50)))
+
+    def test_filtered_search(self):
+        """Test that both plans return only matching rows, best first."""
+        results = self.index.search(
+            [0.0, 1.0, 0.0], 5, {'type': 'document_chunk', 'doc_id': 'doc-a'}
+        )
+        self.assertEqual([row for row, _ in results], [40, 41])
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+
+        results = self.index.search([1.0, 0.0, 0.0], 3, {'role': 'user'})
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(row < 40 for row, _ in results))
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+
+    def test_ties_broken_by_recency(self):
+        """Test that equal scores fall back to most recent first."""
+        results = self.index.search(None, 3, {'role': 'user'})
+        self.assertEqual([row for row, _ in results], [39, 38, 37])
+
+        self.assertEqual(self.index.search([1.0, 0.0, 0.0], 3, {'role': 'nobody'}), [])
+
+    def test_batch_search_matches_single_search(self):
+        """Test that batched queries return the same rows as single queries."""
+        queries = [[1.0, 0.0, 2.0], [0.0, 1.0, 5.0], None]
+        batch = self.index.search_batch(queries, 4, {'type': 'document_chunk'})
+
+        self.assertEqual(len(batch), 3)
+        for query, results in zip(queries, batch):
+            self.assertEqual(results, self.index.search(query, 4, {'type': 'document_chunk'}))
+
+class TestFixedDimension(unittest.TestCase):
+    """Test cases for an index with a configured embedding dimension."""
+
+    def test_wider_vectors_are_truncated(self):
+        """Test that full-size rows and queries are cut to the leading components."""
+        index = InMemoryIndex(dim=2)
+        index.add([3.0, 4.0, 100.0], {'timestamp': 1})
+        index.add([0.0, 1.0], {'timestamp': 2})
+
+        self.assertEqual(index.vectors.shape, (2, 2))
+        self.assertAlmostEqual(float(index.vectors[0] @ index.vectors[0]), 1.0, places=5)
+
+        results = index.search([0.0, 2.0, -50.0], 2)
+        self.assertEqual(results[0][0], 1)
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+        self.assertAlmostEqual(results[1][1], 0.8, places=5)
+
+        index.rebuild([])
+        self.assertEqual(index.dim, 2)
+
+
+class TestDimensionChoice(unittest.TestCase):
+    """Test cases for an index taking its dimension from the data."""
+
+    def test_rows_without_embeddings_come_first(self):
+        """Test that the vector buffer matches the rows added before the first embedding."""
+        index = InMemoryIndex()
+        for i in range(100):
+            index.add(None, {'timestamp': i})
+        index.add([1.0, 0.0], {'timestamp': 100})
+        index.add([0.0, 1.0], {'timestamp': 101})
+
+        self.assertEqual(index.vectors.shape, (102, 2))
+        self.assertEqual(index.search([0.0, 1.0], 1), [(101, 1.0)])
+
+    def test_zero_placeholders_do_not_fix_dimension(self):
+        """Test that all-zero mock rows do not make real rows score 0."""
+        index = InMemoryIndex()
+        index.add([0.0] * 4, {'timestamp': 1})
+        index.add([3.0, 4.0, 0.0], {'timestamp': 2})
+
+        self.assertEqual(index.dim, 3)
+        results = index.search([3.0, 4.0, 0.0], 2)
+        self.assertEqual(results[0][0], 1)
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+        self.assertEqual(results[1], (0, 0.0))
+
+if __name__ == "__main__":
+    unittest.main()
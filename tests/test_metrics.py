@@ -0,0 +1,68 @@
+"""
+Unit tests for the generation metrics registry.
+"""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from local_ai_assistant.models.metrics import GenerationMetrics
+
+
+def _stats(prompt_tokens, prompt_seconds, tokens, seconds, load_seconds=0.0):
+    """Build Ollama-style statistics (durations in nanoseconds)."""
+    return {
+        'prompt_eval_count': prompt_tokens,
+        'prompt_eval_duration': int(prompt_seconds * 1e9),
+        'eval_count': tokens,
+        'eval_duration': int(seconds * 1e9),
+        'load_duration': int(load_seconds * 1e9),
+        'total_duration': int((prompt_seconds + seconds + load_seconds) * 1e9)
+    }
+
+
+class TestGenerationMetrics(unittest.TestCase):
+    """Test cases for the GenerationMetrics class."""
+
+    def test_rates_per_model_and_task(self):
+        """Test rolling rates, prompt share and totals."""
+        metrics = GenerationMetrics(window=2)
+        metrics.record("llama3:8b", "chat", _stats(100, 1.0, 10, 1.0))
+        metrics.record("llama3:8b", "chat", _stats(100, 1.0, 30, 1.0))
+        metrics.record("llama3:8b", "chat", _stats(300, 1.0, 50, 3.0))
+        metrics.record("llama3:8b", "rag", _stats(10, 1.0, 10, 1.0))
+
+        chat = metrics.summary()["llama3:8b"]["chat"]
+        self.assertEqual((chat['requests'], chat['window'], chat['tokens']), (3, 2, 90))
+        # Window holds the last two requests: 80 tokens in 4 s, 400 prompt tokens in 2 s
+        self.assertAlmostEqual(chat['tokens_per_second'], 20.0)
+        self.assertAlmostEqual(chat['prompt_tokens_per_second'], 200.0)
+        self.assertAlmostEqual(chat['prompt_eval_share'], 2.0 / 6.0)
+        self.assertIn("rag", metrics.summary()["llama3:8b"])
+
+    def test_load_events_and_empty_stats(self):
+        """Test slow loads become events and responses without statistics are ignored."""
+        metrics = GenerationMetrics(load_event_seconds=0.5)
+        self.assertFalse(metrics.record("gemma3:27b", "chat", {}))
+        metrics.record("gemma3:27b", "chat", _stats(5, 0.1, 5, 0.1, load_seconds=0.01))
+        metrics.record("gemma3:27b", "chat", _stats(5, 0.1, 5, 0.1, load_seconds=4.0))
+
+        events = metrics.load_events()
+        self.assertEqual([(e['model'], round(e['load_seconds'])) for e in events], [("gemma3:27b", 4)])
+        self.assertEqual(metrics.summary()["gemma3:27b"]["chat"]['loads'], 1)
+
+    def test_dump(self):
+        """Test the JSON dump."""
+        metrics = GenerationMetrics()
+        metrics.record("llama3:8b", "analysis", _stats(10, 0.5, 20, 1.0))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = metrics.dump(Path(temp_dir) / "nested" / "metrics.json")
+            with open(path) as f:
+                data = json.load(f)
+
+        self.assertEqual(data['models']['llama3:8b']['analysis']['tokens'], 20)
+        self.assertEqual(data['load_events'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
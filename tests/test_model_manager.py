@@ -0,0 +1,612 @@
+"""
+Unit tests for the model manager.
+"""
+import asyncio
+import threading
+import unittest
+import numpy as np
+import tempfile
+import time
+import yaml
+from pathlib import Path
+from unittest import mock
+from local_ai_assistant.models import model_manager, resilience
+from local_ai_assistant.models.model_manager import ModelManager, EmbeddingError, GenerationError
+from local_ai_assistant.models.session import ChatSession
+
+
+def _lengths(embeddings):
+    """Recover the text lengths encoded by FakeOllama from normalized [len, 1] vectors."""
+    return [round(float(e[0] / e[1])) for e in embeddings]
+
+
+class FakeOllama:
+    """Minimal stand-in for the ollama module, recording calls."""
+
+    def __init__(self, batch_supported=True, fail_text=None):
+        self.batch_supported = batch_supported
+        self.fail_text = fail_text
+        self.delay = 0.0
+        self.fail_model = None
+        self.calls = []
+
+    def Client(self, host=None, **kwargs):
+        self.calls.append(('Client', host))
+        return self
+
+    def AsyncClient(self, host=None, **kwargs):
+        self.calls.append(('AsyncClient', host))
+        return FakeAsyncOllama(self)
+
+    def list(self):
+        self.calls.append(('list',))
+        return {'models': [{'name': 'gemma3:27b'}, {'name': 'nomic-embed-text'}]}
+
+    def embed(self, model, input, keep_alive=None):
+        if keep_alive == 0:
+            self.calls.append(('unload', model))
+            return {'embeddings': []}
+        if input == '':
+            self.calls.append(('warm_up', model, keep_alive))
+            return {'embeddings': []}
+        self.calls.append(('embed', list(input)))
+        if not self.batch_supported:
+            error = Exception("404 page not found")
+            error.status_code = 404
+            raise error
+        if self.fail_text in input:
+            raise RuntimeError("model runner crashed")
+        return {'embeddings': [[float(len(text)), 1.0] for text in input]}
+
+    def generate(self, model, prompt='', stream=False, options=None, keep_alive=None):
+        if model == self.fail_model:
+            raise RuntimeError("model failed to load")
+        if not stream and prompt:
+            self.calls.append(('generate', prompt))
+            return {'response': f"echo {prompt}", 'done': True}
+        if keep_alive == 0:
+            self.calls.append(('unload', model))
+            return {'response': '', 'done': True}
+        if not prompt:
+            self.calls.append(('warm_up', model, keep_alive))
+            return {'response': '', 'done': True}
+        self.calls.append(('generate', prompt))
+        chunks = [{'response': word, 'done': False} for word in ["Hello", " there"]]
+        chunks.append({'response': '', 'done': True, 'eval_count': 2, 'eval_duration': 10**8})
+        return iter(chunks)
+
+    def chat(self, model, messages, stream=False, options=None, keep_alive=None):
+        self.calls.append(('chat', [dict(m) for m in messages]))
+        chunks = [{'message': {'content': f"reply {len(messages)}"}, 'done': False},
+                  {'message': {'content': ''}, 'done': True, 'prompt_eval_count': 5}]
+        return iter(chunks) if stream else chunks[0]
+
+    def pull(self, model):
+        self.calls.append(('pull', model))
+
+    def ps(self):
+        return {'models': [{'model': 'gemma3:27b', 'size': 17 * 10**9},
+                           {'model': 'nomic-embed-text', 'size': 10**9}]}
+
+    def embeddings(self, model, prompt):
+        self.calls.append(('embeddings', prompt))
+        return {'embedding': [float(len(prompt)), 1.0]}
+
+
+class FakeAsyncOllama:
+    """Async client stand-in delegating to a FakeOllama."""
+
+    def __init__(self, fake):
+        self.fake = fake
+
+    async def generate(self, **kwargs):
+        await asyncio.sleep(self.fake.delay)
+        response = self.fake.generate(**kwargs)
+        if not kwargs.get('stream'):
+            return response
+
+        async def chunks():
+            for chunk in response:
+                yield chunk
+        return chunks()
+
+    async def embed(self, **kwargs):
+        return self.fake.embed(**kwargs)
+
+
+class TestModelManager(unittest.TestCase):
+    """Test cases for the ModelManager class."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_file = Path(self.temp_dir.name) / "config.yaml"
+        config = {
+            "model": {
+                "default": "gemma3:27b",
+                "embedding": "nomic-embed-text",
+                "embedding_batch": {"max_batch_size": 3, "max_batch_tokens": 1000},
+                "embedding_retries": 1,
+                "preload": {"enabled": False, "keep_alive": "10m"},
+                "embedding_cache": {"path": str(Path(self.temp_dir.name) / "embeddings.sqlite3")},
+                "response_cache": {"path": str(Path(self.temp_dir.name) / "responses.sqlite3")}
+            }
+        }
+        with open(self.config_file, "w") as f:
+            yaml.dump(config, f)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.temp_dir.cleanup()
+
+    def _manager(self, fake, **model_config):
+        """Create a model manager talking to a fake Ollama."""
+        patchers = [
+            mock.patch.object(model_manager, 'ollama', fake, create=True),
+            mock.patch.object(model_manager, 'OLLAMA_AVAILABLE', True),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        if model_config:
+            with open(self.config_file) as f:
+                config = yaml.safe_load(f)
+            config["model"].update(model_config)
+            with open(self.config_file, "w") as f:
+                yaml.dump(config, f)
+        return ModelManager(self.config_file)
+
+    def test_batched_embeddings(self):
+        """Test that texts are embedded in size-bounded batch requests."""
+        fake = FakeOllama()
+        manager = self._manager(fake)
+
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+        embeddings = manager.generate_embeddings(texts)
+
+        self.assertEqual(_lengths(embeddings), [1, 2, 3, 4, 5])
+        embed_calls = [c for c in fake.calls if c[0] == 'embed']
+        self.assertEqual([len(c[1]) for c in embed_calls], [3, 2])
+
+    def test_fallback_to_per_text_endpoint(self):
+        """Test the legacy endpoint is used when batch embedding is missing."""
+        fake = FakeOllama(batch_supported=False)
+        manager = self._manager(fake)
+
+        embeddings = manager.generate_embeddings(["a", "bb"])
+        manager.generate_embeddings(["ccc"])
+
+        self.assertEqual(_lengths(embeddings), [1, 2])
+        self.assertEqual(len([c for c in fake.calls if c[0] == 'embed']), 1)
+        self.assertEqual(len([c for c in fake.calls if c[0] == 'embeddings']), 3)
+
+    def test_embeddings_are_normalized_float32(self):
+        """Test that embeddings come back as one unit-norm float32 matrix, cached or not."""
+        fake = FakeOllama()
+        manager = self._manager(fake)
+
+        fresh = manager.generate_embeddings(["a", "bb"])
+        mixed = manager.generate_embeddings(["a", "ccc"])
+
+        for matrix in (fresh, mixed):
+            self.assertIsInstance(matrix, np.ndarray)
+            self.assertEqual(matrix.dtype, np.float32)
+            self.assertEqual(matrix.shape, (2, 2))
+            np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), 1.0, rtol=1e-6)
+        np.testing.assert_allclose(mixed[0], fresh[0], rtol=1e-6)
+
+    def test_embedding_dim_truncates(self):
+        """Test that embeddings are truncated, renormalized and cached per dimension."""
+        fake = FakeOllama()
+        manager = self._manager(fake, embedding_dim=1)
+
+        embeddings = manager.generate_embeddings(["abc", "de"])
+        self.assertEqual(embeddings.shape, (2, 1))
+        np.testing.assert_allclose(embeddings, [[1.0], [1.0]])
+
+        self.assertEqual(manager.embedding_cache.get_many("nomic-embed-text", ["abc"]), [None])
+        cached = manager.embedding_cache.get_many("nomic-embed-text@1d", ["abc"])[0]
+        np.testing.assert_allclose(cached, [1.0])
+
+    def test_embedding_cache_read_through(self):
+        """Test that cached texts are not sent to Ollama again."""
+        fake = FakeOllama()
+        manager = self._manager(fake)
+
+        manager.generate_embeddings(["a", "bb"])
+        embeddings = manager.generate_embeddings(["bb", "ccc"])
+
+        self.assertEqual(_lengths(embeddings), [2, 3])
+        embed_calls = [c[1] for c in fake.calls if c[0] == 'embed']
+        self.assertEqual(embed_calls, [["a", "bb"], ["ccc"]])
+        self.assertEqual(manager.embedding_cache.stats()['hits'], 1)
+
+    def test_embedding_failures_are_reported_per_item(self):
+        """Test that failed texts raise EmbeddingError instead of zero vectors."""
+        fake = FakeOllama(fail_text="bad")
+        manager = self._manager(fake)
+
+        with self.assertRaises(EmbeddingError) as ctx:
+            manager.generate_embeddings(["a", "bad", "ccc", "dddd"])
+
+        self.assertEqual(list(ctx.exception.failures), [1])
+        self.assertEqual(ctx.exception.embeddings[1], None)
+        self.assertEqual(_lengths(e for e in ctx.exception.embeddings if e is not None), [1, 3, 4])
+
+        # Successful texts were cached despite the failure
+        self.assertEqual(_lengths(manager.embedding_cache.get_many("nomic-embed-text", ["ccc"])), [3])
+
+    def test_streaming_generation_records_stats(self):
+        """Test that streamed chunks are yielded and timing is recorded."""
+        manager = self._manager(FakeOllama())
+
+        chunks = list(manager.generate_text_stream("Hi"))
+
+        self.assertEqual(chunks, ["Hello", " there"])
+        stats = manager.last_generation_stats
+        self.assertEqual(stats['tokens'], 2)
+        self.assertAlmostEqual(stats['tokens_per_second'], 20.0)
+        self.assertIsNotNone(stats['time_to_first_token'])
+
+    def test_single_pooled_client(self):
+        """Test that all calls go through one client for the configured host."""
+        fake = FakeOllama()
+        manager = self._manager(fake)
+
+        manager.generate_embeddings(["a"])
+        list(manager.generate_text_stream("Hi"))
+
+        self.assertEqual([c for c in fake.calls if c[0] == 'Client'],
+                         [('Client', 'http://localhost:11434')])
+
+    def test_preload_and_warm_up_on_switch(self):
+        """Test that models are warmed up in the background with keep_alive."""
+        fake = FakeOllama()
+        manager = self._manager(fake, preload={"enabled": True, "keep_alive": "10m"})
+        manager.warmup_thread.join(timeout=5)
+
+        self.assertEqual([c for c in fake.calls if c[0] == 'warm_up'], [
+            ('warm_up', 'nomic-embed-text', '10m'),
+            ('warm_up', 'gemma3:27b', '10m'),
+        ])
+
+        self.assertTrue(manager.switch_model('nomic-embed-text'))
+        manager.warmup_thread.join(timeout=5)
+        self.assertEqual(fake.calls[-1], ('warm_up', 'nomic-embed-text', '10m'))
+
+    def test_switch_unloads_to_fit_ram_budget(self):
+        """Test that switching unloads idle models beyond the RAM budget."""
+        fake = FakeOllama()
+        manager = self._manager(fake, residency={"ram_budget_gb": 18})
+
+        self.assertTrue(manager.switch_model('nomic-embed-text'))
+        self.assertEqual([c for c in fake.calls if c[0] == 'unload'], [])
+
+        fake.list = lambda: {'models': [{'name': 'llama3:8b', 'size': 5 * 10**9}]}
+        self.assertTrue(manager.switch_model('llama3:8b'))
+        self.assertEqual([c for c in fake.calls if c[0] == 'unload'],
+                         [('unload', 'gemma3:27b')])
+
+    def test_routed_generation_respects_ram_budget(self):
+        """Test that generating with a model that is not loaded makes room for it."""
+        fake = FakeOllama()
+        fake.list = lambda: {'models': [{'name': 'gemma3:27b', 'size': 17 * 10**9},
+                                        {'name': 'llama3:8b', 'size': 5 * 10**9}]}
+        manager = self._manager(fake, residency={"ram_budget_gb": 18})
+
+        manager.generate_text("Check")
+        self.assertEqual([c for c in fake.calls if c[0] == 'unload'], [])
+
+        manager.generate_text("Check", model='llama3:8b')
+        self.assertEqual([c for c in fake.calls if c[0] == 'unload'], [('unload', 'gemma3:27b')])
+
+    def test_tagged_model_names_match_config(self):
+        """Test that the pinned embedding model and model sizes match tagged Ollama names."""
+        fake = FakeOllama()
+        fake.ps = lambda: {'models': [{'model': 'nomic-embed-text:latest', 'size': 10**9},
+                                      {'model': 'gemma3:27b', 'size': 17 * 10**9}]}
+        fake.list = lambda: {'models': [{'name': 'nomic-embed-text:latest', 'size': 10**9},
+                                        {'name': 'llama3:latest', 'size': 4 * 10**9}]}
+        manager = self._manager(fake, residency={"ram_budget_gb": 20})
+
+        self.assertEqual(manager._make_room('llama3'), ['gemma3:27b'])
+        self.assertEqual([c for c in fake.calls if c[0] == 'unload'], [('unload', 'gemma3:27b')])
+
+    def test_model_catalog_is_cached(self):
+        """Test that the model list is fetched once and refreshed on pull."""
+        fake = FakeOllama()
+        manager = self._manager(fake)
+
+        manager.list_models()
+        manager.switch_model('nomic-embed-text')
+        manager.switch_model('gemma3:27b')
+        self.assertEqual(len([c for c in fake.calls if c[0] == 'list']), 1)
+
+        self.assertTrue(manager.load_model('mistral:7b'))
+        manager.list_models()
+        self.assertIn(('pull', 'mistral:7b'), fake.calls)
+        self.assertEqual(len([c for c in fake.calls if c[0] == 'list']), 2)
+
+    def test_deterministic_responses_are_cached(self):
+        """Test that temperature-0 and opt-in requests hit the response cache."""
+        fake = FakeOllama()
+        manager = self._manager(fake)
+
+        for _ in range(2):
+            self.assertEqual(manager.generate_text("Check", temperature=0), "echo Check")
+            manager.generate_text("Sampled")
+            manager.generate_text("Opt-in", cache=True)
+
+        prompts = [c[1] for c in fake.calls if c[0] == 'generate']
+        self.assertEqual(prompts, ["Check", "Sampled", "Opt-in", "Sampled"])
+        self.assertEqual(manager.response_cache.stats()['hits'], 2)
+
+    def test_async_api(self):
+        """Test async generation, streaming and embedding."""
+        fake = FakeOllama()
+        manager = self._manager(fake)
+
+        async def run():
+            text = await manager.agenerate("Check")
+            chunks = [chunk async for chunk in manager.agenerate_stream("Hi")]
+            embeddings = await manager.aembed(["a", "bb", "ccc", "dddd"])
+            return text, chunks, embeddings
+
+        text, chunks, embeddings = asyncio.run(run())
+
+        self.assertEqual(text, "echo Check")
+        self.assertEqual(chunks, ["Hello", " there"])
+        self.assertEqual(manager.last_generation_stats['tokens'], 2)
+        self.assertEqual(_lengths(embeddings), [1, 2, 3, 4])
+        self.assertEqual(len([c for c in fake.calls if c[0] == 'embed']), 2)
+
+    def test_async_embeddings_use_the_sync_policy(self):
+        """Test that async embedding requests are timed and retried like sync ones."""
+        fake = FakeOllama(fail_text="bad")
+        manager = self._manager(fake)
+        retries = []
+
+        async def sleep(seconds):
+            retries.append(seconds)
+
+        async def run():
+            await manager.aembed(["a", "bb"])
+            with self.assertRaises(EmbeddingError):
+                await manager.aembed(["ok", "bad"])
+
+        with mock.patch.object(resilience.asyncio, 'sleep', sleep):
+            asyncio.run(run())
+
+        self.assertEqual(len(retries), 1)
+        self.assertEqual(len(manager.embed_latency._samples), 2)
+
+    def test_async_cancellation_frees_slot(self):
+        """Test that a timed-out async request releases its scheduler slot."""
+        fake = FakeOllama()
+        fake.delay = 1.0
+        manager = self._manager(fake)
+
+        async def run():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(manager.agenerate("Slow"), timeout=0.05)
+
+        asyncio.run(run())
+
+        self.assertEqual(manager.scheduler.metrics()['interactive']['running'], 0)
+        self.assertNotIn(('generate', 'Slow'), fake.calls)
+
+    def test_abandoned_call_keeps_its_slot(self):
+        """Test that a request past its deadline holds its slot until it finishes."""
+        fake = FakeOllama()
+        manager = self._manager(fake, resilience={"deadlines": {"generate": 0.05}})
+        release = threading.Event()
+        fake.generate = lambda **kwargs: release.wait(1.0) and {'response': "late", 'done': True}
+
+        def running():
+            return manager.scheduler.metrics()['interactive']['running']
+
+        with self.assertRaises(GenerationError):
+            manager.generate_text("Slow")
+        self.assertEqual(running(), 1)
+
+        release.set()
+        for _ in range(100):
+            if not running():
+                break
+            time.sleep(0.01)
+        self.assertEqual(running(), 0)
+
+    def test_no_slot_is_held_while_waiting_to_retry(self):
+        """Test that embedding retries release their slot during the backoff sleep."""
+        fake = FakeOllama(fail_text="bad")
+        manager = self._manager(fake)
+        running_during_sleep = []
+
+        def sleep(seconds):
+            running_during_sleep.append(manager.scheduler.metrics()['memory']['running'])
+
+        with mock.patch.object(resilience.time, 'sleep', sleep):
+            with self.assertRaises(EmbeddingError):
+                manager.generate_embeddings(["ok", "bad"])
+        self.assertEqual(running_during_sleep, [0])
+
+    def test_chat_session_reuses_prefix(self):
+        """Test that session turns extend the previous request unchanged."""
+        fake = FakeOllama()
+        manager = self._manager(fake)
+        session = ChatSession()
+
+        list(manager.session_chat_stream(session, "one", "system A", "docs-1"))
+        list(manager.session_chat_stream(session, "two", "ignored", "docs-1"))
+        list(manager.session_chat_stream(session, "three", "system B", "docs-2"))
+
+        first, second, third = [c[1] for c in fake.calls if c[0] == 'chat']
+        self.assertEqual(second[:len(first)], first)
+        self.assertEqual(second[len(first)], {'role': 'assistant', 'content': "reply 2"})
+        self.assertEqual(third, [{'role': 'system', 'content': "system B"},
+                                 {'role': 'user', 'content': "three"}])
+        self.assertEqual(session.restarts, 1)
+        self.assertEqual(manager.last_generation_stats['prompt_tokens'], 5)
+
+    def test_task_routing_with_fallback(self):
+        """Test that tasks route to available models and fall back on errors."""
+        fake = FakeOllama()
+        manager = self._manager(fake, routing={"analysis": ["missing:1b", "embedding", "active"]})
+
+        self.assertEqual(manager.route_models({'task': 'analysis'}), ['nomic-embed-text', 'gemma3:27b'])
+        self.assertEqual(manager.route_models({'task': 'chat'}), ['gemma3:27b'])
+        self.assertEqual(manager.route_models({'task': 'rag'}), ['gemma3:27b'])
+
+        fake.fail_model = 'nomic-embed-text'
+        self.assertEqual(manager.generate_text("Check", task='analysis'), "echo Check")
+
+    def test_streams_fall_back_before_first_chunk(self):
+        """Test that streaming requests try the next routed model when one fails."""
+        fake = FakeOllama()
+        manager = self._manager(fake, routing={"analysis": ["embedding", "active"]})
+        fake.fail_model = 'nomic-embed-text'
+
+        self.assertEqual(list(manager.generate_text_stream("Hi", task='analysis')), ["Hello", " there"])
+        self.assertEqual(manager.last_generation_stats['model'], 'gemma3:27b')
+
+        async def run():
+            return [chunk async for chunk in manager.agenerate_stream("Hi", task='analysis')]
+        self.assertEqual(asyncio.run(run()), ["Hello", " there"])
+
+        fake.fail_model = 'gemma3:27b'
+        with self.assertRaises(GenerationError):
+            list(manager.generate_text_stream("Hi"))
+
+    def test_fallback_answers_are_cached_under_their_model(self):
+        """Test that a fallback model's answer is not served as the first model's."""
+        fake = FakeOllama()
+        manager = self._manager(fake, routing={"analysis": ["embedding", "active"]})
+        generate = fake.generate
+
+        def tagged(**kwargs):
+            response = generate(**kwargs)
+            return {**response, 'response': f"{kwargs['model']}: {response['response']}"}
+        fake.generate = tagged
+
+        fake.fail_model = 'nomic-embed-text'
+        self.assertEqual(manager.generate_text("Check", task='analysis', temperature=0),
+                         "gemma3:27b: echo Check")
+
+        fake.fail_model = None
+        self.assertEqual(manager.generate_text("Check", task='analysis', temperature=0),
+                         "nomic-embed-text: echo Check")
+        self.assertEqual(manager.generate_text("Check", temperature=0), "gemma3:27b: echo Check")
+        self.assertEqual(len([c for c in fake.calls if c[0] == 'generate']), 2)
+
+    def test_generation_errors_raise(self):
+        """Test that a failed fallback chain raises instead of returning an error string."""
+        fake = FakeOllama()
+        manager = self._manager(fake)
+
+        fake.fail_model = 'gemma3:27b'
+        with self.assertRaises(GenerationError) as raised:
+            manager.generate_text("Check")
+        self.assertEqual(raised.exception.errors, {'gemma3:27b': "model failed to load"})
+        # An answer from the server, even an error, keeps the circuit closed
+        self.assertEqual(manager.circuit_breaker.state, 'closed')
+
+    def test_circuit_breaker_fails_fast(self):
+        """Test that repeated connection failures stop further calls to Ollama."""
+        fake = FakeOllama()
+        manager = self._manager(fake, resilience={"circuit_breaker": {"failure_threshold": 2}})
+
+        def refuse(**kwargs):
+            fake.calls.append(('refused',))
+            raise ConnectionError("connection refused")
+        fake.generate = refuse
+
+        for _ in range(2):
+            with self.assertRaises(GenerationError):
+                manager.generate_text("Check")
+        with self.assertRaises(GenerationError) as raised:
+            manager.generate_text("Check")
+
+        self.assertEqual(fake.calls.count(('refused',)), 2)
+        self.assertEqual(manager.circuit_breaker.state, 'open')
+        self.assertIn("appears to be down", raised.exception.errors['gemma3:27b'])
+
+    def test_cancelled_trial_is_released(self):
+        """Test that a cancelled or interrupted half-open trial does not keep the circuit open."""
+        fake = FakeOllama()
+        manager = self._manager(fake, resilience={
+            "circuit_breaker": {"failure_threshold": 1, "reset_timeout": 0.05}
+        })
+        breaker = manager.circuit_breaker
+
+        def reopen():
+            breaker.record_failure()
+            time.sleep(0.06)
+
+        async def cancel_trial():
+            fake.delay = 1.0
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(manager.agenerate("Slow"), timeout=0.05)
+            fake.delay = 0.0
+
+        reopen()
+        asyncio.run(cancel_trial())
+        self.assertEqual(manager.generate_text("Check"), "echo Check")
+        self.assertEqual(breaker.state, 'closed')
+
+        # Ctrl-C while a stream waits for its first chunk
+        def interrupt(**kwargs):
+            raise KeyboardInterrupt
+        reopen()
+        with mock.patch.object(fake, 'generate', interrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                list(manager.generate_text_stream("Hi"))
+        self.assertEqual(manager.generate_text("Check"), "echo Check")
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_context_window_sizing(self):
+        """Test that num_ctx follows the prompt length in buckets and long prompts are trimmed."""
+        fake = FakeOllama()
+        requests = []
+        generate = fake.generate
+
+        def record(**kwargs):
+            requests.append(kwargs)
+            return generate(**kwargs)
+        fake.generate = record
+
+        manager = self._manager(fake, context={"buckets": [256, 512], "margin": 0.0}, max_tokens=100)
+
+        manager.generate_text("short prompt")
+        self.assertEqual(requests[-1]['options']['num_ctx'], 256)
+
+        manager.generate_text("word " * 300)
+        self.assertEqual(requests[-1]['options']['num_ctx'], 512)
+
+        # The loaded window is reused while it fits
+        manager.generate_text("short again")
+        self.assertEqual(requests[-1]['options']['num_ctx'], 512)
+
+        with self.assertLogs(model_manager.logger, level='WARNING') as logs:
+            manager.generate_text("start " + "filler " * 1000 + "question?")
+        prompt = requests[-1]['prompt']
+        self.assertTrue(prompt.startswith("start") and prompt.endswith("question?"))
+        self.assertLessEqual(manager.token_counter.count_tokens(prompt), 420)
+        self.assertIn("trimmed", logs.output[0])
+
+    def test_long_conversations_drop_oldest_turns(self):
+        """Test that chat trimming keeps the system prompt and latest message."""
+        fake = FakeOllama()
+        manager = self._manager(fake, context={"buckets": [256], "margin": 0.0}, max_tokens=50)
+
+        messages = [{'role': 'system', 'content': "be brief"}]
+        for i in range(20):
+            messages.append({'role': 'user', 'content': f"turn {i} " + "words " * 20})
+        sent, num_ctx = manager._fit_messages('gemma3:27b', messages, 50)
+
+        self.assertEqual(num_ctx, 256)
+        self.assertEqual(sent[0], messages[0])
+        self.assertEqual(sent[-1], messages[-1])
+        self.assertLess(len(sent), len(messages))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+"""
+Unit tests for recency-weighted ranking.
+"""
+import unittest
+from local_ai_assistant.memory.ranking import RecencyRanker
+
+class TestRecencyRanker(unittest.TestCase):
+    """Test cases for the RecencyRanker class."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.now = 1_000_000.0
+        self.items = [
+            {'id': 'old-relevant', 'distance': 0.1, 'metadata': {'timestamp': self.now - 7 * 86400}},
+            {'id': 'new-unrelated', 'distance': 0.9, 'metadata': {'timestamp': self.now - 60}},
+            {'id': 'new-relevant', 'distance': 0.2, 'metadata': {'timestamp': self.now - 3600}},
+        ]
+
+    def test_similarity_only(self):
+        """Test that a zero recency weight ranks by similarity."""
+        ranker = RecencyRanker(recency_weight=0.0)
+        ranked = ranker.rank(self.items, 3, now=self.now)
+        self.assertEqual([item['id'] for item in ranked],
+                         ['old-relevant', 'new-relevant', 'new-unrelated'])
+
+    def test_time_decay_promotes_recent_items(self):
+        """Test that the decay term lifts recent items and trims to n."""
+        ranker = RecencyRanker(recency_weight=0.5, half_life_hours=24)
+        ranked = ranker.rank(self.items, 2, now=self.now)
+        self.assertEqual([item['id'] for item in ranked], ['new-relevant', 'new-unrelated'])
+        self.assertGreater(ranked[0]['score'], ranked[1]['score'])
+
+if __name__ == "__main__":
+    unittest.main()
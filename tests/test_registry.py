@@ -0,0 +1,65 @@
+"""
+Unit tests for the component registry.
+"""
+import unittest
+import tempfile
+import yaml
+from pathlib import Path
+from local_ai_assistant.registry import ComponentRegistry, get_registry
+
+class TestComponentRegistry(unittest.TestCase):
+    """Test cases for the ComponentRegistry class."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base_dir = Path(self.temp_dir.name)
+
+        # Create a config file (Ollama host points nowhere, so mock mode)
+        self.config_file = base_dir / "config.yaml"
+        config = {
+            "model": {
+                "default": "gemma3:27b",
+                "embedding": "nomic-embed-text",
+                "ollama": {"host": "http://127.0.0.1", "port": 9},
+                "embedding_cache": {"path": str(base_dir / "cache" / "embeddings.sqlite3")},
+                "response_cache": {"path": str(base_dir / "cache" / "responses.sqlite3")}
+            },
+            "memory": {
+                "vector_store": {
+                    "persist_directory": str(base_dir / "memory"),
+                    "collection_name": "test"
+                }
+            },
+            "document": {
+                "storage_dir": str(base_dir / "documents")
+            }
+        }
+        with open(self.config_file, "w") as f:
+            yaml.dump(config, f)
+
+        self.registry = ComponentRegistry(self.config_file)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.temp_dir.cleanup()
+
+    def test_components_are_shared(self):
+        """Test that dependent components reuse the same instances."""
+        model_manager = self.registry.model_manager
+
+        self.assertIs(self.registry.model_manager, model_manager)
+        self.assertIs(model_manager.token_counter, self.registry.token_counter)
+        self.assertIs(self.registry.vector_store.model_manager, model_manager)
+
+        indexer = self.registry.document_indexer
+        self.assertIs(indexer.vector_store, self.registry.vector_store)
+        self.assertIs(indexer.document_loader, self.registry.document_loader)
+        self.assertIs(self.registry.document_indexer, indexer)
+
+    def test_get_registry_is_per_config(self):
+        """Test that get_registry returns one registry per config file."""
+        self.assertIs(get_registry(self.config_file), get_registry(str(self.config_file)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Unit tests for the model residency manager.
+"""
+import unittest
+from local_ai_assistant.models.residency import ModelResidencyManager
+
+GB = 10**9
+
+
+class TestModelResidencyManager(unittest.TestCase):
+    """Test cases for the ModelResidencyManager class."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.running = [
+            {'name': 'embed', 'size': 1 * GB},
+            {'name': 'big', 'size': 6 * GB},
+            {'name': 'small', 'size': 3 * GB},
+        ]
+        self.unloaded = []
+
+    def _manager(self, **kwargs):
+        def unload(name):
+            self.unloaded.append(name)
+            self.running = [m for m in self.running if m['name'] != name]
+            return True
+        return ModelResidencyManager(
+            lambda: list(self.running), unload,
+            ram_budget_bytes=10 * GB, pinned=['embed'], **kwargs
+        )
+
+    def test_unloads_least_recently_used(self):
+        """Test that the least recently used model is unloaded first."""
+        manager = self._manager()
+        manager.touch('big')
+        manager.touch('small')
+
+        self.assertEqual(manager.make_room('new', 4 * GB), ['big'])
+
+    def test_priority_and_pinning(self):
+        """Test that priorities outrank recency and pinned models stay."""
+        manager = self._manager(priorities={'big': 5})
+        manager.touch('small')
+        manager.touch('big')
+
+        self.assertEqual(manager.make_room('new', 8 * GB), ['small', 'big'])
+        self.assertNotIn('embed', self.unloaded)
+
+    def test_no_unload_within_budget(self):
+        """Test that nothing is unloaded when the model already fits."""
+        manager = self._manager()
+
+        self.assertEqual(manager.make_room('small', 3 * GB), [])
+        self.assertEqual(manager.make_room('other', 0), [])
+        self.assertEqual(self.unloaded, [])
+
+    def test_tagged_running_names(self):
+        """Test that untagged config names match the tagged names Ollama reports."""
+        self.running = [
+            {'name': 'embed:latest', 'size': 1 * GB},
+            {'name': 'big:27b', 'size': 6 * GB},
+            {'name': 'small:latest', 'size': 3 * GB},
+        ]
+        manager = self._manager(priorities={'small': 5})
+        manager.touch('big:27b')
+        manager.touch('small')
+
+        self.assertEqual(manager.make_room('new', 4 * GB), ['big:27b'])
+        self.assertEqual(manager.make_room('small', 0), [])
+        self.assertNotIn('embed:latest', self.unloaded)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+"""
+Unit tests for deadlines, retries and circuit breaking of Ollama calls.
+"""
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from local_ai_assistant.models import resilience
+from local_ai_assistant.models.resilience import (
+    CircuitBreaker, DeadlineExceeded, LatencyTracker, OllamaUnavailable, acall_with_deadline,
+    aretry_call, backoff_delay, call_with_deadline, is_transient_error, retry_call
+)
+
+
+class TestRetries(unittest.TestCase):
+    """Test cases for backoff and retry_call."""
+
+    def test_backoff_is_bounded(self):
+        """Test that delays are jittered below an exponential cap."""
+        for attempt in range(8):
+            delay = backoff_delay(attempt, base_delay=0.5, max_delay=2.0)
+            self.assertGreaterEqual(delay, 0.0)
+            self.assertLessEqual(delay, min(2.0, 0.5 * 2 ** attempt))
+
+    def test_retry_call(self):
+        """Test that failures are retried until success or the attempt limit."""
+        outcomes = [ConnectionError("down"), ConnectionError("down"), "ok"]
+
+        def flaky():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        with mock.patch.object(resilience.time, 'sleep'):
+            self.assertEqual(retry_call(flaky, attempts=3), "ok")
+            with self.assertRaises(ValueError):
+                retry_call(mock.Mock(side_effect=ValueError("bad")), attempts=3,
+                           should_retry=is_transient_error)
+
+    def test_transient_errors(self):
+        """Test which errors count as the server being unavailable."""
+        server_error = RuntimeError("internal")
+        server_error.status_code = 503
+        not_found = RuntimeError("not found")
+        not_found.status_code = 404
+
+        self.assertTrue(is_transient_error(ConnectionError()))
+        self.assertTrue(is_transient_error(DeadlineExceeded()))
+        self.assertTrue(is_transient_error(server_error))
+        self.assertFalse(is_transient_error(not_found))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for the CircuitBreaker class."""
+
+    def test_open_half_open_close(self):
+        """Test that the circuit opens, lets one trial through and closes on success."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        breaker.allow()
+        breaker.record_failure()
+        with self.assertRaises(OllamaUnavailable):
+            breaker.allow()
+
+        time.sleep(0.06)
+        breaker.allow()
+        with self.assertRaises(OllamaUnavailable):
+            breaker.allow()
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, resilience.STATE_CLOSED)
+        breaker.allow()
+
+    def test_failed_trial_reopens(self):
+        """Test that a failed half-open trial opens the circuit again."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        breaker.allow()
+        breaker.record_failure()
+        with self.assertRaises(OllamaUnavailable):
+            breaker.allow()
+
+    def test_released_trial_is_retried(self):
+        """Test that releasing an abandoned trial lets the next call through."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        breaker.allow()
+        breaker.release_trial()
+        breaker.allow()
+        self.assertEqual(breaker.state, resilience.STATE_HALF_OPEN)
+
+
+class TestCallWithDeadline(unittest.TestCase):
+    """Test cases for deadlines and hedged calls."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.release = threading.Event()
+        self.addCleanup(self.executor.shutdown, wait=True)
+        self.addCleanup(self.release.set)
+
+    def test_deadline(self):
+        """Test that a stalled call raises DeadlineExceeded."""
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            call_with_deadline(self.executor, self.release.wait, deadline=0.1)
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_on_finished_waits_for_abandoned_calls(self):
+        """Test that on_finished runs only once a call that missed the deadline ends."""
+        finished = threading.Event()
+        with self.assertRaises(DeadlineExceeded):
+            call_with_deadline(self.executor, self.release.wait, deadline=0.05, on_finished=finished.set)
+        self.assertFalse(finished.is_set())
+
+        self.release.set()
+        self.assertTrue(finished.wait(1.0))
+
+    def test_hedged_call_wins(self):
+        """Test that a duplicate call answers when the first one stalls."""
+        calls = []
+
+        def first_stalls():
+            calls.append(None)
+            if len(calls) == 1:
+                self.release.wait()
+                return "slow"
+            return "fast"
+
+        result = call_with_deadline(self.executor, first_stalls, deadline=2.0, hedge_after=0.05)
+        self.assertEqual(result, "fast")
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_propagate(self):
+        """Test that the call's own error is raised."""
+        with self.assertRaises(ValueError):
+            call_with_deadline(self.executor, mock.Mock(side_effect=ValueError("bad")), deadline=1.0)
+
+    def test_latency_percentile(self):
+        """Test percentiles are only reported with enough samples."""
+        tracker = LatencyTracker(window=10, min_samples=5)
+        for seconds in (0.1, 0.2, 0.3, 0.4):
+            tracker.record(seconds)
+        self.assertIsNone(tracker.percentile(0.95))
+        tracker.record(0.5)
+        self.assertEqual(tracker.percentile(0.95), 0.5)
+        self.assertEqual(tracker.percentile(0.0), 0.1)
+
+
+class TestAsyncCalls(unittest.TestCase):
+    """Test cases for aretry_call and acall_with_deadline."""
+
+    def test_aretry_call(self):
+        """Test that failed coroutines are retried until success."""
+        outcomes = [ConnectionError("down"), "ok"]
+
+        async def flaky():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        async def no_sleep(seconds):
+            pass
+
+        with mock.patch.object(resilience.asyncio, 'sleep', no_sleep):
+            self.assertEqual(asyncio.run(aretry_call(flaky, attempts=2)), "ok")
+
+    def test_deadline_cancels_the_call(self):
+        """Test that a stalled call raises DeadlineExceeded and is cancelled."""
+        cancelled = []
+
+        async def stalls():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def run():
+            with self.assertRaises(DeadlineExceeded):
+                await acall_with_deadline(stalls, deadline=0.05)
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+        self.assertEqual(cancelled, [True])
+
+    def test_hedged_call_wins(self):
+        """Test that a duplicate call answers when the first one stalls."""
+        calls = []
+
+        async def first_stalls():
+            calls.append(None)
+            if len(calls) == 1:
+                await asyncio.sleep(10)
+                return "slow"
+            return "fast"
+
+        result = asyncio.run(acall_with_deadline(first_stalls, deadline=2.0, hedge_after=0.05))
+        self.assertEqual(result, "fast")
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Unit tests for the request scheduler.
+"""
+import threading
+import time
+import unittest
+from local_ai_assistant.models.scheduler import RequestScheduler, SchedulerBusy
+
+
+class TestRequestScheduler(unittest.TestCase):
+    """Test cases for the RequestScheduler class."""
+
+    def _start_waiter(self, scheduler, request_class, order):
+        """Start a thread that records when it gets a slot."""
+        def run():
+            with scheduler.slot(request_class):
+                order.append(request_class)
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def _wait_queued(self, scheduler, request_class, n):
+        """Wait until n requests of a class are queued."""
+        for _ in range(200):
+            if scheduler.metrics()[request_class]['queued'] == n:
+                return
+            time.sleep(0.005)
+        self.fail(f"{request_class} requests were not queued")
+
+    def test_priority_order(self):
+        """Test that a free slot goes to the highest-priority class."""
+        scheduler = RequestScheduler(max_concurrency=1)
+        order = []
+
+        scheduler.acquire('indexing')
+        threads = [self._start_waiter(scheduler, 'analysis', order)]
+        self._wait_queued(scheduler, 'analysis', 1)
+        threads.append(self._start_waiter(scheduler, 'memory', order))
+        self._wait_queued(scheduler, 'memory', 1)
+        threads.append(self._start_waiter(scheduler, 'interactive', order))
+        self._wait_queued(scheduler, 'interactive', 1)
+
+        scheduler.release('indexing')
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(order, ['interactive', 'memory', 'analysis'])
+        self.assertEqual(scheduler.metrics()['memory']['completed'], 1)
+
+    def test_class_limit_leaves_room(self):
+        """Test that a class limit keeps slots free for other classes."""
+        scheduler = RequestScheduler(max_concurrency=3, class_limits={'indexing': 2})
+
+        scheduler.acquire('indexing')
+        scheduler.acquire('indexing')
+        with self.assertRaises(SchedulerBusy):
+            scheduler.acquire('indexing', timeout=0.05)
+
+        with scheduler.slot('interactive', timeout=0.05):
+            self.assertEqual(scheduler.metrics()['interactive']['running'], 1)
+
+    def test_queue_bound_rejects(self):
+        """Test backpressure on a full class queue."""
+        scheduler = RequestScheduler(max_concurrency=1, max_queue={'analysis': 1})
+        order = []
+
+        scheduler.acquire('interactive')
+        thread = self._start_waiter(scheduler, 'analysis', order)
+        self._wait_queued(scheduler, 'analysis', 1)
+
+        with self.assertRaises(SchedulerBusy):
+            scheduler.acquire('analysis')
+        self.assertEqual(scheduler.metrics()['analysis']['rejected'], 1)
+
+        scheduler.release('interactive')
+        thread.join(timeout=5)
+        self.assertEqual(order, ['analysis'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Unit tests for the shared multi-process index.
+"""
+import unittest
+import tempfile
+import yaml
+from pathlib import Path
+from unittest import mock
+from local_ai_assistant.memory import vector_store
+from local_ai_assistant.memory.vector_store import VectorStore
+
+class TestSharedIndex(unittest.TestCase):
+    """Test cases for shared index writer and reader vector stores."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        base_dir = Path(self.temp_dir.name)
+
+        # Force the in-memory store even if ChromaDB is installed
+        patcher = mock.patch.object(vector_store, 'CHROMADB_AVAILABLE', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.config_files = {}
+        for mode in ('writer', 'reader'):
+            config = {
+                "memory": {
+                    "vector_store": {
+                        "persist_directory": str(base_dir / mode),
+                        "collection_name": "test",
+                        "shared_index": {"mode": mode, "directory": str(base_dir / "shared")}
+                    }
+                }
+            }
+            self.config_files[mode] = base_dir / f"{mode}.yaml"
+            with open(self.config_files[mode], "w") as f:
+                yaml.dump(config, f)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.temp_dir.cleanup()
+
+    def test_reader_sees_new_generations(self):
+        """Test that a reader attaches to generations published later."""
+        writer = VectorStore(self.config_files['writer'])
+        writer.add_to_memory("first", {'role': 'user'}, embedding=[1.0, 0.0])
+
+        reader = VectorStore(self.config_files['reader'])
+        self.assertEqual(len(reader.memory_items), 1)
+
+        writer.add_to_memory("second", {'role': 'user'}, embedding=[0.0, 1.0])
+        results = reader.search_memory("", n_results=1, embedding=[0.0, 2.0])
+        self.assertEqual(results[0]['text'], "second")
+        self.assertEqual(reader.get_stats()['user_messages'], 2)
+
+    def test_reader_is_read_only(self):
+        """Test that a reader never writes to the shared store."""
+        reader = VectorStore(self.config_files['reader'])
+        reader.add_to_memory("ignored", {'role': 'user'}, embedding=[1.0, 0.0])
+
+        self.assertEqual(reader.memory_items, [])
+        self.assertFalse(reader.clear_memory())
+
+    def test_batch_publishes_once(self):
+        """Test that writes inside batch_writes publish a single generation."""
+        writer = VectorStore(self.config_files['writer'])
+        generation = writer._shared_publisher.generation
+
+        with writer.batch_writes():
+            for i in range(5):
+                writer.add_to_memory(f"chunk {i}", {'type': 'document_chunk'}, embedding=[1.0, float(i)])
+            self.assertEqual(writer._shared_publisher.generation, generation)
+
+        self.assertEqual(writer._shared_publisher.generation, generation + 1)
+        reader = VectorStore(self.config_files['reader'])
+        self.assertEqual(len(reader.memory_items), 5)
+
+if __name__ == "__main__":
+    unittest.main()
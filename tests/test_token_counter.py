@@ -28,6 +28,11 @@ class TestTokenCounter(unittest.TestCase):
         large_limit = 1000
         truncated = self.token_counter.truncate_to_token_limit(self.test_text, large_limit)
         self.assertEqual(truncated, self.test_text)
+
+        # Test keeping the end of the text
+        truncated = self.token_counter.truncate_to_token_limit(self.test_text, 5, from_end=True)
+        self.assertTrue(self.test_text.endswith(truncated))
+        self.assertLess(len(truncated), len(self.test_text))
     
     def test_model_specific_counting(self):
         """Test counting tokens for specific models."""
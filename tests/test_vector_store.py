@@ -0,0 +1,155 @@
+"""
+Unit tests for the vector store.
+"""
+import unittest
+import numpy as np
+import tempfile
+import yaml
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+from local_ai_assistant.memory import vector_store
+from local_ai_assistant.memory.vector_store import VectorStore
+
+
+class StubCollection:
+    """ChromaDB collection stand-in that checks argument types like chromadb does."""
+
+    def __init__(self):
+        self.metadata = {}
+        self.calls = []
+
+    def _check(self, embeddings):
+        for embedding in embeddings:
+            if not isinstance(embedding, list) or not all(type(x) is float for x in embedding):
+                raise ValueError(f"Expected embeddings to be a list of floats, got {embedding!r}")
+
+    def add(self, ids, embeddings, metadatas, documents):
+        self._check(embeddings)
+        self.calls.append(('add', embeddings))
+
+    def query(self, query_embeddings, n_results, where=None):
+        self._check(query_embeddings)
+        self.calls.append(('query', query_embeddings))
+        n = len(query_embeddings)
+        return {'ids': [[]] * n, 'documents': [[]] * n, 'metadatas': [[]] * n, 'distances': [[]] * n}
+
+
+class TestChromaBoundary(unittest.TestCase):
+    """Test cases for the ChromaDB-backed vector store."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.config_file = Path(self.temp_dir.name) / "config.yaml"
+        config = {
+            "memory": {
+                "vector_store": {
+                    "persist_directory": str(Path(self.temp_dir.name) / "store"),
+                    "collection_name": "test"
+                }
+            }
+        }
+        with open(self.config_file, "w") as f:
+            yaml.dump(config, f)
+
+        self.collection = StubCollection()
+        client = SimpleNamespace(get_collection=lambda **kwargs: self.collection)
+        chromadb = SimpleNamespace(PersistentClient=lambda path: client)
+        for patcher in (
+            mock.patch.object(vector_store, 'CHROMADB_AVAILABLE', True),
+            mock.patch.object(vector_store, 'chromadb', chromadb, create=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_embeddings_are_sent_as_float_lists(self):
+        """Test that float32 embedding rows are converted before reaching ChromaDB."""
+        store = VectorStore(self.config_file)
+        rows = np.array([[0.6, 0.8], [1.0, 0.0]], dtype=np.float32)
+
+        store.add_to_memory("first", {'role': 'user'}, embedding=rows[0])
+        store.search_memory_batch(["a", "b"], embeddings=list(rows))
+
+        self.assertTrue(store.chromadb_available)
+        self.assertEqual([call[0] for call in self.collection.calls], ['add', 'query'])
+        self.assertAlmostEqual(self.collection.calls[0][1][0][0], 0.6, places=6)
+
+    def test_cleared_collection_keeps_its_metadata(self):
+        """Test that clearing memory recreates the collection with the startup metadata."""
+        with open(self.config_file) as f:
+            config = yaml.safe_load(f)
+        config["model"] = {"embedding_dim": 256}
+        with open(self.config_file, "w") as f:
+            yaml.dump(config, f)
+        store = VectorStore(self.config_file)
+
+        created = []
+
+        def get_collection(**kwargs):
+            raise ValueError("Collection does not exist")
+
+        def create_collection(name, embedding_function, metadata):
+            created.append(metadata)
+            return StubCollection()
+
+        store.client = SimpleNamespace(
+            delete_collection=lambda name: None,
+            get_collection=get_collection,
+            create_collection=create_collection
+        )
+
+        self.assertTrue(store.clear_memory())
+        self.assertEqual(created, [{"distance_metric": "cosine", "embedding_dim": 256}])
+
+
+class TestConversationContext(unittest.TestCase):
+    """Test cases for conversation context retrieval in mock mode."""
+
+    def setUp(self):
+        """Set up the test cases."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.config_file = Path(self.temp_dir.name) / "config.yaml"
+        config = {
+            "memory": {
+                "vector_store": {
+                    "persist_directory": str(Path(self.temp_dir.name) / "store"),
+                    "collection_name": "test"
+                }
+            }
+        }
+        with open(self.config_file, "w") as f:
+            yaml.dump(config, f)
+
+        patcher = mock.patch.object(vector_store, 'CHROMADB_AVAILABLE', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Every query is about the first axis
+        query = np.array([[1.0, 0.0]], dtype=np.float32)
+        self.model_manager = SimpleNamespace(generate_embeddings=lambda texts, priority=None: query)
+
+    def test_latest_messages_are_always_included(self):
+        """Test that off-topic recent messages are kept next to the relevant ones."""
+        store = VectorStore(self.config_file, model_manager=self.model_manager)
+        on_topic = np.array([1.0, 0.0], dtype=np.float32)
+        off_topic = np.array([0.0, 1.0], dtype=np.float32)
+        for i in range(10):
+            store.add_to_memory(f"relevant {i}", {'role': 'user', 'timestamp': i}, embedding=on_topic)
+        store.add_to_memory("latest question", {'role': 'user', 'timestamp': 100}, embedding=off_topic)
+        store.add_to_memory("latest answer", {'role': 'assistant', 'timestamp': 101}, embedding=off_topic)
+
+        with mock.patch.object(store, 'search_memory', wraps=store.search_memory) as search:
+            items = store.get_conversation_context("query", n_relevant=3, include_recent=2)
+
+        self.assertEqual(search.call_args.kwargs['n_results'], 5)
+        self.assertEqual(len(items), 5)
+        self.assertEqual([item['text'] for item in items[-2:]], ["latest question", "latest answer"])
+        self.assertTrue(all(item['text'].startswith("relevant") for item in items[:3]))
+        self.assertTrue(all('score' in item for item in items))
+
+
+if __name__ == "__main__":
+    unittest.main()